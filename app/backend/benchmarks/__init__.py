@@ -0,0 +1 @@
+# app/backend/benchmarks/__init__.py
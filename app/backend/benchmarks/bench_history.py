@@ -0,0 +1,87 @@
+# app/backend/benchmarks/bench_history.py
+"""Benchmark du listage de l'historique : parcours du répertoire vs index SQLite
+
+Génère N dossiers de résultats factices puis mesure la première page de GET /predictions
+avec l'ancien parcours (listdir + lecture de chaque prediction_result.json) et avec l'index,
+sans filtre et filtrée par classe dominante.
+
+Usage (depuis app/backend) :
+    python -m benchmarks.bench_history [--sizes 100 1000 10000] [--repeats 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from config import settings
+from utils.history import PredictionHistory, TIMESTAMP_FORMAT
+from utils.result_store import RESULT_FILE
+
+
+def make_history(directory: str, count: int):
+    """Crée `count` dossiers de résultats avec des statistiques minimales"""
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        timestamp = (start + timedelta(seconds=i)).strftime(TIMESTAMP_FORMAT)
+        folder = os.path.join(directory, f"{timestamp}-{i:08x}-result")
+        os.makedirs(folder)
+        with open(os.path.join(folder, RESULT_FILE), "w") as f:
+            json.dump({
+                "timestamp": timestamp,
+                "filename": f"image_{i}.png",
+                "dominant_class": settings.GROUP_NAMES[i % settings.NUM_CLASSES],
+                "dominant_class_percentage": 50.0
+            }, f)
+
+def old_list(directory: str) -> List[Dict]:
+    predictions = []
+    for folder in sorted(os.listdir(directory), reverse=True):
+        if folder.endswith("-result"):
+            result_file = os.path.join(directory, folder, RESULT_FILE)
+            if os.path.exists(result_file):
+                with open(result_file, 'r') as f:
+                    data = json.load(f)
+                predictions.append({
+                    "timestamp": data.get("timestamp"),
+                    "filename": data.get("filename"),
+                    "dominant_class": data.get("dominant_class"),
+                    "dominant_class_percentage": data.get("dominant_class_percentage"),
+                    "folder": folder
+                })
+    return predictions[:20]
+
+def best_ms(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Tailles d'historique")
+    parser.add_argument("--repeats", type=int, default=5, help="Nombre d'exécutions par mesure")
+    args = parser.parse_args()
+
+    print(f"{'historique':>10} | {'parcours (ms)':>13} | {'index (ms)':>10} | {'index filtré (ms)':>17} | {'reconstruction (s)':>18}")
+    print("-" * 82)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            make_history(directory, size)
+            history = PredictionHistory(os.path.join(directory, "history.sqlite3"), directory)
+            start = time.perf_counter()
+            history.rebuild()
+            rebuild_s = time.perf_counter() - start
+
+            scan_ms = best_ms(lambda: old_list(directory), args.repeats)
+            index_ms = best_ms(lambda: history.query(limit=20), args.repeats)
+            filtered_ms = best_ms(lambda: history.query(limit=20, dominant_class=settings.GROUP_NAMES[3]), args.repeats)
+            history.close()
+        print(f"{size:>10} | {scan_ms:>13.1f} | {index_ms:>10.2f} | {filtered_ms:>17.2f} | {rebuild_s:>18.2f}")
+
+if __name__ == "__main__":
+    main()
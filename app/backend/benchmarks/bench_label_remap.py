@@ -0,0 +1,101 @@
+# app/backend/benchmarks/bench_label_remap.py
+"""Micro-benchmark : conversion des cartes Cityscapes *_labelIds en groupes (id_to_group)
+
+Compare, en mégapixels par seconde, une affectation booléenne par identifiant, l'indexation
+NumPy lut[labels], remap_labels (np.take par blocs, avec et sans travail sur place) et, depuis
+un PNG encodé, la lecture + conversion par load_label_groups (Image.point).
+
+Usage (depuis app/backend) :
+    python -m benchmarks.bench_label_remap [--repeats 5]
+"""
+import argparse
+import io
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from utils.image_processing import build_group_lut, load_label_groups, remap_labels
+
+SIZES = [(224, 224), (1024, 2048), (4096, 4096)]
+
+# Table id_to_group de Cityscapes (34 identifiants -> 8 groupes)
+ID_TO_GROUP = [7, 7, 7, 7, 7, 7, 7, 0, 0, 0, 0, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 6, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2]
+LUT = build_group_lut(ID_TO_GROUP)
+
+
+def per_id_remap(labels: np.ndarray) -> np.ndarray:
+    groups = np.full_like(labels, 255)
+    for label_id, group in enumerate(ID_TO_GROUP):
+        groups[labels == label_id] = group
+    return groups
+
+def fancy_index_remap(labels: np.ndarray) -> np.ndarray:
+    return LUT[labels]
+
+def make_labels(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """Carte réaliste : régions de 32x32 pixels, identifiants 0-33 et quelques 255 (plaques)"""
+    rng = np.random.default_rng(seed)
+    choices = np.array([*range(len(ID_TO_GROUP)), 255], dtype=np.uint8)
+    blocks = rng.choice(choices, size=(-(-height // 32), -(-width // 32)))
+    return np.kron(blocks, np.ones((32, 32), dtype=np.uint8))[:height, :width]
+
+def best_seconds(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(repeats: int) -> List[Dict]:
+    rows = []
+    for height, width in SIZES:
+        labels = make_labels(height, width)
+        expected = per_id_remap(labels)
+        buffered = io.BytesIO()
+        Image.fromarray(labels).save(buffered, format="PNG")
+        png = buffered.getvalue()
+        work = labels.copy()
+        out = np.empty_like(labels)
+
+        # Vérifier que toutes les variantes sont équivalentes
+        assert np.array_equal(fancy_index_remap(labels), expected)
+        assert np.array_equal(remap_labels(labels, LUT), expected)
+        assert np.array_equal(remap_labels(labels.copy(), LUT, out=work.copy()), expected)
+        assert np.array_equal(load_label_groups(io.BytesIO(png), LUT), expected)
+
+        decode_only = best_seconds(lambda: np.asarray(Image.open(io.BytesIO(png))), repeats)
+        for name, fn in [
+            ("boucle par id", lambda: per_id_remap(labels)),
+            ("lut[labels]", lambda: fancy_index_remap(labels)),
+            ("remap_labels", lambda: remap_labels(labels, LUT, out=out)),
+            # Sur place : le résultat est remappé à nouveau à chaque répétition (même coût)
+            ("sur place", lambda: remap_labels(work, LUT, out=work)),
+            ("PNG + lut[]", lambda: LUT[np.asarray(Image.open(io.BytesIO(png)))]),
+            ("PNG + point", lambda: load_label_groups(io.BytesIO(png), LUT)),
+        ]:
+            seconds = best_seconds(fn, repeats)
+            rows.append({
+                "size": f"{height}x{width}",
+                "method": name,
+                "ms": seconds * 1000,
+                "mpx_s": labels.size / seconds / 1e6,
+                # Pour les variantes avec lecture du PNG : coût de la conversion seule, décodage déduit
+                "remap_ms": (seconds - decode_only) * 1000 if name.startswith("PNG") else seconds * 1000
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="Nombre d'exécutions par mesure (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    print(f"{'taille':>10} | {'méthode':<14} | {'ms':>9} | {'Mpx/s':>8} | {'conversion ms':>13}")
+    print("-" * 67)
+    for row in run(args.repeats):
+        print(f"{row['size']:>10} | {row['method']:<14} | {row['ms']:>9.2f} | {row['mpx_s']:>8.0f} | {row['remap_ms']:>13.2f}")
+
+if __name__ == "__main__":
+    main()
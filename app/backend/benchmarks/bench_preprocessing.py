@@ -0,0 +1,111 @@
+# app/backend/benchmarks/bench_preprocessing.py
+"""Benchmark du prétraitement : temps et pic de mémoire résidente (RSS) par image
+
+Compare l'ancien chemin (tableau float32 pleine résolution + tf.image.resize, si TensorFlow
+est installé) au chemin uint8 (redimensionnement PIL) avec et sans décodage JPEG réduit (draft).
+Chaque cas s'exécute dans un processus neuf pour que la mémoire déjà réservée par l'allocateur
+lors d'un cas précédent ne masque pas le pic du suivant.
+
+Usage (depuis app/backend) :
+    python -m benchmarks.bench_preprocessing [--repeats 3]
+"""
+import argparse
+import gc
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+from utils.image_processing import prepare_model_input
+from utils.memory import PeakRSSMonitor
+
+SIZES = [(1024, 2048), (4096, 4096)]
+
+
+def make_image_bytes(height: int, width: int, fmt: str) -> bytes:
+    """Image synthétique (dégradés + bruit léger) encodée en JPEG ou PNG"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    img = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 255 // (width + height))], axis=-1)
+    img = (img + rng.integers(0, 16, size=img.shape)).clip(0, 255).astype(np.uint8)
+    buffered = io.BytesIO()
+    Image.fromarray(img).save(buffered, format=fmt, quality=90)
+    return buffered.getvalue()
+
+def old_preprocess(data: bytes) -> np.ndarray:
+    import tensorflow as tf
+
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    img_array = np.array(image, dtype=np.float32)
+    img_resized = tf.image.resize(img_array, settings.IMG_SIZE, method=tf.image.ResizeMethod.BILINEAR, antialias=True)
+    return (img_resized / 255.0).numpy()
+
+def new_preprocess(data: bytes) -> np.ndarray:
+    return prepare_model_input(Image.open(io.BytesIO(data)), settings.IMG_SIZE).astype(np.float32) / 255.0
+
+def new_preprocess_draft(data: bytes) -> np.ndarray:
+    return prepare_model_input(Image.open(io.BytesIO(data)), settings.IMG_SIZE, draft=True).astype(np.float32) / 255.0
+
+VARIANTS: Dict[str, Callable[[bytes], np.ndarray]] = {
+    "float32 + tf.resize": old_preprocess,
+    "uint8 PIL": new_preprocess,
+    "uint8 PIL + draft": new_preprocess_draft,
+}
+
+def measure(fn: Callable[[bytes], np.ndarray], data: bytes, repeats: int) -> Tuple[float, float]:
+    """Meilleur temps (ms) et pic de RSS au-dessus du niveau de base (Mo)"""
+    best_ms, peak_mb = float("inf"), 0.0
+    for _ in range(repeats):
+        gc.collect()
+        with PeakRSSMonitor() as monitor:
+            start = time.perf_counter()
+            fn(data)
+            elapsed = time.perf_counter() - start
+        best_ms = min(best_ms, elapsed * 1000)
+        peak_mb = max(peak_mb, monitor.peak_delta_bytes / 2**20)
+    return best_ms, peak_mb
+
+def measure_case(variant: str, height: int, width: int, fmt: str, repeats: int) -> Tuple[float, float]:
+    """Mesure un cas (exécuté dans un processus dédié)"""
+    fn = VARIANTS[variant]
+    data = make_image_bytes(height, width, fmt)
+    # Préchauffage (imports, initialisation TensorFlow) hors mesure
+    fn(make_image_bytes(64, 64, fmt))
+    return measure(fn, data, repeats)
+
+def run(repeats: int) -> List[Dict]:
+    variants = list(VARIANTS)
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        print("TensorFlow non installé : ancien chemin ignoré")
+        variants.remove("float32 + tf.resize")
+
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    for height, width in SIZES:
+        for fmt in ("JPEG", "PNG"):
+            for variant in variants:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    ms, mb = pool.submit(measure_case, variant, height, width, fmt, repeats).result()
+                rows.append({"size": f"{height}x{width}", "format": fmt, "variant": variant, "ms": ms, "peak_rss_mb": mb})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3, help="Nombre d'exécutions par mesure")
+    args = parser.parse_args()
+
+    rows = run(args.repeats)
+    print(f"{'taille':>10} | {'format':<6} | {'variante':<20} | {'temps (ms)':>10} | {'pic RSS (Mo)':>12}")
+    print("-" * 72)
+    for row in rows:
+        print(f"{row['size']:>10} | {row['format']:<6} | {row['variant']:<20} | {row['ms']:>10.1f} | {row['peak_rss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# app/backend/benchmarks/bench_tiled_inference.py
+"""Benchmark du coût de l'inférence par tuiles face à l'inférence standard (image entière)
+
+Charge le modèle servi (mêmes variables d'environnement que l'API : RUN_ID, MODEL_LOCAL_PATH...),
+puis segmente des images de synthèse avec `concurrency` requêtes simultanées, comme l'API : les
+tuiles de plusieurs images partagent les passes du modèle via la file de micro-batching.
+Rapporte le débit (images/s), la latence moyenne et le coût relatif au mode standard.
+
+Usage (depuis app/backend) :
+    python -m benchmarks.bench_tiled_inference [--sizes 2048x1024 4096x4096] [--images 16]
+        [--concurrency 4] [--tile-size 512] [--tile-overlap 128]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+
+# Pas de persistance pendant la mesure (avant la création du prédicteur)
+settings.PERSISTENCE_MODE = "off"
+
+
+def make_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8))
+
+def run_mode(predictor, image: Image.Image, count: int, concurrency: int, options: Dict) -> Tuple[float, float, int]:
+    """Débit (images/s), latence moyenne (ms) et nombre de tuiles par image"""
+    def one(_):
+        start = time.perf_counter()
+        result = predictor.predict(image, outputs=[], **options)
+        return time.perf_counter() - start, result['inference']['tiles']
+
+    # Passe de chauffe (traçage éventuel, allocations)
+    one(None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        measures = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - start
+    return count / elapsed, float(np.mean([latency for latency, _ in measures])) * 1000, measures[0][1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["2048x1024", "4096x4096"], help="Tailles LARGEURxHAUTEUR")
+    parser.add_argument("--images", type=int, default=16, help="Images segmentées par mesure")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requêtes simultanées")
+    parser.add_argument("--tile-size", type=int, default=settings.TILE_SIZE, help="Taille des tuiles")
+    parser.add_argument("--tile-overlap", type=int, default=settings.TILE_OVERLAP, help="Chevauchement des tuiles")
+    args = parser.parse_args()
+
+    from models.predictor import SegmentationPredictor
+    predictor = SegmentationPredictor()
+    tiled = {"inference": "tiled", "tile_size": args.tile_size, "tile_overlap": args.tile_overlap}
+
+    rows: List[Dict] = []
+    try:
+        for size in args.sizes:
+            width, height = (int(value) for value in size.split("x"))
+            image = make_image(width, height)
+            base_rate, base_latency, _ = run_mode(predictor, image, args.images, args.concurrency, {"inference": "standard"})
+            rate, latency, tiles = run_mode(predictor, image, args.images, args.concurrency, tiled)
+            rows.append({"size": size, "mode": "standard", "tiles": 1, "rate": base_rate, "latency": base_latency, "cost": 1.0})
+            rows.append({"size": size, "mode": "tiled", "tiles": tiles, "rate": rate, "latency": latency,
+                         "cost": base_rate / rate if rate else float("inf")})
+    finally:
+        predictor.shutdown()
+
+    print(f"{'taille':>10} | {'mode':<8} | {'tuiles':>6} | {'images/s':>9} | {'latence ms':>10} | {'coût':>6}")
+    print("-" * 65)
+    for row in rows:
+        print(f"{row['size']:>10} | {row['mode']:<8} | {row['tiles']:>6} | {row['rate']:>9.2f} | "
+              f"{row['latency']:>10.1f} | {row['cost']:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
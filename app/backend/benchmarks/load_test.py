@@ -0,0 +1,283 @@
+# app/backend/benchmarks/load_test.py
+"""Banc de charge de POST /predict : débit et latences p50/p95/p99, résultats JSON comparables
+
+Cibles :
+    (défaut)                   application FastAPI dans ce processus (TestClient, démarrage complet)
+    --url http://hôte:port     instance déjà lancée
+    --spawn uvicorn|gunicorn   instance locale lancée pour la mesure (--workers), puis arrêtée
+
+--standin utilise le modèle de substitution à poids aléatoires (benchmarks.standin_model) : même
+architecture et mêmes formes que le modèle servi, aucun accès MLflow. Chaque combinaison
+concurrence × taille d'image × format de réponse envoie --requests requêtes après une passe de
+chauffe. Chaque image envoyée est unique (quelques octets ajoutés après la fin du fichier, ignorés
+au décodage) pour ne pas mesurer le cache de résultats, sauf avec --cache. Les durées par étape
+de l'en-tête Server-Timing sont moyennées.
+
+Usage (depuis app/backend) :
+    python -m benchmarks.load_test --standin --concurrency 1 4 16 --sizes 1024x512 2048x1024 \\
+        --formats json mask --output results/bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.load_test --standin --spawn uvicorn --workers 2 --compare results/bench-main.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+API_PREFIX = "/api/v1/segmentation"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESPONSE_FORMATS = ("json", "multipart", "urls", "mask")
+# Réglages du serveur rapportés avec les résultats (variables d'environnement)
+REPORTED_SETTINGS = (
+    "MODEL_BACKEND", "BATCH_MAX_SIZE", "BATCH_MAX_WAIT_MS", "INFERENCE_WORKERS", "INFERENCE_MAX_PENDING",
+    "PERSISTENCE_MODE", "RESULT_CACHE_MB", "INFERENCE_MODE", "MASK_UPSAMPLING", "NORMALIZE_IN_GRAPH"
+)
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit courant et présence de modifications locales (None hors dépôt git)"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Durées (ms) de l'en-tête Server-Timing : "decode;dur=0.3, inference;dur=19.4" -> {...}"""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+def run_case(client, payload: bytes, filename: str, mime: str, params: Dict[str, str],
+             concurrency: int, requests: int, suffix: Optional[Callable[[], bytes]]) -> Dict[str, Any]:
+    """Envoie `requests` requêtes avec `concurrency` requêtes simultanées et agrège les mesures
+
+    suffix: octets ajoutés après la fin de l'image (contenu et clé de cache uniques, décodage
+    identique) ; None pour envoyer l'image telle quelle.
+    """
+    def one(_) -> Tuple[float, int, int, Dict[str, float]]:
+        data = payload + suffix() if suffix is not None else payload
+        start = time.perf_counter()
+        response = client.post(f"{API_PREFIX}/predict", params=params, files={"file": (filename, data, mime)})
+        latency = time.perf_counter() - start
+        return latency, response.status_code, len(response.content), parse_server_timing(response.headers.get("server-timing"))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Passe de chauffe (connexions, traçage, allocations) non mesurée
+        list(pool.map(one, range(concurrency)))
+        start = time.perf_counter()
+        measures = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _, _, _ in measures]) * 1000
+    errors: Dict[str, int] = {}
+    for _, status, _, _ in measures:
+        if status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    stage_names = sorted({name for *_, stages in measures for name in stages})
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 3),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 2),
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "max": round(float(latencies.max()), 2)
+        },
+        "request_bytes": len(payload),
+        "response_bytes_mean": round(float(np.mean([size for _, _, size, _ in measures])), 1),
+        "stages_ms": {
+            name: round(float(np.mean([stages[name] for *_, stages in measures if name in stages])), 2)
+            for name in stage_names
+        }
+    }
+
+def run_sweep(client, args) -> List[Dict[str, Any]]:
+    from benchmarks.bench_preprocessing import make_image_bytes
+
+    mime = "image/jpeg" if args.image_format == "JPEG" else "image/png"
+    # Suffixes uniques sur toute la mesure, et d'une mesure à l'autre sur un même serveur
+    nonce, counter = os.urandom(8), itertools.count()
+    suffix = None if args.cache else lambda: nonce + struct.pack("<Q", next(counter))
+    rows = []
+    for size in args.sizes:
+        width, height = (int(value) for value in size.split("x"))
+        payload = make_image_bytes(height, width, args.image_format)
+        for response_format, concurrency in itertools.product(args.formats, args.concurrency):
+            params = {"response_format": response_format, **dict(param.split("=", 1) for param in args.param)}
+            row = {"size": size, "format": response_format, "concurrency": concurrency}
+            row.update(run_case(client, payload, f"bench.{args.image_format.lower()}", mime, params,
+                                concurrency, args.requests, suffix))
+            rows.append(row)
+            latency = row["latency_ms"]
+            print(f"{size:>10} | {response_format:<9} | {concurrency:>5} | {row['throughput_rps']:>7.2f} | "
+                  f"{latency['p50']:>8.1f} | {latency['p95']:>8.1f} | {latency['p99']:>8.1f} | "
+                  f"{sum(row['errors'].values()):>7}", flush=True)
+    return rows
+
+def wait_ready(client, timeout: float):
+    """Attend que la sonde de disponibilité réponde 200 (modèle chargé)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get(f"{API_PREFIX}/health/ready").status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Serveur non disponible après {timeout:.0f}s")
+
+def spawn_server(kind: str, workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Lance uvicorn ou gunicorn (workers uvicorn) sur 127.0.0.1:port depuis app/backend"""
+    if kind == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "main:app", "-k", "uvicorn.workers.UvicornWorker",
+                   "-w", str(workers), "-b", f"127.0.0.1:{port}", "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+def compare(rows: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """Compare débit et p95 aux résultats de référence ; retourne True en cas de régression"""
+    with open(baseline_path) as f:
+        baseline = {(row["size"], row["format"], row["concurrency"]): row for row in json.load(f)["results"]}
+
+    regression = False
+    print(f"\nComparaison avec {baseline_path} (tolérance {tolerance:.0%})")
+    print(f"{'taille':>10} | {'format':<9} | {'conc.':>5} | {'débit':>8} | {'p95':>8} | verdict")
+    print("-" * 64)
+    for row in rows:
+        reference = baseline.get((row["size"], row["format"], row["concurrency"]))
+        if reference is None:
+            continue
+        throughput = row["throughput_rps"] / reference["throughput_rps"] - 1
+        p95 = row["latency_ms"]["p95"] / reference["latency_ms"]["p95"] - 1
+        slower = throughput < -tolerance or p95 > tolerance
+        regression = regression or slower
+        print(f"{row['size']:>10} | {row['format']:<9} | {row['concurrency']:>5} | {throughput:>+8.1%} | "
+              f"{p95:>+8.1%} | {'RÉGRESSION' if slower else 'ok'}")
+    return regression
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Instance déjà lancée (ex. http://127.0.0.1:8000)")
+    target.add_argument("--spawn", choices=("uvicorn", "gunicorn"), help="Lance une instance locale pour la mesure")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de l'instance lancée (--spawn)")
+    parser.add_argument("--port", type=int, default=8765, help="Port de l'instance lancée (--spawn)")
+    parser.add_argument("--standin", action="store_true", help="Modèle de substitution à poids aléatoires (hors ligne)")
+    parser.add_argument("--standin-dir", help="Répertoire du modèle de substitution (réutilisé s'il existe)")
+    parser.add_argument("--env", action="append", default=[], metavar="CLÉ=VALEUR",
+                        help="Variable d'environnement du serveur (en processus ou --spawn), répétable")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Requêtes simultanées")
+    parser.add_argument("--sizes", nargs="+", default=["1024x512", "2048x1024"], help="Tailles LARGEURxHAUTEUR")
+    parser.add_argument("--formats", nargs="+", choices=RESPONSE_FORMATS, default=["json", "mask"],
+                        help="Formats de réponse (response_format)")
+    parser.add_argument("--param", action="append", default=[], metavar="CLÉ=VALEUR",
+                        help="Paramètre de requête supplémentaire (ex. outputs=prediction_mask), répétable")
+    parser.add_argument("--image-format", choices=("JPEG", "PNG"), default="JPEG", help="Encodage des images envoyées")
+    parser.add_argument("--requests", type=int, default=64, help="Requêtes mesurées par combinaison")
+    parser.add_argument("--cache", action="store_true", help="Envoie des images identiques (mesure le cache de résultats)")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Attente maximum du chargement du modèle (s)")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--compare", help="Résultats JSON de référence : code de sortie 1 en cas de régression")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Écart toléré sur le débit et le p95 (--compare)")
+    args = parser.parse_args()
+    # Une ligne de journal par requête envoyée fausserait la mesure
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    # Environnement du serveur
+    env = dict(param.split("=", 1) for param in args.env)
+    workdir = tempfile.TemporaryDirectory(prefix="load_test-")
+    if args.standin:
+        env["MODEL_LOCAL_PATH"] = args.standin_dir or os.path.join(workdir.name, "standin")
+    if not args.url and "PREDICTIONS_DIR" not in os.environ:
+        # Les artefacts de la mesure ne s'ajoutent pas à l'historique local
+        env.setdefault("PREDICTIONS_DIR", os.path.join(workdir.name, "predictions"))
+    if not (args.url or args.spawn):
+        # En processus, la configuration est lue à son premier import : après cet environnement
+        os.environ.update(env)
+    server_env = {**os.environ, **env}
+    if args.standin:
+        from benchmarks.standin_model import write_standin_artifacts
+        write_standin_artifacts(env["MODEL_LOCAL_PATH"])
+
+    if args.url:
+        target_info = {"kind": "url", "url": args.url}
+    elif args.spawn:
+        target_info = {"kind": args.spawn, "workers": args.workers}
+    else:
+        target_info = {"kind": "inprocess"}
+    metadata = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "target": target_info,
+        "model": "standin" if args.standin else server_env.get("RUN_ID"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count()},
+        "settings": {name: server_env[name] for name in REPORTED_SETTINGS if name in server_env},
+        "image_format": args.image_format,
+        "requests": args.requests,
+        "cache": args.cache
+    }
+
+    print(f"{'taille':>10} | {'format':<9} | {'conc.':>5} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | "
+          f"{'p99 ms':>8} | {'erreurs':>7}")
+    print("-" * 88)
+
+    server = None
+    try:
+        if args.url or args.spawn:
+            import httpx
+            if args.spawn:
+                server = spawn_server(args.spawn, args.workers, args.port, server_env)
+            base_url = args.url or f"http://127.0.0.1:{args.port}"
+            limits = httpx.Limits(max_connections=max(args.concurrency))
+            with httpx.Client(base_url=base_url, timeout=300, limits=limits) as client:
+                wait_ready(client, args.startup_timeout)
+                rows = run_sweep(client, args)
+        else:
+            from fastapi.testclient import TestClient
+            import main as app_module
+            from models.lifecycle import predictor_state
+
+            with TestClient(app_module.app) as client:
+                if not predictor_state.wait(args.startup_timeout):
+                    raise SystemExit(f"Modèle non chargé: {predictor_state.readiness()}")
+                rows = run_sweep(client, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        workdir.cleanup()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata, "results": rows}, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+
+    if args.compare and compare(rows, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# app/backend/benchmarks/standin_model.py
+"""Modèle de substitution pour les benchmarks hors ligne (sans MLflow ni artefacts entraînés)
+
+Même architecture que le modèle servi (encodeur MobileNetV2, décodeur U-Net par convolutions
+transposées), mêmes entrée (N, 224, 224, 3) et sortie (N, 224, 224, 8), poids aléatoires : le
+coût d'inférence est représentatif, les masques ne le sont pas. Les artefacts sont écrits au
+format attendu par MODEL_LOCAL_PATH (model/data/model.keras et class_mapping.json).
+
+Usage (depuis app/backend) :
+    python -m benchmarks.standin_model /tmp/standin
+    MODEL_LOCAL_PATH=/tmp/standin uvicorn main:app
+"""
+import argparse
+import json
+import os
+from typing import Tuple
+
+from config import settings
+
+# Cityscapes : identifiant brut (0-33) -> groupe (flat, human, vehicle, construction, object, nature, sky, void)
+CITYSCAPES_ID_TO_GROUP = [
+    7, 7, 7, 7, 7, 7, 7, 0, 0, 0, 0, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 6, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2
+]
+# Sorties de l'encodeur reprises par les skip connections (112, 56, 28, 14) et goulot (7x7)
+SKIP_LAYERS = ("block_1_expand_relu", "block_3_expand_relu", "block_6_expand_relu", "block_13_expand_relu")
+BOTTLENECK_LAYER = "block_16_project"
+# Filtres du décodeur : ~5 M de paramètres, comme le modèle entraîné (5,4 M)
+DECODER_FILTERS = (384, 192, 96, 48)
+
+
+def build_standin_model(input_size: Tuple[int, int] = settings.IMG_SIZE, num_classes: int = settings.NUM_CLASSES,
+                        seed: int = 0):
+    """MobileNetV2-UNet à poids aléatoires (encodeur gelé, comme le modèle entraîné)"""
+    import keras
+    from keras import layers
+
+    keras.utils.set_random_seed(seed)
+    inputs = keras.Input(shape=(*input_size, 3), name="image")
+    # Entrée [0, 1] (normalisée par le prédicteur), encodeur MobileNetV2 en [-1, 1]
+    scaled = layers.Rescaling(2.0, offset=-1.0)(inputs)
+    encoder = keras.applications.MobileNetV2(input_tensor=scaled, include_top=False, weights=None)
+    encoder.trainable = False
+
+    x = encoder.get_layer(BOTTLENECK_LAYER).output
+    for filters, skip_name in zip(DECODER_FILTERS, reversed(SKIP_LAYERS)):
+        x = layers.Conv2DTranspose(filters, 3, strides=2, padding="same")(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU()(x)
+        x = layers.Concatenate()([x, encoder.get_layer(skip_name).output])
+    outputs = layers.Conv2DTranspose(num_classes, 3, strides=2, padding="same", activation="softmax")(x)
+    return keras.Model(inputs, outputs, name="mobilenetv2_unet_standin")
+
+def write_standin_artifacts(dst_dir: str, seed: int = 0) -> str:
+    """Écrit le modèle de substitution et class_mapping.json dans `dst_dir` (réutilisés s'ils existent)"""
+    model_path = os.path.join(dst_dir, "model", "data", "model.keras")
+    mapping_path = os.path.join(dst_dir, "class_mapping.json")
+    if not os.path.exists(model_path):
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        model = build_standin_model(seed=seed)
+        # Écriture atomique : un processus concurrent ne lit jamais un fichier partiel
+        tmp_path = model_path + ".tmp.keras"
+        model.save(tmp_path)
+        os.replace(tmp_path, model_path)
+    if not os.path.exists(mapping_path):
+        with open(mapping_path, "w") as f:
+            json.dump({"id_to_group": CITYSCAPES_ID_TO_GROUP}, f)
+    return dst_dir
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir", help="Répertoire des artefacts (à passer dans MODEL_LOCAL_PATH)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des poids aléatoires")
+    args = parser.parse_args()
+
+    write_standin_artifacts(args.output_dir, args.seed)
+    import keras
+    model = keras.saving.load_model(os.path.join(args.output_dir, "model", "data", "model.keras"), compile=False)
+    print(f"Modèle de substitution écrit dans {args.output_dir} : {model.count_params():,} paramètres, "
+          f"sortie {model.output_shape}")
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,121 @@ class Settings:
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
     RUN_ID = os.getenv("RUN_ID")
     
+    # Cache local des artefacts (évite un téléchargement MLflow à chaque démarrage)
+    MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", ".model_cache")
+    MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "false").lower() == "true"
+    MODEL_LOCAL_PATH = os.getenv("MODEL_LOCAL_PATH")
+    
     # Configuration du modèle
     MODEL_NAME = "cityscapes_segmentation"
     IMG_SIZE = (224, 224)
     NUM_CLASSES = 8
     
+    # Mode inférence : pas de compilation (optimiseur/loss/métriques), fonction tracée et préchauffée
+    INFERENCE_ONLY = os.getenv("INFERENCE_ONLY", "true").lower() == "true"
+    # Normalisation [0,1] dans le graphe : l'entrée reste en uint8 jusqu'au modèle
+    NORMALIZE_IN_GRAPH = os.getenv("NORMALIZE_IN_GRAPH", "true").lower() == "true"
+    
+    # Moteur d'inférence : keras (défaut), tflite (modèle converti, éventuellement quantifié) ou onnx
+    # (paquet onnxruntime requis). Modèle converti : MODEL_BACKEND_PATH, sinon model.tflite / model.onnx
+    # dans le répertoire des artefacts (voir scripts.convert_model). MODEL_NUM_THREADS : 0 = automatique
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "keras").lower()
+    MODEL_BACKEND_PATH = os.getenv("MODEL_BACKEND_PATH")
+    MODEL_NUM_THREADS = int(os.getenv("MODEL_NUM_THREADS", 0))
+    
+    # Registre de modèles : alias supplémentaires chargés après le modèle par défaut
+    # ("staging=<run_id>,canary=<run_id>", sélection par ?model=), budget des modèles en mémoire
+    # (poids estimés, 0 = sans limite ; au-delà, les modèles sans alias les moins récemment utilisés
+    # sont évincés) et secret des endpoints de bascule (X-Admin-Token ; sans valeur, désactivés)
+    MODEL_ALIASES = os.getenv("MODEL_ALIASES", "")
+    MODEL_REGISTRY_MAX_MB = int(os.getenv("MODEL_REGISTRY_MAX_MB", 512))
+    MODEL_REGISTRY_MAX_MODELS = int(os.getenv("MODEL_REGISTRY_MAX_MODELS", 3))
+    MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+    # Intervalle de relecture des alias publiés par les autres workers (MODEL_CACHE_DIR/aliases.json)
+    MODEL_ALIASES_SYNC_SECONDS = float(os.getenv("MODEL_ALIASES_SYNC_SECONDS", 5))
+    
+    # Serveur d'inférence local (models.inference_server) : avec MODEL_SERVER_SOCKET, les workers
+    # délèguent l'inférence à un seul processus par machine (socket Unix + mémoire partagée) au lieu de
+    # charger chacun le modèle ; gunicorn.conf.py le lance (MODEL_SERVER_SPAWN). MODEL_SERVER_AUTHKEY :
+    # secret de la connexion ; MODEL_SERVER_CONNECT_TIMEOUT : attente du serveur au démarrage d'un worker
+    MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+    MODEL_SERVER_SPAWN = os.getenv("MODEL_SERVER_SPAWN", "true").lower() == "true"
+    MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY")
+    MODEL_SERVER_CONNECT_TIMEOUT = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", 600))
+    
+    # Configuration du micro-batching d'inférence
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 8))
+    BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 10))
+    BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", 64))
+    
+    # Prédiction par lot (/predict/batch) : images en cours par requête, nombre d'images et taille totale
+    BATCH_REQUEST_CONCURRENCY = int(os.getenv("BATCH_REQUEST_CONCURRENCY", 8))
+    BATCH_REQUEST_MAX_FILES = int(os.getenv("BATCH_REQUEST_MAX_FILES", 256))
+    BATCH_REQUEST_MAX_MB = int(os.getenv("BATCH_REQUEST_MAX_MB", 200))
+    
+    # Flux vidéo (WebSocket /stream) : capacité des files entre étapes (au-delà, les images les plus
+    # anciennes sont abandonnées), intervalle des statistiques et taille maximum d'une image
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 2))
+    STREAM_STATS_INTERVAL_SECONDS = float(os.getenv("STREAM_STATS_INTERVAL_SECONDS", 5))
+    STREAM_MAX_FRAME_MB = int(os.getenv("STREAM_MAX_FRAME_MB", 8))
+    
+    # Configuration de l'exécuteur dédié à l'inférence et aux artefacts
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 8))
+    INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", 16))
+    RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", 2))
+    
+    # Métriques Prometheus (/metrics) et durées par étape dans l'en-tête Server-Timing des prédictions
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    
+    # Artefacts de prédiction (nom -> fichier dans le dossier de résultats)
+    PREDICTIONS_DIR = os.getenv("PREDICTIONS_DIR", "predictions")
+    ARTIFACT_FILES = {
+        "original": "original.png",
+        "prediction_mask": "prediction_mask.png",
+        "overlay": "visualization_overlay.png",
+        "side_by_side": "visualization_side_by_side.png"
+    }
+    # Persistance des artefacts : off (aucune), light (masque + statistiques), full (tout)
+    PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "full").lower()
+    PERSISTENCE_QUEUE_SIZE = int(os.getenv("PERSISTENCE_QUEUE_SIZE", 64))
+    PERSISTENCE_QUEUE_MB = int(os.getenv("PERSISTENCE_QUEUE_MB", 256))
+    # Rétention des dossiers de résultats (0 = critère désactivé) : désactivée par défaut, aucun
+    # dossier existant n'est supprimé sans configuration explicite
+    RETENTION_MAX_AGE_HOURS = float(os.getenv("RETENTION_MAX_AGE_HOURS", 0))
+    RETENTION_MAX_COUNT = int(os.getenv("RETENTION_MAX_COUNT", 0))
+    RETENTION_MAX_MB = int(os.getenv("RETENTION_MAX_MB", 0))
+    RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", 300))
+    # Index SQLite de l'historique des prédictions (reconstruit depuis les dossiers s'il est vide)
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(PREDICTIONS_DIR, "history.sqlite3"))
+    # Cache des résultats par contenu d'image (0 = désactivé) ; RESULT_CACHE_DIR active le déversement sur disque
+    RESULT_CACHE_MB = int(os.getenv("RESULT_CACHE_MB", 256))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", 3600))
+    RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")
+    RESULT_CACHE_DISK_MB = int(os.getenv("RESULT_CACHE_DISK_MB", 1024))
+    # Inférence par défaut de chaque requête : standard (image entière ramenée à la taille du modèle) ou
+    # tiled (tuiles de TILE_SIZE pixels de l'image d'origine, chacune à la taille du modèle, fondues sur
+    # TILE_OVERLAP pixels de chevauchement ; au plus TILE_MAX_COUNT tuiles par image)
+    INFERENCE_MODE = os.getenv("INFERENCE_MODE", "standard").lower()
+    TILE_SIZE = int(os.getenv("TILE_SIZE", 512))
+    TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", 128))
+    TILE_MAX_COUNT = int(os.getenv("TILE_MAX_COUNT", 128))
+    # Agrandissement du masque à la taille de l'image : nearest (masque de classes uint8, rapide) ou
+    # bilinear (logits interpolés dans le graphe TF puis argmax, contours lisses), traité par bandes
+    # de lignes d'au plus UPSAMPLE_TILE_PIXELS pixels pour borner la mémoire
+    MASK_UPSAMPLING = os.getenv("MASK_UPSAMPLING", "nearest").lower()
+    UPSAMPLE_TILE_PIXELS = int(os.getenv("UPSAMPLE_TILE_PIXELS", 1 << 18))
+    # Profilage à la demande d'une prédiction (en-tête X-Profile), désactivé par défaut. PROFILING_TOKEN :
+    # secret attendu dans l'en-tête X-Profile-Token (profilage et endpoints /profiles) ; au plus
+    # PROFILES_MAX_COUNT profils conservés dans PROFILES_DIR
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+    PROFILES_DIR = os.getenv("PROFILES_DIR", os.path.join(PREDICTIONS_DIR, "profiles"))
+    PROFILES_MAX_COUNT = int(os.getenv("PROFILES_MAX_COUNT", 20))
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", 1))
+    # Artefacts renvoyés par défaut (l'image originale n'est renvoyée que sur demande)
+    DEFAULT_OUTPUTS = ["prediction_mask", "overlay", "side_by_side"]
+    
     # Configuration Heroku
     PORT = int(os.getenv("PORT", 8000))
     IS_HEROKU = os.getenv("DYNO") is not None
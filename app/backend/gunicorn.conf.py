@@ -0,0 +1,29 @@
+# app/backend/gunicorn.conf.py
+# Chargé automatiquement par gunicorn (lancé depuis app/backend). Avec MODEL_SERVER_SOCKET, le
+# serveur d'inférence local (models.inference_server) est lancé avant les workers et arrêté avec
+# gunicorn : le modèle n'est chargé qu'une fois par machine, quel que soit --workers.
+import os
+import subprocess
+import sys
+
+from config import settings
+
+_model_server = None
+
+
+def on_starting(server):
+    global _model_server
+    if settings.MODEL_SERVER_SOCKET and settings.MODEL_SERVER_SPAWN:
+        _model_server = subprocess.Popen(
+            [sys.executable, "-m", "models.inference_server"],
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        server.log.info(f"Serveur d'inférence lancé (pid {_model_server.pid}, socket {settings.MODEL_SERVER_SOCKET})")
+
+def on_exit(server):
+    if _model_server is not None and _model_server.poll() is None:
+        _model_server.terminate()
+        try:
+            _model_server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _model_server.kill()
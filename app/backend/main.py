@@ -1,11 +1,13 @@
 # app/backend/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import os
 import uvicorn
 
 from routers import segmentation
+from models.lifecycle import predictor_state, prediction_history, model_registry
+from utils.metrics import registry, MetricsMiddleware, CONTENT_TYPE
 from config import settings
 
 # Configuration du logging
@@ -34,6 +36,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métriques HTTP (requêtes, durées, octets) pour /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Inclure les routes
 app.include_router(
     segmentation.router,
@@ -50,11 +55,56 @@ async def root():
         "status": "running on Heroku" if settings.IS_HEROKU else "running locally",
         "endpoints": {
             "predict": "/api/v1/segmentation/predict",
+            "predict_batch": "/api/v1/segmentation/predict/batch",
+            "stream": "/api/v1/segmentation/stream",
             "health": "/api/v1/segmentation/health",
-            "model_info": "/api/v1/segmentation/model/info"
+            "liveness": "/api/v1/segmentation/health/live",
+            "readiness": "/api/v1/segmentation/health/ready",
+            "model_info": "/api/v1/segmentation/model/info",
+            "models": "/api/v1/segmentation/models",
+            "predictions": "/api/v1/segmentation/predictions",
+            "metrics": "/metrics"
         }
     }
 
+def _predictor_stat(component: str, key: str):
+    """Jauge lue à la collecte dans les statistiques du prédicteur (absente tant qu'il n'est pas chargé)"""
+    def read():
+        if not predictor_state.is_ready:
+            return None
+        return getattr(predictor_state.predictor, component).get_stats()[key]
+    return read
+
+# Jauges lues à chaque collecte (aucun coût sur le chemin des requêtes)
+registry.gauge("segmentation_model_loaded", "1 si le modèle est chargé", fn=lambda: float(predictor_state.is_ready))
+registry.gauge(
+    "segmentation_model_load_seconds", "Durée du chargement du modèle (téléchargement, chargement, préchauffage)",
+    fn=lambda: predictor_state.readiness()["elapsed_seconds"] if predictor_state.is_ready else None
+)
+registry.gauge("segmentation_models_loaded", "Modèles chargés dans le registre (tous alias confondus)",
+               fn=lambda: len(model_registry.describe()["models"]))
+registry.gauge("segmentation_models_memory_bytes", "Mémoire estimée des modèles chargés (poids)",
+               fn=lambda: model_registry.describe()["memory_bytes"])
+registry.gauge("segmentation_executor_active_tasks", "Tâches en cours ou en attente dans l'exécuteur d'inférence",
+               fn=lambda: segmentation.inference_executor.get_stats()["active"])
+registry.gauge("segmentation_batch_queue_size", "Images en attente de micro-batching",
+               fn=_predictor_stat("batcher", "queue_size"))
+registry.gauge("segmentation_batch_in_flight", "Images en cours d'inférence (batch en cours)",
+               fn=_predictor_stat("batcher", "in_flight"))
+registry.gauge("segmentation_persistence_queue_size", "Écritures d'artefacts en attente",
+               fn=_predictor_stat("writer", "queue_size"))
+registry.gauge("segmentation_persistence_queue_bytes", "Mémoire retenue par les écritures d'artefacts en attente",
+               fn=_predictor_stat("writer", "queue_bytes"))
+registry.gauge("segmentation_result_cache_bytes", "Taille du cache de résultats en mémoire",
+               fn=lambda: segmentation.result_cache.get_stats()["bytes"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques au format texte Prometheus (propres à ce processus)"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métriques désactivées (METRICS_ENABLED=false)")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
     """Événement au démarrage de l'application"""
@@ -63,6 +113,20 @@ async def startup_event():
     logger.info(f"Port: {settings.PORT}")
     logger.info(f"MLflow tracking URI: {settings.MLFLOW_TRACKING_URI}")
     logger.info(f"Run ID: {settings.RUN_ID}")
+    
+    # Index de l'historique (reconstruit en arrière-plan s'il est vide)
+    prediction_history.start()
+    
+    # Charger le modèle en arrière-plan : les sondes de vivacité répondent immédiatement
+    predictor_state.start_loading()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Événement à l'arrêt de l'application"""
+    logger.info("Arrêt de l'API...")
+    segmentation.inference_executor.shutdown(wait=False)
+    model_registry.shutdown()
+    prediction_history.close()
 
 # ⬇️ Ajout du bloc principal pour exécution directe
 if __name__ == "__main__":
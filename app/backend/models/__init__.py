@@ -1,2 +1,2 @@
 # app/fastapi/models/__init__.py
-from models.predictor import predictor
\ No newline at end of file
+from models.lifecycle import predictor_state, prediction_history, ModelNotReadyError
\ No newline at end of file
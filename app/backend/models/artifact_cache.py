@@ -0,0 +1,147 @@
+# app/backend/models/artifact_cache.py
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, le renommage atomique reste garanti
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Verrou exclusif inter-processus basé sur un fichier (flock)"""
+    with open(lock_path, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Cache local des artefacts MLflow, indexé par RUN_ID (les artefacts d'un run sont immuables)"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, run_id: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", run_id)
+
+    def run_dir(self, run_id: str) -> str:
+        """Répertoire du cache pour un run"""
+        return os.path.join(self.cache_dir, self._key(run_id))
+
+    def is_cached(self, run_id: str) -> bool:
+        """Le run est en cache si son manifeste existe (écrit en dernier, avant le renommage)"""
+        return os.path.exists(os.path.join(self.run_dir(run_id), MANIFEST_FILE))
+
+    def read_manifest(self, run_id: str) -> Optional[Dict]:
+        """Retourne le manifeste (empreintes SHA-256 et tailles des fichiers) d'un run en cache,
+        None s'il est absent ou illisible"""
+        try:
+            with open(os.path.join(self.run_dir(run_id), MANIFEST_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, run_id: str) -> bool:
+        """L'entrée du cache correspond au run et tous les fichiers du manifeste sont présents
+        (avec leur taille, si le manifeste l'indique) ; les empreintes ne sont pas recalculées"""
+        manifest = self.read_manifest(run_id)
+        if manifest is None or manifest.get("run_id") != run_id:
+            return False
+        directory = self.run_dir(run_id)
+        sizes = manifest.get("sizes", {})
+        for relative_path in manifest.get("files", {}):
+            path = os.path.join(directory, relative_path)
+            if not os.path.isfile(path):
+                return False
+            if relative_path in sizes and os.path.getsize(path) != sizes[relative_path]:
+                return False
+        return True
+
+    def fetch(self, run_id: str, download_fn: Callable[[str, str], None], offline: bool = False) -> str:
+        """Retourne le répertoire des artefacts du run, en les téléchargeant une seule fois si besoin
+
+        download_fn(run_id, dst_dir) doit déposer les artefacts dans dst_dir.
+        Plusieurs workers peuvent appeler fetch en parallèle : un seul télécharge,
+        les autres attendent le verrou puis réutilisent le cache. Une entrée qui ne correspond
+        pas à son manifeste (is_valid) est téléchargée à nouveau, ou refusée hors ligne.
+        """
+        final_dir = self.run_dir(run_id)
+        if self.is_valid(run_id):
+            logger.info(f"Artefacts trouvés dans le cache: {final_dir}")
+            return final_dir
+        if self.is_cached(run_id):
+            # Fichiers manquants ou tronqués, ou entrée d'un autre run (même nom de répertoire)
+            logger.warning(f"Entrée du cache incomplète ou ne correspondant pas au run {run_id}: {final_dir}")
+
+        if offline:
+            raise FileNotFoundError(
+                f"Mode hors ligne: aucun artefact valide en cache pour le run {run_id} dans {self.cache_dir}"
+            )
+
+        with file_lock(os.path.join(self.cache_dir, f"{self._key(run_id)}.lock")):
+            # Un autre worker a pu remplir le cache pendant l'attente du verrou
+            if self.is_valid(run_id):
+                logger.info(f"Artefacts téléchargés par un autre worker: {final_dir}")
+                return final_dir
+
+            tmp_dir = tempfile.mkdtemp(prefix=f".{self._key(run_id)}-", dir=self.cache_dir)
+            try:
+                logger.info(f"Téléchargement des artefacts du run {run_id} vers le cache")
+                download_fn(run_id, tmp_dir)
+                self._write_manifest(run_id, tmp_dir)
+
+                # Remplacer une éventuelle entrée incomplète puis publier atomiquement
+                if os.path.exists(final_dir):
+                    shutil.rmtree(final_dir)
+                os.rename(tmp_dir, final_dir)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+
+        logger.info(f"Artefacts mis en cache: {final_dir}")
+        return final_dir
+
+    def _write_manifest(self, run_id: str, directory: str):
+        files, sizes = {}, {}
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                relative_path = os.path.relpath(path, directory)
+                files[relative_path] = _sha256(path)
+                sizes[relative_path] = os.path.getsize(path)
+
+        manifest = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            "files": files,
+            "sizes": sizes
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
@@ -0,0 +1,194 @@
+# app/backend/models/backends.py
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Moteurs d'inférence disponibles (settings.MODEL_BACKEND) et fichier converti attendu par défaut
+MODEL_BACKENDS = ("keras", "tflite", "onnx")
+BACKEND_FILES = {"tflite": "model.tflite", "onnx": "model.onnx"}
+
+
+def normalize_batch(batch: np.ndarray) -> np.ndarray:
+    """Batch float32 [0,1] : les entrées uint8 (normalisation dans le graphe) sont divisées par 255"""
+    if batch.dtype == np.uint8:
+        return batch.astype(np.float32) / 255.0
+    return batch.astype(np.float32, copy=False)
+
+
+class KerasBackend:
+    """Modèle Keras exécuté par une fonction tracée à signature fixe (N, H, W, 3)"""
+
+    name = "keras"
+
+    def __init__(self, model, input_size, input_dtype, normalize_in_graph: bool):
+        # Import à la construction : les workers d'un serveur d'inférence (RemoteBackend) n'importent pas TensorFlow
+        import tensorflow as tf
+
+        self.model = model
+        self.input_dtype = input_dtype
+        self._to_tensor = tf.convert_to_tensor
+
+        @tf.function(
+            input_signature=[tf.TensorSpec([None, input_size[0], input_size[1], 3], input_dtype)],
+            reduce_retracing=True
+        )
+        def infer(images):
+            if normalize_in_graph:
+                images = tf.cast(images, tf.float32) / 255.0
+            return model(images, training=False)
+
+        self._infer_fn = infer
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        return self._infer_fn(self._to_tensor(batch, dtype=self.input_dtype)).numpy()
+
+    def memory_bytes(self) -> int:
+        """Taille des poids en mémoire (estimation pour le budget du registre de modèles)"""
+        return sum(int(np.prod(w.shape)) * np.dtype(w.dtype).itemsize for w in self.model.weights)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model_name": self.model.name,
+            "input_shape": list(self.model.input_shape),
+            "output_shape": list(self.model.output_shape),
+            "num_parameters": int(self.model.count_params())
+        }
+
+
+class TFLiteBackend:
+    """Modèle converti en TFLite (float, float16, quantification dynamique ou int8)
+
+    L'entrée est quantifiée et la sortie déquantifiée selon les paramètres du modèle : un modèle
+    int8 converti par scripts.convert_model reçoit directement les pixels uint8 (échelle 1/255).
+    L'interpréteur n'est pas réentrant : les appels sont sérialisés (le micro-batching n'en fait
+    qu'un à la fois).
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.num_threads = num_threads or None
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size: int):
+        """Réalloue les tenseurs pour une nouvelle taille de batch"""
+        self.interpreter.resize_tensor_input(self._input["index"], [batch_size, *self._input["shape"][1:]])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def _quantize_input(self, batch: np.ndarray) -> np.ndarray:
+        dtype = self._input["dtype"]
+        scale, zero_point = self._input["quantization"]
+        if dtype == np.float32 or not scale:
+            return normalize_batch(batch)
+        # Entrée uint8 à l'échelle 1/255 : les pixels sont déjà les valeurs quantifiées
+        if batch.dtype == np.uint8 and dtype == np.uint8 and zero_point == 0 and abs(scale * 255 - 1) < 1e-6:
+            return batch
+        info = np.iinfo(dtype)
+        quantized = np.round(normalize_batch(batch) / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, outputs: np.ndarray) -> np.ndarray:
+        scale, zero_point = self._output["quantization"]
+        if outputs.dtype == np.float32 or not scale:
+            return outputs
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._resize(batch.shape[0])
+            self.interpreter.set_tensor(self._input["index"], self._quantize_input(batch))
+            self.interpreter.invoke()
+            outputs = self.interpreter.get_tensor(self._output["index"])
+        return self._dequantize_output(outputs)
+
+    def memory_bytes(self) -> int:
+        return os.path.getsize(self.model_path)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model_path": self.model_path,
+            "model_size_bytes": os.path.getsize(self.model_path),
+            "input_shape": [None, *(int(d) for d in self._input["shape"][1:])],
+            "output_shape": [None, *(int(d) for d in self._output["shape"][1:])],
+            "input_dtype": np.dtype(self._input["dtype"]).name,
+            "num_threads": self.num_threads
+        }
+
+
+class OnnxBackend:
+    """Modèle converti en ONNX exécuté par ONNX Runtime (dépendance optionnelle onnxruntime)"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("MODEL_BACKEND=onnx nécessite le paquet onnxruntime (pip install onnxruntime)")
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self.num_threads = num_threads or None
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input = self.session.get_inputs()[0]
+        self._output = self.session.get_outputs()[0]
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        # InferenceSession.run est réentrant
+        return self.session.run([self._output.name], {self._input.name: normalize_batch(batch)})[0]
+
+    def memory_bytes(self) -> int:
+        return os.path.getsize(self.model_path)
+
+    def describe(self) -> Dict[str, Any]:
+        def shape(dims: List) -> List[Optional[int]]:
+            return [d if isinstance(d, int) else None for d in dims]
+        return {
+            "backend": self.name,
+            "model_path": self.model_path,
+            "model_size_bytes": os.path.getsize(self.model_path),
+            "input_shape": shape(self._input.shape),
+            "output_shape": shape(self._output.shape),
+            "num_threads": self.num_threads
+        }
+
+
+def find_backend_model(artifacts_dir: str, backend: str) -> str:
+    """Chemin du modèle converti dans le répertoire des artefacts (model.tflite, model.onnx)"""
+    filename = BACKEND_FILES[backend]
+    for path in (os.path.join(artifacts_dir, filename), os.path.join(artifacts_dir, "model", filename)):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(
+        f"Aucun {filename} dans {artifacts_dir} : le générer avec python -m scripts.convert_model "
+        f"ou définir MODEL_BACKEND_PATH"
+    )
+
+def load_converted_backend(backend: str, model_path: str, num_threads: int = 0):
+    """Instancie le moteur TFLite ou ONNX d'un modèle converti"""
+    if backend == "tflite":
+        return TFLiteBackend(model_path, num_threads)
+    if backend == "onnx":
+        return OnnxBackend(model_path, num_threads)
+    raise ValueError(f"Moteur d'inférence sans modèle converti: {backend}")
@@ -0,0 +1,155 @@
+# app/backend/models/batching.py
+import threading
+import queue
+import time
+import logging
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Levée lorsque la file d'attente d'inférence est pleine"""
+
+
+class SchedulerClosedError(QueueFullError):
+    """Levée lorsqu'une image est soumise après l'arrêt du batching (modèle évincé ou déchargé) :
+    rejetée comme une file pleine (503), la requête relancée utilise le modèle courant"""
+
+
+class BatchScheduler:
+    """Regroupe les requêtes concurrentes en micro-batchs pour une seule passe du modèle"""
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, max_queue_size: int = 64):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._closed = False
+        self._in_flight = 0
+        self._batches_run = 0
+        self._items_processed = 0
+
+    def start(self):
+        """Démarre le thread de traitement des batchs"""
+        with self._lock:
+            if self._closed:
+                raise SchedulerClosedError("Micro-batching arrêté")
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._worker, name="batch-scheduler", daemon=True)
+            self._thread.start()
+            logger.info(f"Micro-batching démarré (batch max: {self.max_batch_size}, "
+                        f"attente max: {self.max_wait * 1000:.1f} ms, file: {self.max_queue_size})")
+
+    def stop(self, timeout: float = 5.0):
+        """Arrête le thread de traitement après avoir vidé la file ; les soumissions suivantes sont refusées"""
+        with self._lock:
+            self._closed = True
+            if not self._running:
+                return
+            self._running = False
+        self._thread.join(timeout=timeout)
+
+    def submit(self, item: np.ndarray) -> Future:
+        """Ajoute une image prétraitée (H, W, C) à la file et retourne un Future sur sa prédiction"""
+        if not self._running and not self._closed:
+            self.start()
+
+        future: Future = Future()
+        # Sous le verrou : aucune image ne doit entrer dans la file après l'arrêt (elle ne serait jamais traitée)
+        with self._lock:
+            if self._closed:
+                raise SchedulerClosedError("Modèle déchargé : file d'inférence fermée")
+            try:
+                self._queue.put_nowait((item, future))
+            except queue.Full:
+                raise QueueFullError("File d'attente d'inférence pleine")
+        return future
+
+    def _collect_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        """Attend une première requête puis regroupe les suivantes jusqu'à la taille ou au délai max"""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future]]):
+        """Exécute une passe du modèle et redistribue les résultats aux appelants"""
+        # Regrouper par forme pour pouvoir empiler les entrées
+        groups: Dict[Tuple[int, ...], List[Tuple[np.ndarray, Future]]] = {}
+        for item, future in batch:
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(tuple(item.shape), []).append((item, future))
+
+        for entries in groups.values():
+            try:
+                inputs = np.stack([item for item, _ in entries], axis=0)
+                outputs = self.predict_fn(inputs)
+                for i, (_, future) in enumerate(entries):
+                    future.set_result(outputs[i])
+            except Exception as e:
+                logger.error(f"Erreur lors de l'inférence du batch: {str(e)}")
+                for _, future in entries:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._lock:
+                self._batches_run += 1
+                self._items_processed += len(entries)
+
+    def _worker(self):
+        """Boucle principale du thread de batching"""
+        while self._running or not self._queue.empty():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            with self._lock:
+                self._in_flight = len(batch)
+            self._run_batch(batch)
+            with self._lock:
+                self._in_flight = 0
+
+    @property
+    def thread_ident(self) -> Optional[int]:
+        """Identifiant du thread de batching (profilage par échantillonnage des piles)"""
+        return self._thread.ident if self._thread is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'occupation de la file et les compteurs de batching"""
+        with self._lock:
+            batches_run = self._batches_run
+            items_processed = self._items_processed
+            in_flight = self._in_flight
+        return {
+            "running": self._running,
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self.max_queue_size,
+            "in_flight": in_flight,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches_run": batches_run,
+            "items_processed": items_processed,
+            "avg_batch_size": (items_processed / batches_run) if batches_run else 0.0
+        }
@@ -0,0 +1,292 @@
+# app/backend/models/inference_server.py
+"""Serveur d'inférence local partagé par les workers : le modèle n'est chargé qu'une fois par machine
+
+Avec MODEL_SERVER_SOCKET, les workers gunicorn/uvicorn ne chargent plus le modèle : leur moteur
+d'inférence (RemoteBackend) envoie chaque batch au serveur par un socket Unix, les tenseurs
+d'entrée et de sortie transitant par mémoire partagée (seuls les noms et formes sont sérialisés).
+Le micro-batching a lieu dans chaque worker : le serveur exécute directement les batchs reçus
+(une passe du modèle par batch, les connexions des workers en parallèle) et charge chaque run demandé
+une seule fois ; un run qui n'est plus utilisé par aucun worker est déchargé (sauf le modèle par défaut).
+
+Usage (depuis app/backend, mêmes variables d'environnement que l'API) :
+    MODEL_SERVER_SOCKET=/tmp/segmentation.sock python -m models.inference_server
+    MODEL_SERVER_SOCKET=/tmp/segmentation.sock gunicorn main:app -k uvicorn.workers.UvicornWorker --workers 4
+Avec gunicorn, gunicorn.conf.py lance le serveur avant les workers et l'arrête avec eux.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _authkey() -> Optional[bytes]:
+    """Secret partagé (authentification HMAC de la connexion) ; sans valeur, seul le droit d'accès au socket protège"""
+    return settings.MODEL_SERVER_AUTHKEY.encode() if settings.MODEL_SERVER_AUTHKEY else None
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Ouvre un segment créé par un worker sans l'enregistrer auprès du resource_tracker
+    (qui le supprimerait à l'arrêt du serveur, Python < 3.13)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+class RemoteBackend:
+    """Moteur d'inférence délégué au serveur local (une connexion et deux segments de mémoire partagée)
+
+    Les segments d'entrée et de sortie sont créés par le worker, dimensionnés pour BATCH_MAX_SIZE
+    images et agrandis si besoin ; la sortie est copiée avant d'être rendue (segment réutilisé).
+    """
+
+    name = "remote"
+
+    def __init__(self, socket_path: str, run_id: Optional[str] = None, connect_timeout: float = 600.0):
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._conn = self._connect(connect_timeout)
+        self._conn.send(("load", run_id))
+        self._info = self._receive()
+        self.class_mapping: Dict[str, Any] = self._info["class_mapping"]
+        self.framework_versions: Dict[str, str] = self._info["framework_versions"]
+        self._output_shape = tuple(self._info["describe"]["output_shape"][1:])
+        self._input: Optional[shared_memory.SharedMemory] = None
+        self._output: Optional[shared_memory.SharedMemory] = None
+
+    def _connect(self, timeout: float) -> Connection:
+        # Le serveur n'écoute qu'une fois le modèle par défaut chargé : attendre qu'il soit prêt
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(self.socket_path, family="AF_UNIX", authkey=_authkey())
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Serveur d'inférence injoignable sur {self.socket_path} après {timeout:.0f} s")
+                time.sleep(0.5)
+
+    def _receive(self) -> Any:
+        status, payload = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Serveur d'inférence: {payload}")
+        return payload
+
+    @staticmethod
+    def _segment(segment: Optional[shared_memory.SharedMemory], nbytes: int) -> shared_memory.SharedMemory:
+        if segment is not None and segment.size >= nbytes:
+            return segment
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+        return shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch)
+        output_shape = (batch.shape[0], *self._output_shape)
+        capacity = max(batch.shape[0], settings.BATCH_MAX_SIZE)
+        with self._lock:
+            self._input = self._segment(self._input, capacity * batch[0].nbytes)
+            self._output = self._segment(self._output, capacity * int(np.prod(self._output_shape)) * 4)
+            np.ndarray(batch.shape, batch.dtype, buffer=self._input.buf)[...] = batch
+            self._conn.send(("infer", self._input.name, batch.shape, batch.dtype.str, self._output.name, output_shape))
+            self._receive()
+            return np.ndarray(output_shape, np.float32, buffer=self._output.buf).copy()
+
+    def memory_bytes(self) -> int:
+        # Poids détenus par le serveur (une copie par machine) : c'est ce que le modèle coûte au budget
+        return self._info["memory_bytes"]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            **self._info["describe"],
+            "backend": self.name,
+            "server_backend": self._info["describe"]["backend"],
+            "server_memory_bytes": self._info["memory_bytes"],
+            "model_server": self.socket_path
+        }
+
+    def close(self):
+        """Ferme la connexion (le serveur décharge le run s'il n'est plus utilisé) et libère les segments"""
+        with self._lock:
+            self._conn.close()
+            for segment in (self._input, self._output):
+                if segment is not None:
+                    segment.close()
+                    segment.unlink()
+            self._input = self._output = None
+
+
+class InferenceServer:
+    """Charge les runs demandés par les workers et exécute leurs batchs (un thread par connexion)"""
+
+    def __init__(self, socket_path: str):
+        from utils.persistence import BackgroundWriter, RetentionPolicy
+
+        self.socket_path = socket_path
+        self.default_model_id: Optional[str] = None
+        self._models: Dict[str, Any] = {}
+        self._users: Dict[str, int] = {}
+        # Chargements en cours : les workers qui demandent le même run attendent le même chargement
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # Un chargement à la fois (mémoire), hors de self._lock : ni les batchs ni les connexions
+        # des modèles déjà chargés, ni leur libération ne l'attendent
+        self._load_lock = threading.Lock()
+        # Services jamais démarrés : les artefacts sont écrits par les workers, pas par le serveur
+        self._writer = BackgroundWriter()
+        self._retention = RetentionPolicy(settings.PREDICTIONS_DIR)
+
+    def acquire(self, run_id: Optional[str]) -> Tuple[str, Any]:
+        """Prédicteur d'un run (chargé au premier worker qui le demande), compté comme utilisé"""
+        from models.predictor import SegmentationPredictor
+        from models.registry import ModelRegistry
+
+        model_id = ModelRegistry.model_id(run_id)
+        while True:
+            with self._lock:
+                predictor = self._models.get(model_id)
+                if predictor is not None:
+                    self._users[model_id] = self._users.get(model_id, 0) + 1
+                    return model_id, predictor
+                loading = self._loading.get(model_id)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[model_id] = Future()
+            if not owner:
+                # Chargement lancé par un autre worker : son erreur est propagée ; le run peut avoir
+                # été déchargé entre-temps, d'où la nouvelle recherche
+                loading.result()
+                continue
+            try:
+                with self._load_lock:
+                    logger.info(f"Chargement du modèle {model_id}")
+                    predictor = SegmentationPredictor(run_id=run_id, writer=self._writer, retention=self._retention)
+            except BaseException as e:
+                with self._lock:
+                    del self._loading[model_id]
+                loading.set_exception(e)
+                raise
+            with self._lock:
+                del self._loading[model_id]
+                self._models[model_id] = predictor
+                self._users[model_id] = self._users.get(model_id, 0) + 1
+            loading.set_result(predictor)
+            return model_id, predictor
+
+    def release(self, model_id: str):
+        """Décharge un run qui n'est plus utilisé par aucun worker (le modèle par défaut est conservé)"""
+        with self._lock:
+            self._users[model_id] -= 1
+            if self._users[model_id] > 0 or model_id == self.default_model_id:
+                return
+            del self._users[model_id]
+            predictor = self._models.pop(model_id)
+        predictor.release()
+        logger.info(f"Modèle {model_id} déchargé (plus utilisé)")
+
+    def serve_forever(self):
+        # Modèle par défaut chargé avant d'écouter : les workers attendent qu'il soit prêt
+        self.default_model_id, _ = self.acquire(None)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = Listener(self.socket_path, family="AF_UNIX", authkey=_authkey())
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Serveur d'inférence prêt sur {self.socket_path} (modèle {self.default_model_id})")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:
+                    logger.warning(f"Connexion refusée: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name="inference-connection", daemon=True).start()
+        finally:
+            listener.close()
+            for predictor in self._models.values():
+                predictor.release()
+
+    def _handle(self, conn: Connection):
+        """Traite les messages d'un worker : ("load", run_id) puis ("infer", ...) jusqu'à la déconnexion"""
+        model_id, predictor = None, None
+        segments: Dict[str, shared_memory.SharedMemory] = {}
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    if message[0] == "load" and model_id is None:
+                        model_id, predictor = self.acquire(message[1])
+                        conn.send(("ok", {
+                            "model_id": model_id,
+                            "describe": predictor.backend.describe(),
+                            "memory_bytes": predictor.memory_bytes,
+                            "class_mapping": predictor.class_mapping,
+                            "framework_versions": predictor.framework_versions()
+                        }))
+                    elif message[0] == "infer" and predictor is not None:
+                        self._infer(predictor, segments, *message[1:])
+                        conn.send(("ok", None))
+                    else:
+                        conn.send(("error", f"Message inattendu: {message[0]}"))
+                except Exception as e:
+                    logger.error(f"Erreur lors de l'inférence ({model_id}): {str(e)}")
+                    conn.send(("error", f"{type(e).__name__}: {str(e)}"))
+        finally:
+            for segment in segments.values():
+                segment.close()
+            conn.close()
+            if model_id is not None:
+                self.release(model_id)
+
+    @staticmethod
+    def _infer(predictor, segments: Dict[str, shared_memory.SharedMemory], input_name: str,
+               input_shape: Tuple[int, ...], input_dtype: str, output_name: str, output_shape: Tuple[int, ...]):
+        # Segments agrandis par le worker : fermer les anciens avant d'ouvrir les nouveaux
+        for name in [name for name in segments if name not in (input_name, output_name)]:
+            segments.pop(name).close()
+        for name in (input_name, output_name):
+            if name not in segments:
+                segments[name] = _attach(name)
+
+        inputs = np.ndarray(input_shape, np.dtype(input_dtype), buffer=segments[input_name].buf)
+        outputs = np.ndarray(output_shape, np.float32, buffer=segments[output_name].buf)
+        # Batch déjà formé par le micro-batching du worker : exécuté tel quel, sans second délai d'attente
+        outputs[...] = predictor.infer_batch(inputs)
+        # Aucune vue ne doit survivre à la fermeture des segments
+        del inputs, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.MODEL_SERVER_SOCKET,
+                        help="Chemin du socket Unix (par défaut MODEL_SERVER_SOCKET)")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("MODEL_SERVER_SOCKET ou --socket requis")
+
+    logging.basicConfig(level=logging.INFO)
+    # Les modèles sont chargés dans ce processus, pas délégués à un autre serveur
+    settings.MODEL_SERVER_SOCKET = None
+    # Arrêt propre sur SIGTERM (gunicorn, orchestrateur) : socket supprimé, batching arrêté
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    InferenceServer(args.socket).serve_forever()
+
+if __name__ == "__main__":
+    main()
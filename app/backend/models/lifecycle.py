@@ -0,0 +1,128 @@
+# app/backend/models/lifecycle.py
+# Module volontairement léger : aucun import de TensorFlow/MLflow ici, pour que
+# l'API réponde aux sondes de vivacité pendant le chargement du modèle.
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from config import settings
+from models.registry import AliasStore, ModelRegistry, ModelNotReadyError, DEFAULT_ALIAS, parse_model_aliases
+from utils.history import PredictionHistory
+
+logger = logging.getLogger(__name__)
+
+# Alias publiés par l'API (PUT / DELETE /models/aliases), partagés par les workers
+ALIASES_FILE = "aliases.json"
+
+
+class PredictorState:
+    """Initialisation paresseuse du modèle par défaut dans un thread de fond, avec suivi de progression
+
+    Les modèles sont détenus par le registre : `predictor` désigne le modèle de l'alias par défaut
+    (il change lors d'une bascule), les autres alias sont chargés une fois celui-ci prêt.
+    """
+
+    NOT_STARTED = "not_started"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.status = self.NOT_STARTED
+        self.stage: Optional[str] = None
+        self.error: Optional[str] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start_loading(self):
+        """Lance le chargement du modèle en arrière-plan (sans effet s'il est déjà lancé)"""
+        with self._lock:
+            if self.status in (self.LOADING, self.READY):
+                return
+            self.status = self.LOADING
+            self.error = None
+            self._started_at = time.monotonic()
+            self._finished_at = None
+            self._done.clear()
+        threading.Thread(target=self._load, name="predictor-loader", daemon=True).start()
+
+    def set_stage(self, stage: str):
+        """Met à jour l'étape de chargement en cours (appelé par le prédicteur)"""
+        self.stage = stage
+        logger.info(f"Chargement du prédicteur: {stage}")
+
+    def _load(self):
+        try:
+            self.set_stage("importing_libraries")
+            model_registry.load(None, alias=DEFAULT_ALIAS, on_progress=self.set_stage)
+            with self._lock:
+                self.status = self.READY
+                self.stage = self.READY
+            logger.info("Prédicteur initialisé avec succès")
+            # Alias supplémentaires (MODEL_ALIASES, puis ceux publiés par les autres workers) chargés
+            # en arrière-plan, l'API est déjà prête
+            model_registry.start_alias_sync(
+                parse_model_aliases(settings.MODEL_ALIASES), settings.MODEL_ALIASES_SYNC_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation du prédicteur: {str(e)}")
+            with self._lock:
+                self.status = self.FAILED
+                self.error = f"{type(e).__name__}: {str(e)}"
+        finally:
+            self._finished_at = time.monotonic()
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin du chargement ; retourne True si le modèle est prêt"""
+        self._done.wait(timeout)
+        return self.is_ready
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == self.READY
+
+    @property
+    def predictor(self):
+        """Prédicteur de l'alias par défaut (None tant qu'il n'est pas chargé)"""
+        return model_registry.get() if self.is_ready else None
+
+    def get(self, model: Optional[str] = None):
+        """Retourne le prédicteur d'un alias ou d'un run (par défaut si None), ou lève
+        ModelNotReadyError / UnknownModelError"""
+        if not self.is_ready:
+            raise ModelNotReadyError(f"Modèle non disponible (état: {self.status})")
+        return model_registry.get(model)
+
+    def readiness(self) -> Dict[str, Any]:
+        """Retourne l'état de chargement pour la sonde de disponibilité"""
+        elapsed = None
+        if self._started_at is not None:
+            end = self._finished_at if self._finished_at is not None else time.monotonic()
+            elapsed = round(end - self._started_at, 3)
+
+        return {
+            "status": self.status,
+            "ready": self.is_ready,
+            "stage": self.stage,
+            "elapsed_seconds": elapsed,
+            "error": self.error
+        }
+
+
+# Index de l'historique : disponible même si le modèle n'est pas encore chargé
+prediction_history = PredictionHistory(settings.HISTORY_DB_PATH, settings.PREDICTIONS_DIR)
+
+# Modèles chargés (alias, budget mémoire) et instance globale du modèle par défaut
+# (chargé au démarrage de l'application, pas à l'import)
+model_registry = ModelRegistry(
+    max_bytes=settings.MODEL_REGISTRY_MAX_MB * 1024 * 1024,
+    max_models=settings.MODEL_REGISTRY_MAX_MODELS,
+    history=prediction_history,
+    alias_store=AliasStore(os.path.join(settings.MODEL_CACHE_DIR, ALIASES_FILE))
+)
+predictor_state = PredictorState()
@@ -2,104 +2,154 @@
 import os
 import json
 import numpy as np
-import tensorflow as tf
-import keras
-import mlflow
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, Any, Tuple, Optional, List
+from typing import Dict, Any, Tuple, Optional, List, Callable, Iterable
 import logging
-import tempfile
-import shutil
+import functools
+import uuid
 import base64
 import io
+import time
+from collections import deque
 from datetime import datetime
 
 from config import settings
-
-# Configuration de MLflow
-os.environ["AWS_ACCESS_KEY_ID"] = settings.AWS_ACCESS_KEY_ID
-os.environ["AWS_SECRET_ACCESS_KEY"] = settings.AWS_SECRET_ACCESS_KEY
-mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
+from models.batching import BatchScheduler
+from models.artifact_cache import ArtifactCache
+from models.backends import KerasBackend, MODEL_BACKENDS, find_backend_model, load_converted_backend
+from models.inference_server import RemoteBackend
+from utils.persistence import BackgroundWriter, RetentionPolicy, PERSISTENCE_MODES
+from utils.result_store import save_mask, RESULT_FILE
+from utils.history import PredictionHistory
+from utils.tiling import TileBlender, tile_boxes
+from utils.metrics import stage, MODEL_BATCH_SECONDS, MODEL_BATCH_SIZE
+from utils.image_processing import (
+    build_palette_lut, build_group_lut, colorize_mask, mask_to_palette_image, class_histogram, prepare_model_input
+)
 
 logger = logging.getLogger(__name__)
 
+# Artefacts qui contiennent l'image d'origine en pleine résolution
+FULL_IMAGE_OUTPUTS = {"original", "overlay", "side_by_side"}
+
+# Agrandissement du masque à la taille d'origine (voir settings.MASK_UPSAMPLING)
+MASK_UPSAMPLING_MODES = ("nearest", "bilinear")
+# Inférence sur l'image entière ou par tuiles (voir settings.INFERENCE_MODE)
+INFERENCE_MODES = ("standard", "tiled")
+
+
+def create_persistence_services(history: Optional[PredictionHistory] = None) -> Tuple[BackgroundWriter, RetentionPolicy]:
+    """Écriture des artefacts en arrière-plan et rétention des dossiers de résultats (non démarrées)"""
+    writer = BackgroundWriter(max_queue_size=settings.PERSISTENCE_QUEUE_SIZE,
+                              max_queue_bytes=settings.PERSISTENCE_QUEUE_MB * 1024 * 1024)
+    retention = RetentionPolicy(
+        settings.PREDICTIONS_DIR,
+        max_age_hours=settings.RETENTION_MAX_AGE_HOURS,
+        max_count=settings.RETENTION_MAX_COUNT,
+        max_bytes=settings.RETENTION_MAX_MB * 1024 * 1024,
+        interval_seconds=settings.RETENTION_INTERVAL_SECONDS,
+        on_prune=history.remove if history is not None else None
+    )
+    return writer, retention
+
 class SegmentationPredictor:
-    def __init__(self):
-        self.model: Optional[keras.Model] = None
+    def __init__(self, on_progress: Optional[Callable[[str], None]] = None,
+                 history: Optional[PredictionHistory] = None, run_id: Optional[str] = None,
+                 writer: Optional[BackgroundWriter] = None, retention: Optional[RetentionPolicy] = None):
+        """run_id : run MLflow à charger (par défaut MODEL_LOCAL_PATH ou settings.RUN_ID) ;
+        writer / retention : services partagés entre les modèles du registre (créés et démarrés
+        par le prédicteur s'ils ne sont pas fournis)"""
+        self._on_progress = on_progress
+        self.history = history
+        self.run_id = run_id
+        # Identifiant du modèle (clé du cache de résultats, en-tête X-Model, registre)
+        self.model_id = run_id or settings.RUN_ID or "local"
+        # Modèle Keras (moteur keras uniquement ; None pour un modèle converti ou délégué au serveur)
+        self.model: Optional[Any] = None
         self.class_mapping: Optional[Dict[str, Any]] = None
         self.id_to_group: Optional[np.ndarray] = None
+        self.group_lut: Optional[np.ndarray] = None
+        # Moteur d'inférence (Keras, TFLite ou ONNX selon settings.MODEL_BACKEND)
+        self.backend: Optional[Any] = None
+        self.artifacts_dir: Optional[str] = None
+        self._upsample_fns: Optional[Tuple[Any, Any]] = None
+        self.palette_lut = build_palette_lut(settings.GROUP_COLORS)
+        # Entrée uint8 si la normalisation est intégrée au graphe (4x moins de mémoire en file d'attente)
+        self.input_dtype = np.dtype(np.uint8) if settings.NORMALIZE_IN_GRAPH else np.dtype(np.float32)
         self._model_loaded = False
-        self.predictions_dir = "predictions"
+        self.predictions_dir = settings.PREDICTIONS_DIR
         os.makedirs(self.predictions_dir, exist_ok=True)
+        self.artifact_cache = ArtifactCache(settings.MODEL_CACHE_DIR)
+        self.batcher = BatchScheduler(
+            self.infer_batch,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            max_queue_size=settings.BATCH_QUEUE_SIZE
+        )
+        if settings.PERSISTENCE_MODE not in PERSISTENCE_MODES:
+            raise ValueError(f"PERSISTENCE_MODE invalide: {settings.PERSISTENCE_MODE} (valeurs: {', '.join(PERSISTENCE_MODES)})")
+        if settings.MASK_UPSAMPLING not in MASK_UPSAMPLING_MODES:
+            raise ValueError(f"MASK_UPSAMPLING invalide: {settings.MASK_UPSAMPLING} (valeurs: {', '.join(MASK_UPSAMPLING_MODES)})")
+        if settings.MODEL_BACKEND not in MODEL_BACKENDS:
+            raise ValueError(f"MODEL_BACKEND invalide: {settings.MODEL_BACKEND} (valeurs: {', '.join(MODEL_BACKENDS)})")
+        if settings.INFERENCE_MODE not in INFERENCE_MODES:
+            raise ValueError(f"INFERENCE_MODE invalide: {settings.INFERENCE_MODE} (valeurs: {', '.join(INFERENCE_MODES)})")
+        self._owns_services = writer is None
+        if writer is None:
+            writer, retention = create_persistence_services(history)
+        self.writer = writer
+        self.retention = retention
         self.load_model()
+        self.batcher.start()
+        if self._owns_services:
+            self.writer.start()
+            self.retention.start()
+    
+    def release(self):
+        """Arrête le batching du modèle (les services partagés restent actifs)"""
+        self.batcher.stop()
+        if isinstance(self.backend, RemoteBackend):
+            self.backend.close()
+    
+    def shutdown(self):
+        """Arrête les threads de fond (batching, écriture des artefacts en attente, rétention)"""
+        self.release()
+        if self._owns_services:
+            self.writer.stop()
+            self.retention.stop()
+    
+    @property
+    def memory_bytes(self) -> int:
+        """Mémoire estimée du modèle (poids), pour le budget du registre"""
+        return self.backend.memory_bytes() if self.backend is not None else 0
     
     def load_model(self):
-        """Charge le modèle et la configuration depuis MLflow"""
+        """Charge le modèle et la configuration depuis le cache local ou MLflow"""
         try:
-            logger.info(f"Chargement du modèle depuis MLflow run_id: {settings.RUN_ID}")
+            if settings.MODEL_SERVER_SOCKET:
+                # Modèle détenu par le serveur d'inférence local, partagé par tous les workers : ni
+                # artefacts ni TensorFlow dans le worker, le mapping des classes vient du serveur
+                self._report_progress("waiting_model_server")
+                self.backend = RemoteBackend(settings.MODEL_SERVER_SOCKET, self.run_id, settings.MODEL_SERVER_CONNECT_TIMEOUT)
+                self.class_mapping = self.backend.class_mapping
+            else:
+                self._load_local_model()
             
-            # Créer un client MLflow
-            client = mlflow.MlflowClient()
+            # Reconstruire id_to_group
+            self.id_to_group = np.array(self.class_mapping['id_to_group'], dtype=np.uint8)
+            # Table identifiant Cityscapes brut -> groupe (cartes *_labelIds.png)
+            self.group_lut = build_group_lut(self.id_to_group)
             
-            # Créer un répertoire temporaire pour télécharger les artefacts
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Télécharger le modèle complet
-                model_path = client.download_artifacts(
-                    settings.RUN_ID, 
-                    "model",
-                    dst_path=temp_dir
-                )
-                
-                # Le modèle Keras devrait être dans model/data/model.keras
-                keras_model_path = os.path.join(model_path, "data", "model.keras")
-                
-                if not os.path.exists(keras_model_path):
-                    # Essayer d'autres chemins possibles
-                    keras_model_path = os.path.join(model_path, "model.keras")
-                    if not os.path.exists(keras_model_path):
-                        # Chercher le fichier .keras dans le répertoire
-                        for root, dirs, files in os.walk(model_path):
-                            for file in files:
-                                if file.endswith('.keras'):
-                                    keras_model_path = os.path.join(root, file)
-                                    break
-                
-                logger.info(f"Chargement du modèle depuis: {keras_model_path}")
-                
-                # Charger le modèle avec Keras 3.x
-                self.model = keras.saving.load_model(keras_model_path, compile=False)
-                
-                # Recompiler le modèle avec les métriques appropriées
-                self.model.compile(
-                    optimizer=keras.optimizers.Adam(learning_rate=0.0001),
-                    loss=keras.losses.SparseCategoricalCrossentropy(),
-                    metrics=[keras.metrics.SparseCategoricalAccuracy()]
-                )
-                
-                logger.info("Modèle chargé et compilé avec succès")
-                
-                # Télécharger le mapping des classes
-                mapping_path = client.download_artifacts(
-                    settings.RUN_ID, 
-                    "class_mapping.json",
-                    dst_path=temp_dir
-                )
-                
-                # Lire le fichier JSON
-                with open(mapping_path, 'r') as f:
-                    self.class_mapping = json.load(f)
-                
-                # Reconstruire id_to_group
-                self.id_to_group = np.array(self.class_mapping['id_to_group'], dtype=np.uint8)
-                
-                self._model_loaded = True
-                logger.info("Configuration chargée avec succès")
-                
-                # Afficher les informations du modèle
-                logger.info(f"Modèle: {self.model.name}")
-                logger.info(f"Input shape: {self.model.input_shape}")
-                logger.info(f"Output shape: {self.model.output_shape}")
-                logger.info(f"Nombre de paramètres: {self.model.count_params():,}")
+            self._model_loaded = True
+            logger.info("Configuration chargée avec succès")
+            
+            # Afficher les informations du modèle
+            for key, value in self.backend.describe().items():
+                logger.info(f"{key}: {value}")
+            
+            # Préchauffer la fonction d'inférence (traçage pour Keras)
+            self._report_progress("warming_up")
+            self.warmup()
             
         except Exception as e:
             logger.error(f"Erreur lors du chargement du modèle: {str(e)}")
@@ -109,39 +159,237 @@ class SegmentationPredictor:
             self._model_loaded = False
             raise
     
-    def preprocess_image(self, image: Image.Image) -> tf.Tensor:
-        """Préprocesse l'image pour la prédiction"""
-        try:
-            # Convertir en RGB si nécessaire
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convertir en numpy array
-            img_array = np.array(image, dtype=np.float32)
-            
-            # Redimensionner avec TensorFlow
-            img_resized = tf.image.resize(
-                img_array, 
-                settings.IMG_SIZE, 
-                method=tf.image.ResizeMethod.BILINEAR,
-                antialias=True
+    def _load_local_model(self):
+        """Charge le modèle (Keras ou converti) et le mapping des classes depuis le cache local ou MLflow"""
+        self._report_progress("resolving_artifacts")
+        artifacts_dir = self._resolve_artifacts_dir()
+        self.artifacts_dir = artifacts_dir
+        
+        self._report_progress("loading_model")
+        
+        if settings.MODEL_BACKEND == "keras":
+            self._load_keras_model(artifacts_dir)
+        else:
+            # Modèle converti (scripts.convert_model) : le modèle Keras n'est pas chargé
+            # MODEL_BACKEND_PATH ne concerne que le modèle par défaut (pas les runs chargés par le registre)
+            backend_path = settings.MODEL_BACKEND_PATH if self.run_id is None else None
+            model_path = backend_path or find_backend_model(artifacts_dir, settings.MODEL_BACKEND)
+            logger.info(f"Chargement du modèle {settings.MODEL_BACKEND} depuis: {model_path}")
+            self.backend = load_converted_backend(settings.MODEL_BACKEND, model_path, settings.MODEL_NUM_THREADS)
+        
+        # Lire le mapping des classes
+        mapping_path = os.path.join(artifacts_dir, "class_mapping.json")
+        with open(mapping_path, 'r') as f:
+            self.class_mapping = json.load(f)
+    
+    def _load_keras_model(self, artifacts_dir: str):
+        """Charge le modèle Keras (model/data/model.keras) et construit sa fonction d'inférence tracée"""
+        import keras
+        
+        keras_model_path = self._find_keras_model(artifacts_dir)
+        logger.info(f"Chargement du modèle depuis: {keras_model_path}")
+        
+        # Charger le modèle avec Keras 3.x
+        self.model = keras.saving.load_model(keras_model_path, compile=False)
+        
+        # La compilation (optimiseur, loss, métriques) n'est utile que hors mode inférence
+        if not settings.INFERENCE_ONLY:
+            self.model.compile(
+                optimizer=keras.optimizers.Adam(learning_rate=0.0001),
+                loss=keras.losses.SparseCategoricalCrossentropy(),
+                metrics=[keras.metrics.SparseCategoricalAccuracy()]
             )
-            
-            # Normaliser [0,1]
-            img_normalized = img_resized / 255.0
+            logger.info("Modèle chargé et compilé avec succès")
+        else:
+            logger.info("Modèle chargé avec succès (mode inférence, sans compilation)")
+        
+        self.backend = KerasBackend(self.model, settings.IMG_SIZE, self.input_dtype, settings.NORMALIZE_IN_GRAPH)
+    
+    def _report_progress(self, stage: str):
+        """Signale l'étape de chargement en cours (pour la sonde de disponibilité)"""
+        if self._on_progress is not None:
+            self._on_progress(stage)
+    
+    def _resolve_artifacts_dir(self) -> str:
+        """Retourne le répertoire contenant model/ et class_mapping.json"""
+        if settings.MODEL_LOCAL_PATH and self.run_id is None:
+            logger.info(f"Chargement du modèle depuis le chemin local: {settings.MODEL_LOCAL_PATH}")
+            return settings.MODEL_LOCAL_PATH
+        
+        run_id = self.run_id or settings.RUN_ID
+        logger.info(f"Chargement du modèle depuis MLflow run_id: {run_id}")
+        return self.artifact_cache.fetch(
+            run_id,
+            self._download_artifacts,
+            offline=settings.MODEL_OFFLINE
+        )
+    
+    @staticmethod
+    def _download_artifacts(run_id: str, dst_dir: str):
+        """Télécharge le modèle et le mapping des classes depuis MLflow"""
+        # Import et configuration de MLflow uniquement lorsqu'un téléchargement est nécessaire
+        import mlflow
+        
+        if settings.AWS_ACCESS_KEY_ID:
+            os.environ["AWS_ACCESS_KEY_ID"] = settings.AWS_ACCESS_KEY_ID
+        if settings.AWS_SECRET_ACCESS_KEY:
+            os.environ["AWS_SECRET_ACCESS_KEY"] = settings.AWS_SECRET_ACCESS_KEY
+        mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
+        
+        # Créer un client MLflow
+        client = mlflow.MlflowClient()
+        
+        # Télécharger le modèle complet
+        client.download_artifacts(run_id, "model", dst_path=dst_dir)
+        
+        # Télécharger le mapping des classes
+        client.download_artifacts(run_id, "class_mapping.json", dst_path=dst_dir)
+    
+    @staticmethod
+    def _find_keras_model(artifacts_dir: str) -> str:
+        """Cherche le fichier .keras dans les emplacements connus puis dans toute l'arborescence"""
+        candidates = [
+            os.path.join(artifacts_dir, "model", "data", "model.keras"),
+            os.path.join(artifacts_dir, "model", "model.keras"),
+            os.path.join(artifacts_dir, "model.keras")
+        ]
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        
+        for root, dirs, files in os.walk(artifacts_dir):
+            for file in files:
+                if file.endswith('.keras'):
+                    return os.path.join(root, file)
+        
+        raise FileNotFoundError(f"Aucun fichier .keras trouvé dans {artifacts_dir}")
+    
+    def preprocess_image(self, image: Image.Image, draft: bool = False) -> np.ndarray:
+        """Préprocesse l'image pour la prédiction : batch (1, H, W, 3)
+        
+        Le redimensionnement se fait en uint8 ; seul le petit tenseur à la taille du modèle
+        est converti en float (ou aucun si la normalisation est intégrée au graphe).
+        """
+        try:
+            img_resized = prepare_model_input(image, settings.IMG_SIZE, draft=draft)
             
             # Ajouter dimension batch
-            img_batch = tf.expand_dims(img_normalized, axis=0)
-            
-            # S'assurer que le tensor a la bonne forme
-            img_batch = tf.ensure_shape(img_batch, [1, settings.IMG_SIZE[0], settings.IMG_SIZE[1], 3])
-            
-            return img_batch
+            return self.prepare_batch(img_resized[np.newaxis, ...])
             
         except Exception as e:
             logger.error(f"Erreur lors du préprocessing de l'image: {str(e)}")
             raise
     
+    def prepare_batch(self, pixels: np.ndarray) -> np.ndarray:
+        """Convertit un batch uint8 (N, H, W, 3) à la taille du modèle au type d'entrée du modèle
+        
+        Utilisé par l'API et par les scripts hors ligne (pipelines tf.data en uint8) : normalisation
+        [0,1] en float32, sauf si elle est intégrée au graphe (entrée uint8 inchangée).
+        """
+        if settings.NORMALIZE_IN_GRAPH:
+            return pixels
+        return pixels.astype(np.float32) / 255.0
+    
+    def _build_upsample_fns(self):
+        """Construit les fonctions tracées de l'agrandissement bilinéaire des logits
+        
+        widen : logits (h, w, C) élargis à la largeur cible, hauteur du modèle conservée.
+        band : lignes [start, stop) du masque final, interpolées verticalement puis réduites par
+        argmax ; seule une bande de logits float32 pleine largeur existe à la fois. Le résultat est
+        identique à tf.image.resize sur l'image entière (centres de pixels, interpolation séparable).
+        Construites à la première utilisation : TensorFlow n'est importé que si le mode bilinéaire sert.
+        """
+        import tensorflow as tf
+        
+        num_classes = settings.NUM_CLASSES
+        
+        @tf.function(input_signature=[
+            tf.TensorSpec([None, None, num_classes], tf.float32), tf.TensorSpec([], tf.int32)
+        ])
+        def widen(logits, width):
+            return tf.image.resize(logits[tf.newaxis], (tf.shape(logits)[0], width), method="bilinear")[0]
+        
+        @tf.function(input_signature=[
+            tf.TensorSpec([None, None, num_classes], tf.float32),
+            tf.TensorSpec([], tf.int32), tf.TensorSpec([], tf.int32), tf.TensorSpec([], tf.int32)
+        ])
+        def band(wide, height, start, stop):
+            source_height = tf.shape(wide)[0]
+            scale = tf.cast(source_height, tf.float32) / tf.cast(height, tf.float32)
+            rows = (tf.cast(tf.range(start, stop), tf.float32) + 0.5) * scale - 0.5
+            rows = tf.clip_by_value(rows, 0.0, tf.cast(source_height - 1, tf.float32))
+            top = tf.cast(tf.floor(rows), tf.int32)
+            bottom = tf.minimum(top + 1, source_height - 1)
+            weight = (rows - tf.cast(top, tf.float32))[:, tf.newaxis, tf.newaxis]
+            upper = tf.gather(wide, top)
+            lower = tf.gather(wide, bottom)
+            return tf.cast(tf.argmax(upper + (lower - upper) * weight, axis=-1), tf.uint8)
+        
+        return widen, band
+    
+    def upsample_mask(self, predictions: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Masque de classes à la taille (largeur, hauteur) par interpolation bilinéaire des logits (H, W, C)
+        
+        Traité par bandes de lignes (settings.UPSAMPLE_TILE_PIXELS) : pour une image 4096x4096,
+        la mémoire reste de l'ordre de quelques dizaines de Mo au lieu de 512 Mo de logits.
+        """
+        width, height = size
+        if self._upsample_fns is None:
+            self._upsample_fns = self._build_upsample_fns()
+        widen, band = self._upsample_fns
+        wide = widen(np.asarray(predictions, dtype=np.float32), width)
+        rows = max(1, settings.UPSAMPLE_TILE_PIXELS // width)
+        mask = np.empty((height, width), dtype=np.uint8)
+        for start in range(0, height, rows):
+            stop = min(height, start + rows)
+            mask[start:stop] = band(wide, height, start, stop).numpy()
+        return mask
+    
+    def infer_tiled(self, image: Image.Image, tile_size: int, overlap: int) -> Tuple[np.ndarray, int]:
+        """Inférence par tuiles : logits assemblés (H, W, C) à la résolution effective des tuiles, nombre de tuiles
+        
+        Chaque tuile de tile_size pixels est ramenée à la taille du modèle : les petits objets
+        (piétons, poteaux, panneaux) gardent leur résolution. Les tuiles passent par la file de
+        micro-batching, où celles d'une ou plusieurs images partagent les mêmes passes du modèle ;
+        elles sont soumises par fenêtre glissante (deux batchs au plus) pour ne pas saturer la file.
+        """
+        boxes = tile_boxes(image.size, tile_size, overlap)
+        if len(boxes) > settings.TILE_MAX_COUNT:
+            raise ValueError(f"Trop de tuiles pour cette image: {len(boxes)} (max {settings.TILE_MAX_COUNT})")
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        blender = TileBlender(image.size, tile_size, overlap, settings.IMG_SIZE, settings.NUM_CLASSES)
+        window = 2 * settings.BATCH_MAX_SIZE
+        pending = deque()
+        for box in boxes:
+            pending.append((box, self.batcher.submit(self.preprocess_image(image.crop(box))[0])))
+            if len(pending) >= window:
+                done_box, future = pending.popleft()
+                blender.add(done_box, future.result())
+        while pending:
+            done_box, future = pending.popleft()
+            blender.add(done_box, future.result())
+        return blender.result(), len(boxes)
+    
+    def warmup(self):
+        """Exécute des passes à vide pour que la première requête ne paie pas le coût du traçage"""
+        start = datetime.now()
+        for batch_size in sorted({1, settings.BATCH_MAX_SIZE}):
+            dummy = np.zeros((batch_size, settings.IMG_SIZE[0], settings.IMG_SIZE[1], 3),
+                             dtype=self.input_dtype)
+            self.backend.infer(dummy)
+        elapsed = (datetime.now() - start).total_seconds()
+        logger.info(f"Fonction d'inférence préchauffée en {elapsed:.2f}s")
+    
+    def infer_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Exécute le modèle sur un batch d'images prétraitées (N, H, W, 3), sans file d'attente"""
+        start = time.perf_counter()
+        outputs = self.backend.infer(batch)
+        MODEL_BATCH_SECONDS.observe(time.perf_counter() - start)
+        MODEL_BATCH_SIZE.observe(len(batch))
+        return outputs
+    
     def image_to_base64(self, image: Image.Image) -> str:
         """Convertit une image PIL en base64"""
         buffered = io.BytesIO()
@@ -150,14 +398,31 @@ class SegmentationPredictor:
         return f"data:image/png;base64,{img_str}"
     
     def create_colored_mask(self, mask: np.ndarray) -> np.ndarray:
-        """Crée un masque coloré à partir du masque de prédiction"""
-        colored_mask = np.zeros((*mask.shape, 3), dtype=np.uint8)
+        """Crée un masque coloré à partir du masque de prédiction (indexation dans la palette)"""
+        return colorize_mask(mask, self.palette_lut)
+    
+    def create_mask_image(self, mask: np.ndarray) -> Image.Image:
+        """Crée l'image du masque en mode palette ("P"), plus légère à encoder qu'une image RGB"""
+        return mask_to_palette_image(mask, self.palette_lut[:settings.NUM_CLASSES])
+    
+    def compute_class_statistics(self, mask: np.ndarray) -> List[Dict[str, Any]]:
+        """Calcule la distribution des classes, triée par pourcentage décroissant"""
+        counts = class_histogram(mask, settings.NUM_CLASSES)
+        total_pixels = mask.size
         
-        for class_id in range(settings.NUM_CLASSES):
-            mask_for_class = (mask == class_id)
-            colored_mask[mask_for_class] = settings.GROUP_COLORS[class_id]
+        class_stats = [
+            {
+                'class_id': class_id,
+                'class_name': settings.GROUP_NAMES[class_id],
+                'pixel_count': int(counts[class_id]),
+                'percentage': float(counts[class_id] / total_pixels * 100)
+            }
+            for class_id in range(settings.NUM_CLASSES)
+        ]
         
-        return colored_mask
+        # Trier par pourcentage décroissant
+        class_stats.sort(key=lambda x: x['percentage'], reverse=True)
+        return class_stats
     
     def create_overlay_visualization(self, original_img: Image.Image, colored_mask: np.ndarray) -> Image.Image:
         """Crée une superposition semi-transparente du masque sur l'image originale"""
@@ -227,133 +492,220 @@ class SegmentationPredictor:
         
         return viz_img
     
-    def predict_with_artifacts(self, image: Image.Image, filename: str = "image.png") -> Dict[str, Any]:
-        """Effectue la prédiction et génère tous les artefacts"""
-        if not self._model_loaded or self.model is None:
+    def resize_mask(self, mask: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Redimensionne un masque de classes (uint8) à la taille (largeur, hauteur) donnée"""
+        mask = mask.astype(np.uint8)
+        if mask.shape[:2] == (size[1], size[0]):
+            return mask
+        return np.array(Image.fromarray(mask).resize(size, Image.NEAREST))
+    
+    def predict(self, image: Image.Image, filename: str = "image.png",
+                outputs: Optional[Iterable[str]] = None, sync_outputs: bool = False,
+                upsampling: Optional[str] = None, inference: Optional[str] = None,
+                tile_size: Optional[int] = None, tile_overlap: Optional[int] = None,
+                source: Optional[bytes] = None) -> Dict[str, Any]:
+        """Effectue la prédiction et génère les artefacts demandés (images PIL non encodées)
+        
+        outputs: sous-ensemble de settings.ARTIFACT_FILES ; settings.DEFAULT_OUTPUTS si None.
+        L'image originale n'est renvoyée que si "original" est demandé explicitement.
+        sync_outputs: écrit les artefacts demandés sur disque avant de retourner (pour les servir
+        par URL) ; le reste de la persistance se fait en arrière-plan selon PERSISTENCE_MODE.
+        upsampling: agrandissement du masque à la taille d'origine (nearest, bilinear) ;
+        settings.MASK_UPSAMPLING si None. Le résultat contient le masque à la résolution du
+        modèle ('mask') et à la taille d'origine ('full_mask').
+        inference: standard ou tiled (settings.INFERENCE_MODE si None) ; en mode tiled, 'mask' est
+        à la résolution effective des tuiles. tile_size / tile_overlap : settings.TILE_* si None.
+        source: fichier encodé dont provient l'image ; la persistance full le conserve à la place
+        des pixels décodés jusqu'à l'écriture.
+        """
+        if not self._model_loaded or self.backend is None:
             raise RuntimeError("Le modèle n'est pas chargé correctement")
         
+        outputs = set(settings.DEFAULT_OUTPUTS if outputs is None else outputs)
+        mode = settings.PERSISTENCE_MODE
+        upsampling = upsampling or settings.MASK_UPSAMPLING
+        if upsampling not in MASK_UPSAMPLING_MODES:
+            raise ValueError(f"Agrandissement du masque invalide: {upsampling}")
+        inference = inference or settings.INFERENCE_MODE
+        if inference not in INFERENCE_MODES:
+            raise ValueError(f"Mode d'inférence invalide: {inference}")
+        
+        # Taille d'origine (un JPEG peut ensuite être décodé à échelle réduite)
+        original_size = image.size
+        
         try:
-            # Créer le dossier de résultats avec timestamp
+            # Dossier de résultats avec timestamp et suffixe unique (plusieurs prédictions par seconde)
             timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            result_dir = os.path.join(self.predictions_dir, f"{timestamp}-result")
-            os.makedirs(result_dir, exist_ok=True)
-            
-            # Sauvegarder l'image originale
-            original_path = os.path.join(result_dir, "original.png")
-            image.save(original_path)
-            
-            # Préprocesser l'image
-            img_tensor = self.preprocess_image(image)
-            
-            logger.info(f"Forme du tensor d'entrée: {img_tensor.shape}")
-            
-            # Faire la prédiction
-            predictions = self.model.predict(img_tensor, verbose=0)
+            result_dir = os.path.join(self.predictions_dir, f"{timestamp}-{uuid.uuid4().hex[:8]}-result")
+            
+            # Inférence par tuiles (image pleine résolution), ou sur l'image entière avec décodage
+            # JPEG réduit si ni la réponse ni la persistance n'ont besoin de la pleine résolution
+            if inference == "tiled":
+                tile_size = tile_size or settings.TILE_SIZE
+                tile_overlap = settings.TILE_OVERLAP if tile_overlap is None else tile_overlap
+                with stage("inference"):
+                    predictions, tiles = self.infer_tiled(image, tile_size, tile_overlap)
+                inference_info = {'mode': inference, 'tiles': tiles, 'tile_size': tile_size, 'tile_overlap': tile_overlap}
+            else:
+                needs_full_image = bool(outputs & FULL_IMAGE_OUTPUTS) or mode == "full"
+                # Décodage des pixels (paresseux avec PIL) et redimensionnement
+                with stage("preprocess"):
+                    img_tensor = self.preprocess_image(image, draft=not needs_full_image)
+                
+                logger.info(f"Forme du tensor d'entrée: {img_tensor.shape}")
+                
+                # Faire la prédiction via la file de micro-batching (attente du batch comprise)
+                with stage("inference"):
+                    predictions = self.batcher.submit(img_tensor[0]).result()
+                inference_info = {'mode': inference, 'tiles': 1}
             
             logger.info(f"Forme des prédictions: {predictions.shape}")
             
             # Convertir en masque de classes
-            pred_mask = tf.argmax(predictions, axis=-1)[0].numpy()
+            with stage("argmax"):
+                pred_mask = np.argmax(predictions, axis=-1).astype(np.uint8)
             
             # Calculer les statistiques
-            unique_classes, counts = np.unique(pred_mask, return_counts=True)
-            total_pixels = pred_mask.size
+            with stage("statistics"):
+                class_stats = self.compute_class_statistics(pred_mask)
             
-            class_stats = []
-            for class_id in range(settings.NUM_CLASSES):
-                if class_id in unique_classes:
-                    idx = np.where(unique_classes == class_id)[0][0]
-                    count = counts[idx]
+            # Masque à la taille originale : logits interpolés, ou masque de classes (1 canal) agrandi
+            with stage("upsample"):
+                if upsampling == "bilinear":
+                    full_mask = self.upsample_mask(predictions, original_size)
                 else:
-                    count = 0
-                
-                class_name = settings.GROUP_NAMES[class_id]
-                percentage = (count / total_pixels) * 100
-                
-                class_stats.append({
-                    'class_id': int(class_id),
-                    'class_name': class_name,
-                    'pixel_count': int(count),
-                    'percentage': float(percentage)
-                })
-            
-            # Trier par pourcentage décroissant
-            class_stats.sort(key=lambda x: x['percentage'], reverse=True)
-            
-            # Créer le masque coloré
-            pred_colored = self.create_colored_mask(pred_mask)
-            
-            # Redimensionner à la taille originale
-            original_size = image.size
-            if pred_colored.shape[:2] != (original_size[1], original_size[0]):
-                mask_img = Image.fromarray(pred_colored)
-                mask_img = mask_img.resize(original_size, Image.NEAREST)
-                pred_colored = np.array(mask_img)
-            else:
-                mask_img = Image.fromarray(pred_colored)
+                    full_mask = self.resize_mask(pred_mask, original_size)
+            with stage("colorize"):
+                mask_img = self.create_mask_image(full_mask)
             
-            # Sauvegarder le masque
-            mask_path = os.path.join(result_dir, "prediction_mask.png")
-            mask_img.save(mask_path)
+            artifacts = {}
+            if "original" in outputs:
+                artifacts['original'] = image
+            if "prediction_mask" in outputs:
+                artifacts['prediction_mask'] = mask_img
             
-            # Créer les visualisations
-            overlay_img = self.create_overlay_visualization(image, pred_colored)
-            overlay_path = os.path.join(result_dir, "visualization_overlay.png")
-            overlay_img.save(overlay_path)
+            # Créer uniquement les visualisations demandées
+            if "overlay" in outputs:
+                with stage("overlay"):
+                    artifacts['overlay'] = self.create_overlay_visualization(image, self.create_colored_mask(full_mask))
             
-            side_by_side_img = self.create_side_by_side_visualization(image, mask_img, class_stats)
-            side_by_side_path = os.path.join(result_dir, "visualization_side_by_side.png")
-            side_by_side_img.save(side_by_side_path)
+            if "side_by_side" in outputs:
+                with stage("side_by_side"):
+                    artifacts['side_by_side'] = self.create_side_by_side_visualization(image, mask_img, class_stats)
             
             # Préparer les résultats
             result_light = {
                 'class_statistics': class_stats,
-                'image_size': list(image.size),
+                'image_size': list(original_size),
                 'segmented_image_size': list(pred_mask.shape),
                 'num_classes': settings.NUM_CLASSES,
+                'inference': inference_info,
                 'dominant_class': class_stats[0]['class_name'] if class_stats else '',
                 'dominant_class_percentage': class_stats[0]['percentage'] if class_stats else 0.0,
                 'timestamp': timestamp,
-                'filename': filename
+                'filename': filename,
+                'model': self.model_id
             }
             
-            result_full = {
-                **result_light,
-                'prediction_mask': pred_mask.tolist(),
-                'colored_mask': pred_colored.tolist()
-            }
-            
-            # Sauvegarder les JSON
-            with open(os.path.join(result_dir, "prediction_result.json"), "w") as f:
-                json.dump(result_light, f, indent=2)
+            # Artefacts servis par URL : écrits avant la réponse
+            if sync_outputs:
+                with stage("write"):
+                    self._save_images(result_dir, artifacts)
+            
+            # Persistance en arrière-plan (n'allonge pas le temps de réponse) : la tâche ne retient
+            # que des entrées compactes (fichier reçu, masques uint8), les images pleine résolution
+            # sont produites à l'écriture
+            if mode != "off":
+                original = None
+                if mode == "full":
+                    original = source if source is not None else image
+                # Masque issu des logits interpolés : il ne se déduit pas du masque du modèle
+                kept_mask = full_mask if upsampling == "bilinear" else None
+                nbytes = pred_mask.nbytes + (kept_mask.nbytes if kept_mask is not None else 0)
+                if isinstance(original, bytes):
+                    nbytes += len(original)
+                elif original is not None:
+                    nbytes += original.width * original.height * len(original.getbands())
+                self.writer.submit(functools.partial(
+                    self._persist_artifacts, result_dir, mode, original, pred_mask,
+                    kept_mask, original_size, class_stats, result_light
+                ), nbytes=nbytes)
             
-            with open(os.path.join(result_dir, "prediction_result_full.json"), "w") as f:
-                json.dump(result_full, f, indent=2)
+            logger.info(f"Prédiction terminée. Classe dominante: {class_stats[0]['class_name']} ({class_stats[0]['percentage']:.1f}%)")
             
-            # Préparer la réponse avec les images en base64
-            response = {
+            return {
                 **result_light,
-                'images': {
-                    'original': self.image_to_base64(image),
-                    'prediction_mask': self.image_to_base64(mask_img),
-                    'overlay': self.image_to_base64(overlay_img),
-                    'side_by_side': self.image_to_base64(side_by_side_img)
-                },
-                'artifacts_path': result_dir
+                'mask': pred_mask,
+                'full_mask': full_mask,
+                'artifacts': artifacts,
+                'artifacts_path': result_dir if (mode != "off" or sync_outputs) else ''
             }
             
-            logger.info(f"Prédiction terminée. Classe dominante: {class_stats[0]['class_name']} ({class_stats[0]['percentage']:.1f}%)")
-            logger.info(f"Artefacts sauvegardés dans: {result_dir}")
-            
-            return response
-            
         except Exception as e:
             logger.error(f"Erreur lors de la prédiction: {str(e)}")
             raise
     
+    def _save_images(self, result_dir: str, images: Dict[str, Image.Image]):
+        """Écrit des artefacts PNG dans le dossier de résultats (sans écraser ceux déjà présents)"""
+        os.makedirs(result_dir, exist_ok=True)
+        for name, img in images.items():
+            path = os.path.join(result_dir, settings.ARTIFACT_FILES[name])
+            if not os.path.exists(path):
+                img.save(path)
+    
+    def _persist_artifacts(self, result_dir: str, mode: str, original, pred_mask: np.ndarray,
+                           full_mask: Optional[np.ndarray], original_size: Tuple[int, int],
+                           class_stats: List[Dict], result_light: Dict[str, Any]):
+        """Persiste les artefacts d'une prédiction (exécuté par le thread d'écriture)
+        
+        light : masque PNG + JSON des statistiques ; full : + image originale (fichier reçu ou
+        image PIL), visualisations et masque de classes (.npz). full_mask : masque à la taille
+        d'origine, agrandi depuis pred_mask si None.
+        """
+        # Rendu des images pleine résolution et écritures disque (hors du temps de réponse)
+        with stage("persist"):
+            if full_mask is None:
+                full_mask = self.resize_mask(pred_mask, original_size)
+            mask_img = self.create_mask_image(full_mask)
+            images = {'prediction_mask': mask_img}
+            if mode == "full":
+                image = Image.open(io.BytesIO(original)) if isinstance(original, bytes) else original
+                images['original'] = image
+                # Visualisations déjà écrites avant la réponse (sync_outputs) : pas de second rendu
+                written = set(os.listdir(result_dir)) if os.path.isdir(result_dir) else set()
+                if settings.ARTIFACT_FILES['overlay'] not in written:
+                    images['overlay'] = self.create_overlay_visualization(image, self.create_colored_mask(full_mask))
+                if settings.ARTIFACT_FILES['side_by_side'] not in written:
+                    images['side_by_side'] = self.create_side_by_side_visualization(image, mask_img, class_stats)
+            self._save_images(result_dir, images)
+            
+            # Masque de classes compressé (le masque coloré se déduit des identifiants de classes)
+            if mode == "full":
+                save_mask(result_dir, pred_mask)
+            
+            # Écrit en dernier : un dossier listé par /predictions est complet
+            with open(os.path.join(result_dir, RESULT_FILE), "w") as f:
+                json.dump(result_light, f, indent=2)
+        
+        if self.history is not None:
+            self.history.add(os.path.basename(result_dir), result_light)
+        
+        logger.info(f"Artefacts sauvegardés dans: {result_dir}")
+    
+    def predict_with_artifacts(self, image: Image.Image, filename: str = "image.png",
+                               outputs: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Effectue la prédiction et renvoie les artefacts demandés encodés en base64"""
+        result = self.predict(image, filename=filename, outputs=outputs)
+        artifacts = result.pop('artifacts')
+        result.pop('mask')
+        result.pop('full_mask')
+        with stage("encode"):
+            result['images'] = {name: self.image_to_base64(img) for name, img in artifacts.items()}
+        return result
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Retourne les informations sur le modèle"""
-        if not self._model_loaded or self.model is None:
+        if not self._model_loaded or self.backend is None:
             return {
                 "status": "Model not loaded",
                 "model_loaded": False
@@ -362,21 +714,21 @@ class SegmentationPredictor:
         return {
             "status": "Model loaded successfully",
             "model_loaded": True,
-            "model_name": self.model.name if hasattr(self.model, 'name') else "MobileNetV2-UNet",
-            "input_shape": list(self.model.input_shape),
-            "output_shape": list(self.model.output_shape),
-            "num_parameters": int(self.model.count_params()),
+            "model_name": "MobileNetV2-UNet",
+            "model_id": self.model_id,
+            "model_memory_bytes": self.memory_bytes,
+            **self.backend.describe(),
             "num_classes": settings.NUM_CLASSES,
+            "inference_only": settings.INFERENCE_ONLY,
             "class_names": settings.GROUP_NAMES,
             "class_colors": settings.GROUP_COLORS,
-            "tensorflow_version": tf.__version__,
-            "keras_version": keras.__version__
+            **self.framework_versions()
         }
-
-# Instance globale du prédicteur
-try:
-    predictor = SegmentationPredictor()
-    logger.info("Prédicteur initialisé avec succès")
-except Exception as e:
-    logger.error(f"Erreur lors de l'initialisation du prédicteur: {str(e)}")
-    predictor = None
\ No newline at end of file
+    
+    def framework_versions(self) -> Dict[str, str]:
+        """Versions de TensorFlow / Keras du processus qui exécute le modèle (le serveur d'inférence en mode délégué)"""
+        if isinstance(self.backend, RemoteBackend):
+            return self.backend.framework_versions
+        import tensorflow as tf
+        import keras
+        return {"tensorflow_version": tf.__version__, "keras_version": keras.__version__}
@@ -0,0 +1,331 @@
+# app/backend/models/registry.py
+# Registre des modèles chargés : plusieurs runs MLflow en mémoire sous un budget (éviction LRU des
+# modèles sans alias), alias (default, staging...) basculés atomiquement une fois le nouveau modèle
+# chargé et préchauffé, partagés entre les workers par un fichier. Module léger : le prédicteur
+# (TensorFlow) n'est importé qu'au chargement.
+import os
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models.artifact_cache import file_lock
+from utils.history import PredictionHistory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALIAS = "default"
+
+
+class ModelNotReadyError(RuntimeError):
+    """Levée lorsqu'une prédiction est demandée avant la fin du chargement du modèle"""
+
+
+class UnknownModelError(KeyError):
+    """Levée lorsqu'un modèle demandé n'est ni un alias ni un run chargé ou en cours de chargement"""
+
+
+def parse_model_aliases(value: Optional[str]) -> Dict[str, str]:
+    """Alias configurés sous la forme "staging=<run_id>,canary=<run_id>" """
+    aliases = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        alias, sep, run_id = entry.partition("=")
+        if not sep or not alias.strip() or not run_id.strip():
+            raise ValueError(f"MODEL_ALIASES invalide: {entry!r} (attendu alias=run_id)")
+        aliases[alias.strip()] = run_id.strip()
+    return aliases
+
+
+class AliasStore:
+    """Alias modifiés par l'API, partagés par les workers d'une machine via un fichier JSON
+
+    {alias: run_id} ; un alias supprimé est conservé avec la valeur null pour ne pas être
+    rechargé depuis MODEL_ALIASES au redémarrage d'un worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature: Optional[Tuple[int, int]] = None
+
+    def read(self) -> Dict[str, Optional[str]]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Fichier d'alias illisible ({self.path}): {str(e)}")
+            return {}
+
+    def update(self, alias: str, run_id: Optional[str]):
+        """Enregistre un alias (None : supprimé) ; lecture-écriture sous verrou, renommage atomique"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with file_lock(self.path + ".lock"):
+            aliases = self.read()
+            aliases[alias] = run_id
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(aliases, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def changed(self) -> Optional[Dict[str, Optional[str]]]:
+        """Contenu du fichier s'il a changé depuis le dernier appel, None sinon"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        return self.read()
+
+
+class ModelRegistry:
+    """Modèles chargés par identifiant de run, du moins au plus récemment utilisé
+
+    Les modèles désignés par un alias ne sont jamais évincés ; les autres (ex. l'ancien modèle
+    par défaut après une bascule) restent disponibles par leur identifiant tant que le budget
+    (max_bytes, max_models) le permet. L'écriture des artefacts et la rétention sont partagées.
+    Avec un alias_store, les alias modifiés par l'API sont publiés aux autres workers, qui les
+    appliquent à leur tour (sync_aliases).
+    """
+
+    def __init__(self, max_bytes: int = 0, max_models: int = 0, history: Optional[PredictionHistory] = None,
+                 alias_store: Optional[AliasStore] = None):
+        self.max_bytes = max_bytes
+        self.max_models = max_models
+        self.history = history
+        self.alias_store = alias_store
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._aliases: Dict[str, str] = {}
+        # Chargements en cours : identifiant -> alias à basculer, étape, début
+        self._loading: Dict[str, Dict[str, Any]] = {}
+        self._errors: Dict[str, str] = {}
+        self._writer = None
+        self._retention = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @staticmethod
+    def model_id(run_id: Optional[str]) -> str:
+        """Identifiant d'un run (None : modèle par défaut, MODEL_LOCAL_PATH ou settings.RUN_ID)"""
+        return run_id or settings.RUN_ID or "local"
+
+    def load(self, run_id: Optional[str], alias: Optional[str] = None,
+             on_progress: Optional[Callable[[str], None]] = None):
+        """Charge et préchauffe un run (bloquant), puis bascule l'alias sur lui"""
+        model_id = self.model_id(run_id)
+        with self._lock:
+            predictor = self._models.get(model_id)
+        if predictor is None:
+            from models.predictor import SegmentationPredictor
+
+            writer, retention = self._shared_services()
+            predictor = SegmentationPredictor(
+                on_progress=on_progress, history=self.history, run_id=run_id,
+                writer=writer, retention=retention
+            )
+        return self._register(model_id, predictor, alias)
+
+    def _shared_services(self):
+        """Écriture des artefacts et rétention partagées par tous les modèles, créées et démarrées
+        une seule fois (au premier chargement, éventuellement concurrent de celui d'un alias)"""
+        from models.predictor import create_persistence_services
+
+        with self._lock:
+            if self._writer is None:
+                self._writer, self._retention = create_persistence_services(self.history)
+                self._writer.start()
+                self._retention.start()
+            return self._writer, self._retention
+
+    def _register(self, model_id: str, predictor, alias: Optional[str]):
+        with self._lock:
+            self._models[model_id] = predictor
+            self._models.move_to_end(model_id)
+            aliases = set(self._loading.pop(model_id, {}).get("aliases", ()))
+            if alias:
+                aliases.add(alias)
+            for name in aliases:
+                previous = self._aliases.get(name)
+                self._aliases[name] = model_id
+                if previous != model_id:
+                    logger.info(f"Alias {name}: {previous} -> {model_id}")
+            self._errors.pop(model_id, None)
+            evicted = self._evict_locked(keep=model_id)
+        for old_id, old in evicted:
+            logger.info(f"Modèle {old_id} évincé du registre (budget mémoire)")
+            old.release()
+        return predictor
+
+    def _evict_locked(self, keep: Optional[str] = None) -> List[Any]:
+        """Évince les modèles sans alias les moins récemment utilisés tant que le budget est dépassé"""
+        evicted = []
+        pinned = {*self._aliases.values(), keep}
+        for model_id in list(self._models):
+            over_count = self.max_models and len(self._models) > self.max_models
+            over_bytes = self.max_bytes and self._total_bytes_locked() > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            if model_id not in pinned:
+                evicted.append((model_id, self._models.pop(model_id)))
+        return evicted
+
+    def _total_bytes_locked(self) -> int:
+        return sum(predictor.memory_bytes for predictor in self._models.values())
+
+    def load_async(self, run_id: Optional[str], alias: Optional[str] = None) -> str:
+        """Charge un run en arrière-plan ; l'alias bascule une fois le modèle prêt (immédiatement s'il l'est)"""
+        model_id = self.model_id(run_id)
+        with self._lock:
+            predictor = self._models.get(model_id)
+            state = self._loading.get(model_id)
+            if predictor is None and state is not None:
+                if alias:
+                    state["aliases"].add(alias)
+                return model_id
+            if predictor is None:
+                self._loading[model_id] = {
+                    "aliases": {alias} if alias else set(), "stage": "queued", "started_at": time.monotonic()
+                }
+        if predictor is not None:
+            self._register(model_id, predictor, alias)
+            return model_id
+
+        def set_stage(stage: str):
+            self._loading[model_id]["stage"] = stage
+
+        def worker():
+            try:
+                self.load(run_id, on_progress=set_stage)
+            except Exception as e:
+                logger.error(f"Erreur lors du chargement du modèle {model_id}: {str(e)}")
+                with self._lock:
+                    self._loading.pop(model_id, None)
+                    self._errors[model_id] = f"{type(e).__name__}: {str(e)}"
+
+        threading.Thread(target=worker, name=f"model-loader-{model_id[:12]}", daemon=True).start()
+        return model_id
+
+    def set_alias(self, alias: str, run_id: str) -> str:
+        """Publie l'alias aux autres workers puis le bascule dans ce processus (load_async)"""
+        if self.alias_store is not None:
+            self.alias_store.update(alias, run_id)
+        return self.load_async(run_id, alias=alias)
+
+    def sync_aliases(self, configured: Optional[Dict[str, str]] = None):
+        """Applique les alias publiés par les autres workers s'ils ont changé (configured :
+        MODEL_ALIASES, appliqués au premier appel avec ceux du fichier, qui ont priorité)"""
+        published = self.alias_store.changed() if self.alias_store is not None else None
+        aliases = {**(configured or {}), **(published or {})}
+        for alias, run_id in aliases.items():
+            with self._lock:
+                current = self._aliases.get(alias)
+                # Échec de chargement déjà constaté : nouvel essai par l'API seulement
+                failed = run_id is not None and self.model_id(run_id) in self._errors
+            if failed:
+                continue
+            try:
+                if run_id is None:
+                    if current is not None:
+                        self.remove_alias(alias, publish=False)
+                elif current != self.model_id(run_id):
+                    self.load_async(run_id, alias=alias)
+            except ValueError as e:
+                logger.warning(f"Alias {alias} ignoré: {str(e)}")
+
+    def start_alias_sync(self, configured: Optional[Dict[str, str]] = None, interval_seconds: float = 5.0):
+        """Applique les alias configurés et publiés, puis surveille le fichier d'alias en arrière-plan"""
+        self.sync_aliases(configured)
+        if self.alias_store is None or interval_seconds <= 0:
+            return
+
+        def worker():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.sync_aliases()
+                except Exception as e:
+                    logger.error(f"Erreur lors de la synchronisation des alias: {str(e)}")
+
+        threading.Thread(target=worker, name="alias-sync", daemon=True).start()
+
+    def get(self, name: Optional[str] = None):
+        """Prédicteur d'un alias ou d'un identifiant de run (alias par défaut si None)"""
+        name = name or DEFAULT_ALIAS
+        with self._lock:
+            model_id = self._aliases.get(name, name)
+            predictor = self._models.get(model_id)
+            if predictor is not None:
+                self._models.move_to_end(model_id)
+                return predictor
+            loading = model_id in self._loading or any(name in state["aliases"] for state in self._loading.values())
+        if loading:
+            raise ModelNotReadyError(f"Modèle {name} en cours de chargement")
+        raise UnknownModelError(name)
+
+    def remove_alias(self, alias: str, publish: bool = True) -> bool:
+        """Supprime un alias (le modèle devient évinçable) ; l'alias par défaut ne peut pas l'être
+
+        publish : publie la suppression aux autres workers (alias_store).
+        """
+        if alias == DEFAULT_ALIAS:
+            raise ValueError("L'alias par défaut ne peut pas être supprimé")
+        with self._lock:
+            removed = self._aliases.pop(alias, None) is not None
+            evicted = self._evict_locked()
+        if removed and publish and self.alias_store is not None:
+            self.alias_store.update(alias, None)
+        for old_id, old in evicted:
+            logger.info(f"Modèle {old_id} évincé du registre (budget mémoire)")
+            old.release()
+        return removed
+
+    def shutdown(self):
+        """Arrête le batching de tous les modèles puis les services partagés"""
+        self._stop.set()
+        with self._lock:
+            predictors = list(self._models.values())
+        for predictor in predictors:
+            predictor.release()
+        if self._writer is not None:
+            self._writer.stop()
+            self._retention.stop()
+
+    def describe(self) -> Dict[str, Any]:
+        """Modèles chargés (plus récemment utilisés d'abord), alias, chargements en cours et erreurs"""
+        with self._lock:
+            aliases_by_model: Dict[str, List[str]] = {}
+            for alias, model_id in sorted(self._aliases.items()):
+                aliases_by_model.setdefault(model_id, []).append(alias)
+            now = time.monotonic()
+            return {
+                "aliases": dict(self._aliases),
+                "models": [
+                    {
+                        "model_id": model_id,
+                        "aliases": aliases_by_model.get(model_id, []),
+                        "backend": predictor.backend.name,
+                        "memory_bytes": predictor.memory_bytes
+                    }
+                    for model_id, predictor in reversed(self._models.items())
+                ],
+                "loading": [
+                    {
+                        "model_id": model_id,
+                        "aliases": sorted(state["aliases"]),
+                        "stage": state["stage"],
+                        "elapsed_seconds": round(now - state["started_at"], 3)
+                    }
+                    for model_id, state in self._loading.items()
+                ],
+                "errors": dict(self._errors),
+                "memory_bytes": self._total_bytes_locked(),
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models
+            }
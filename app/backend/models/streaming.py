@@ -0,0 +1,252 @@
+# app/backend/models/streaming.py
+import io
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from config import settings
+from utils.executor import BoundedExecutor
+from utils.image_processing import validate_image, encode_image_to_png, rle_encode_mask
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("decode", "inference", "encode")
+
+
+class DropOldestQueue:
+    """File asyncio bornée : quand elle est pleine, l'élément le plus ancien est abandonné"""
+
+    def __init__(self, maxsize: int):
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item: Any) -> Optional[Any]:
+        """Ajoute un élément ; retourne l'élément abandonné s'il y en a un"""
+        dropped = None
+        if self._queue.full():
+            dropped = self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+        return dropped
+
+    async def close(self):
+        """Ajoute le marqueur de fin de flux (None) en attendant une place, sans rien abandonner"""
+        await self._queue.put(None)
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+
+class LatencyStats:
+    """Latences d'une étape (moyenne, dernière et maximum, en millisecondes)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "last_ms": round(self.last * 1000, 2),
+            "max_ms": round(self.max * 1000, 2)
+        }
+
+
+class StreamSession:
+    """Segmentation d'un flux d'images sur une connexion WebSocket
+
+    Chaque message binaire reçu est une image encodée (JPEG, PNG...) numérotée dans l'ordre de
+    réception. Décodage, inférence (via la file de micro-batching du prédicteur) et encodage du
+    masque s'exécutent dans des étapes séparées reliées par des files courtes : si l'inférence
+    prend du retard, les images les plus anciennes sont abandonnées pour que la latence reste
+    bornée. L'inférence passe par l'exécuteur borné des prédictions (`executor`) : serveur saturé,
+    l'image est rejetée par un message d'erreur comme /predict par une 503. Pour chaque image
+    traitée, le serveur envoie un message texte JSON (numéro, forme du masque, latences) suivi
+    du masque en message binaire.
+    """
+
+    def __init__(self, predictor, websocket: WebSocket, mask_encoding: str = "rle",
+                 mask_size: str = "model", queue_size: int = 2, stats_interval: float = 5.0,
+                 executor: Optional[BoundedExecutor] = None):
+        self.predictor = predictor
+        self.executor = executor
+        self.websocket = websocket
+        self.mask_encoding = mask_encoding
+        self.mask_size = mask_size
+        self.stats_interval = stats_interval
+        self.queues = {stage: DropOldestQueue(queue_size) for stage in STAGES}
+        self.queues["send"] = DropOldestQueue(queue_size)
+        self.latency = {stage: LatencyStats() for stage in (*STAGES, "end_to_end")}
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.frames_failed = 0
+        self._started_at = time.monotonic()
+        self._sent_times: Deque[float] = deque(maxlen=120)
+
+    # --- Étapes (exécutées dans le pool de threads) ---
+
+    def _decode(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        image = Image.open(io.BytesIO(frame.pop("data")))
+        if not validate_image(image):
+            raise ValueError("Image trop grande (max 4096x4096)")
+        # Taille lue avant le prétraitement : le décodage JPEG réduit (draft) modifie l'image sur place
+        frame["size"] = image.size
+        # Décodage JPEG réduit : seul le masque est renvoyé, jamais l'image
+        frame["tensor"] = self.predictor.preprocess_image(image, draft=self.mask_size == "model")[0]
+        return frame
+
+    def _infer(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        predictions = self.predictor.batcher.submit(frame.pop("tensor")).result()
+        frame["mask"] = np.argmax(predictions, axis=-1).astype(np.uint8)
+        return frame
+
+    def _encode(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        mask = frame.pop("mask")
+        counts = np.bincount(mask.ravel(), minlength=settings.NUM_CLASSES)
+        if self.mask_size == "original":
+            mask = self.predictor.resize_mask(mask, frame["size"])
+
+        if self.mask_encoding == "png":
+            frame["body"] = encode_image_to_png(self.predictor.create_mask_image(mask))
+        elif self.mask_encoding == "rle":
+            frame["body"] = rle_encode_mask(mask)
+        else:
+            frame["body"] = mask.tobytes()
+
+        dominant = int(np.argmax(counts))
+        frame["header"] = {
+            "type": "frame",
+            "seq": frame["seq"],
+            "shape": list(mask.shape),
+            "dtype": "uint8",
+            "encoding": self.mask_encoding,
+            "image_size": list(frame["size"]),
+            "dominant_class": settings.GROUP_NAMES[dominant],
+            "dominant_class_percentage": round(float(counts[dominant]) / counts.sum() * 100, 2)
+        }
+        return frame
+
+    # --- Pipeline ---
+
+    async def _stage(self, name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                     inbox: DropOldestQueue, outbox: DropOldestQueue, run: Callable = run_in_threadpool):
+        while True:
+            frame = await inbox.get()
+            if frame is None:
+                await outbox.close()
+                return
+            if "error" not in frame:
+                start = time.perf_counter()
+                try:
+                    frame = await run(fn, frame)
+                    frame.setdefault("latency_ms", {})[name] = round((time.perf_counter() - start) * 1000, 2)
+                    self.latency[name].add(time.perf_counter() - start)
+                except Exception as e:
+                    frame = {"seq": frame["seq"], "received_at": frame["received_at"], "error": f"{name}: {str(e)}"}
+            outbox.put(frame)
+
+    async def _sender(self):
+        last_stats = time.monotonic()
+        while True:
+            frame = await self.queues["send"].get()
+            if frame is None:
+                return
+            if "error" in frame:
+                self.frames_failed += 1
+                await self.websocket.send_text(json.dumps({"type": "error", "seq": frame["seq"], "detail": frame["error"]}))
+                continue
+
+            elapsed = time.perf_counter() - frame["received_at"]
+            self.latency["end_to_end"].add(elapsed)
+            header = {**frame["header"], "latency_ms": {**frame["latency_ms"], "end_to_end": round(elapsed * 1000, 2)}}
+            await self.websocket.send_text(json.dumps(header))
+            await self.websocket.send_bytes(frame["body"])
+            self.frames_sent += 1
+            self._sent_times.append(time.monotonic())
+
+            if time.monotonic() - last_stats >= self.stats_interval:
+                last_stats = time.monotonic()
+                await self.websocket.send_text(json.dumps({"type": "stats", **self.get_stats()}))
+
+    def _submit(self, data: bytes):
+        frame = {"seq": self.frames_received, "received_at": time.perf_counter(), "data": data}
+        self.frames_received += 1
+        self.queues["decode"].put(frame)
+
+    async def run(self):
+        """Reçoit les images jusqu'à la fin du flux, vide le pipeline puis envoie les statistiques finales"""
+        tasks = [
+            asyncio.ensure_future(self._stage("decode", self._decode, self.queues["decode"], self.queues["inference"])),
+            asyncio.ensure_future(self._stage(
+                "inference", self._infer, self.queues["inference"], self.queues["encode"],
+                run=self.executor.run if self.executor is not None else run_in_threadpool
+            )),
+            asyncio.ensure_future(self._stage("encode", self._encode, self.queues["encode"], self.queues["send"])),
+            asyncio.ensure_future(self._sender())
+        ]
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("bytes") is not None:
+                    if len(message["bytes"]) > settings.STREAM_MAX_FRAME_MB * 1024 * 1024:
+                        await self.websocket.send_text(json.dumps({
+                            "type": "error", "seq": None,
+                            "detail": f"Image trop volumineuse (max {settings.STREAM_MAX_FRAME_MB} Mo)"
+                        }))
+                        continue
+                    self._submit(message["bytes"])
+                    continue
+
+                # Messages de contrôle : {"type": "stats"} ou {"type": "end"}
+                try:
+                    command = json.loads(message.get("text") or "{}").get("type")
+                except (ValueError, AttributeError):
+                    command = None
+                if command == "end":
+                    break
+                if command == "stats":
+                    await self.websocket.send_text(json.dumps({"type": "stats", **self.get_stats()}))
+
+            # Fin du flux : les images en cours sont traitées avant la fermeture
+            await self.queues["decode"].close()
+            await asyncio.gather(*tasks)
+            await self.websocket.send_text(json.dumps({"type": "stats", "final": True, **self.get_stats()}))
+            await self.websocket.close()
+        except WebSocketDisconnect:
+            logger.info(f"Flux interrompu par le client après {self.frames_received} image(s)")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Débit (images/s), latences par étape et images abandonnées par étape"""
+        elapsed = time.monotonic() - self._started_at
+        window = self._sent_times[-1] - self._sent_times[0] if len(self._sent_times) > 1 else 0.0
+        return {
+            "frames_received": self.frames_received,
+            "frames_sent": self.frames_sent,
+            "frames_failed": self.frames_failed,
+            "frames_dropped": {stage: queue.dropped for stage, queue in self.queues.items()},
+            "fps": round(self.frames_sent / elapsed, 2) if elapsed > 0 else 0.0,
+            "fps_recent": round((len(self._sent_times) - 1) / window, 2) if window > 0 else 0.0,
+            "latency": {name: stats.to_dict() for name, stats in self.latency.items()}
+        }
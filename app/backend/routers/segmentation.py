@@ -1,25 +1,344 @@
 # app/backend/routers/segmentation.py
+import asyncio
+import hmac
 import json
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from PIL import Image
+import os
+import re
+import threading
+import uuid
+from fastapi import APIRouter, File, UploadFile, HTTPException, Response, Query, Request, WebSocket
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+import numpy as np
 import io
 import logging
+from datetime import datetime
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
-from models.predictor import predictor
+from models.lifecycle import predictor_state, prediction_history, model_registry, ModelNotReadyError
+from models.registry import UnknownModelError
+from models.batching import QueueFullError
+from models.streaming import StreamSession
 from schemas.prediction import PredictionResponse, ErrorResponse
-from utils.image_processing import validate_image
+from utils.image_processing import validate_image, encode_image_to_png, png_to_data_uri, rle_encode_mask
+from utils.executor import BoundedExecutor, ExecutorSaturatedError
+from utils.result_cache import ResultCache, make_cache_key
+from utils.archives import ArchiveLimitError, expand_archive, is_archive
+from utils.tiling import tile_boxes
+from utils.metrics import stage, request_timer, PREDICTION_ERRORS, RESULT_CACHE_LOOKUPS
+from utils.persistence import RetentionPolicy
+from utils.profiling import RequestProfiler, PROFILE_SUFFIX, list_profiles, parse_profile_modes
+from config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Exécuteur dédié : décodage, inférence, encodage PNG et écritures disque
+inference_executor = BoundedExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    max_pending=settings.INFERENCE_MAX_PENDING
+)
+
+# Cache des résultats par contenu : les images renvoyées à l'identique ne repassent pas par le modèle
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MB * 1024 * 1024,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    spill_dir=settings.RESULT_CACHE_DIR,
+    max_disk_bytes=settings.RESULT_CACHE_DISK_MB * 1024 * 1024
+)
+
+# Profils à la demande (X-Profile) : seuls les plus récents sont conservés
+profile_retention = RetentionPolicy(settings.PROFILES_DIR, suffix=PROFILE_SUFFIX, max_count=settings.PROFILES_MAX_COUNT)
+
+def _service_unavailable(detail: str) -> HTTPException:
+    """Erreur 503 avec en-tête Retry-After"""
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(settings.RETRY_AFTER_SECONDS)}
+    )
+
+def _get_predictor(model: Optional[str]):
+    """Prédicteur d'un alias ou d'un run chargé (modèle par défaut si None), 404 s'il est inconnu"""
+    try:
+        return predictor_state.get(model)
+    except UnknownModelError:
+        raise HTTPException(status_code=404, detail=f"Modèle inconnu: {model} (voir /models)")
+
+def _check_admin_access(request: Request):
+    """Bascule des modèles désactivée sans MODEL_ADMIN_TOKEN : 404 ; secret absent ou erroné : 403"""
+    if not settings.MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Gestion des modèles désactivée (MODEL_ADMIN_TOKEN)")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), settings.MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+def _check_profiling_access(request: Request):
+    """Profilage désactivé : 404 ; secret PROFILING_TOKEN absent ou erroné : 403"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profilage désactivé")
+    token = request.headers.get("X-Profile-Token", "")
+    if settings.PROFILING_TOKEN and not hmac.compare_digest(token, settings.PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Jeton de profilage invalide")
+
+def _profile_modes(request: Request) -> Optional[List[str]]:
+    """Modes de profilage demandés par l'en-tête X-Profile (ignoré si le profilage est désactivé)"""
+    value = request.headers.get("X-Profile")
+    if value is None or not settings.PROFILING_ENABLED:
+        return None
+    _check_profiling_access(request)
+    try:
+        return parse_profile_modes(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _parse_outputs(outputs: Optional[str]) -> List[str]:
+    """Valide la liste d'artefacts demandés (séparés par des virgules)"""
+    if outputs is None:
+        return list(settings.DEFAULT_OUTPUTS)
+    
+    names = [name.strip() for name in outputs.split(",") if name.strip()]
+    unknown = [name for name in names if name not in settings.ARTIFACT_FILES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Artefacts inconnus: {', '.join(unknown)} (disponibles: {', '.join(settings.ARTIFACT_FILES)})"
+        )
+    return names
+
+def _multipart_response(metadata: dict, images: Dict[str, bytes]) -> Response:
+    """Réponse multipart/form-data : une partie JSON puis une partie PNG brute par artefact"""
+    boundary = uuid.uuid4().hex
+    
+    def part(name: str, content_type: str, data: bytes, filename: Optional[str] = None) -> bytes:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        header = f"--{boundary}\r\nContent-Disposition: {disposition}\r\nContent-Type: {content_type}\r\n\r\n"
+        return header.encode() + data + b"\r\n"
+    
+    chunks = [part("result", "application/json", json.dumps(metadata).encode())]
+    for name, data in images.items():
+        chunks.append(part(name, "image/png", data, filename=f"{name}.png"))
+    chunks.append(f"--{boundary}--\r\n".encode())
+    
+    return Response(content=b"".join(chunks), media_type=f"multipart/form-data; boundary={boundary}")
+
+def _mask_response(predictor, result: dict, mask_encoding: str) -> Response:
+    """Réponse compacte : identifiants de classes uint8 à la taille de l'image (bruts ou RLE)"""
+    mask = predictor.resize_mask(result['mask'], tuple(result['image_size']))
+    body = rle_encode_mask(mask) if mask_encoding == "rle" else mask.tobytes()
+    
+    counts = {stat['class_id']: stat['pixel_count'] for stat in result['class_statistics']}
+    return Response(
+        content=body,
+        media_type="application/octet-stream",
+        headers={
+            "X-Mask-Shape": f"{mask.shape[0]},{mask.shape[1]}",
+            "X-Mask-Dtype": "uint8",
+            "X-Mask-Encoding": mask_encoding,
+            "X-Class-Pixel-Counts": ",".join(str(counts[i]) for i in range(settings.NUM_CLASSES)),
+            "X-Dominant-Class": result['dominant_class'],
+            "X-Artifacts-Path": result['artifacts_path']
+        }
+    )
+
+def _artifacts_on_disk(metadata: dict, outputs: List[str]) -> bool:
+    """Vérifie que les artefacts demandés existent dans le dossier de résultats (servis par URL)"""
+    folder = os.path.basename(metadata['artifacts_path'])
+    if not folder:
+        return False
+    folder_path = os.path.join(settings.PREDICTIONS_DIR, folder)
+    return all(os.path.exists(os.path.join(folder_path, settings.ARTIFACT_FILES[name])) for name in outputs)
+
+def _inference_options(upsampling: Optional[str], inference: Optional[str],
+                       tile_size: Optional[int], tile_overlap: Optional[int]) -> Dict[str, Any]:
+    """Options de prédiction de la requête, complétées par la configuration (elles entrent dans la clé de cache)"""
+    options = {
+        "upsampling": upsampling or settings.MASK_UPSAMPLING,
+        "inference": inference or settings.INFERENCE_MODE
+    }
+    if options["inference"] == "tiled":
+        options["tile_size"] = tile_size or settings.TILE_SIZE
+        options["tile_overlap"] = settings.TILE_OVERLAP if tile_overlap is None else tile_overlap
+        if options["tile_overlap"] >= options["tile_size"]:
+            raise HTTPException(status_code=400, detail="Le chevauchement doit être inférieur à la taille des tuiles")
+    return options
+
+def _segment(predictor, contents: bytes, filename: str, outputs: List[str], response_format: str,
+             options: Dict[str, Any], use_cache: bool = True) -> Tuple[dict, np.ndarray, Dict[str, bytes], str]:
+    """Statistiques, masque et artefacts PNG depuis le cache ou via le modèle, et statut du cache"""
+    # Les artefacts servis par URL sont lus sur le disque, pas dans le cache
+    served_from_disk = response_format == "urls"
+    
+    # Image déjà traitée par ce modèle avec les mêmes options : ni décodage ni inférence
+    variant = ",".join(f"{name}={value}" for name, value in sorted(options.items()))
+    cache_key = make_cache_key(contents, predictor.model_id, variant) if use_cache and result_cache.enabled else None
+    if cache_key is not None:
+        entry = result_cache.get(cache_key, required_images=() if served_from_disk else outputs)
+        if entry is not None and (not served_from_disk or _artifacts_on_disk(entry['metadata'], outputs)):
+            RESULT_CACHE_LOOKUPS.inc(result="hit")
+            return {**entry['metadata'], 'filename': filename}, entry['mask'], entry['images'], "HIT"
+    
+    # Lecture de l'en-tête seulement : les pixels sont décodés au prétraitement
+    with stage("decode"):
+        image = Image.open(io.BytesIO(contents))
+        valid = validate_image(image)
+    
+    # Valider l'image
+    if not valid:
+        raise HTTPException(status_code=400, detail="Image trop grande (max 4096x4096)")
+    if options["inference"] == "tiled":
+        tiles = len(tile_boxes(image.size, options["tile_size"], options["tile_overlap"]))
+        if tiles > settings.TILE_MAX_COUNT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Trop de tuiles pour cette image: {tiles} (max {settings.TILE_MAX_COUNT}), augmenter tile_size"
+            )
+    
+    result = predictor.predict(image, filename=filename, outputs=outputs, sync_outputs=served_from_disk,
+                               source=contents, **options)
+    artifacts = result.pop('artifacts')
+    mask = result.pop('mask')
+    full_mask = result.pop('full_mask')
+    # Masque issu des logits interpolés : conservé à la taille d'origine (il ne se déduit pas du
+    # masque du modèle) ; sinon le masque du modèle, agrandi à la demande
+    if options["upsampling"] == "bilinear":
+        mask = full_mask
+    
+    with stage("encode"):
+        images = {} if served_from_disk else {name: encode_image_to_png(img) for name, img in artifacts.items()}
+    cache_status = "MISS" if cache_key is not None else "BYPASS"
+    RESULT_CACHE_LOOKUPS.inc(result=cache_status.lower())
+    if cache_key is not None:
+        result_cache.put(cache_key, result, mask, images)
+    return result, mask, images, cache_status
+
+def _build_response(predictor, metadata: dict, mask: np.ndarray, images: Dict[str, bytes], outputs: List[str],
+                    response_format: str, mask_encoding: str,
+                    url_for: Callable[[str, str], str]) -> Response:
+    """Encode la réponse au format demandé"""
+    metadata = dict(metadata)
+    
+    if response_format == "mask":
+        return _mask_response(predictor, {**metadata, 'mask': mask}, mask_encoding)
+    
+    if response_format == "urls":
+        folder = os.path.basename(metadata['artifacts_path'])
+        metadata['image_urls'] = {name: url_for(folder, name) for name in outputs}
+        return JSONResponse(content=metadata)
+    
+    images = {name: images[name] for name in outputs}
+    
+    if response_format == "multipart":
+        return _multipart_response(metadata, images)
+    
+    metadata['images'] = {name: png_to_data_uri(data) for name, data in images.items()}
+    return JSONResponse(content=metadata)
+
+def _predict_from_bytes(predictor, contents: bytes, filename: str, outputs: List[str],
+                        response_format: str, mask_encoding: str,
+                        url_for: Callable[[str, str], str], options: Dict[str, Any],
+                        profile_modes: Optional[List[str]] = None) -> Response:
+    """Décode, valide, segmente et encode la réponse (exécuté dans l'exécuteur d'inférence)"""
+    # Le format masque seul ne nécessite aucune visualisation
+    if response_format == "mask":
+        outputs = []
+    
+    # Profil demandé : thread de la requête et thread de batching échantillonnés, un profil à la fois
+    profiler = None
+    if profile_modes:
+        profiler = RequestProfiler(
+            settings.PROFILES_DIR, profile_modes,
+            thread_idents=(threading.get_ident(), predictor.batcher.thread_ident),
+            sampling_interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+        )
+        if not profiler.acquire():
+            profiler = None
+    
+    with request_timer() as timer:
+        with profiler if profiler is not None else nullcontext():
+            # Le cache est contourné : le profil doit couvrir le décodage et l'inférence
+            metadata, mask, images, cache_status = _segment(
+                predictor, contents, filename, outputs, response_format, options, use_cache=profiler is None
+            )
+            with stage("serialize"):
+                response = _build_response(predictor, metadata, mask, images, outputs, response_format, mask_encoding, url_for)
+    response.headers["X-Cache"] = cache_status
+    response.headers["X-Model"] = predictor.model_id
+    # Durées par étape (décodage, prétraitement, inférence, visualisations, encodage...)
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = timer.header()
+    if profile_modes:
+        if profiler is None:
+            response.headers["X-Profile-Skipped"] = "busy"
+        else:
+            profiler.write_summary(
+                filename=filename, options=options, response_format=response_format,
+                stages_ms={name: round(seconds * 1000, 3) for name, seconds in timer.durations.items()},
+                artifacts_path=metadata.get('artifacts_path')
+            )
+            profile_retention.prune()
+            response.headers["X-Profile-Id"] = profiler.id
+    return response
+
+def _predict_batch_item(predictor, index: int, contents: bytes, filename: str, outputs: List[str],
+                        options: Dict[str, Any]) -> bytes:
+    """Segmente une image d'un lot et renvoie sa ligne NDJSON (exécuté dans l'exécuteur d'inférence)"""
+    metadata, _, images, cache_status = _segment(predictor, contents, filename, outputs, "json", options)
+    line = {
+        "index": index,
+        "status": 200,
+        "cache": cache_status,
+        **metadata,
+        "images": {name: png_to_data_uri(images[name]) for name in outputs}
+    }
+    return json.dumps(line).encode() + b"\n"
+
 @router.post("/predict", response_model=PredictionResponse)
-async def predict_segmentation(file: UploadFile = File(...)):
+async def predict_segmentation(
+    request: Request,
+    file: UploadFile = File(...),
+    outputs: Optional[str] = Query(
+        None,
+        description="Artefacts à générer, séparés par des virgules "
+                    "(original, prediction_mask, overlay, side_by_side). "
+                    "Par défaut : prediction_mask,overlay,side_by_side"
+    ),
+    response_format: Literal["json", "multipart", "urls", "mask"] = Query(
+        "json",
+        description="json : images PNG en base64 ; multipart : PNG bruts en multipart/form-data ; "
+                    "urls : liens vers les artefacts ; mask : identifiants de classes uint8 seuls"
+    ),
+    mask_encoding: Literal["raw", "rle"] = Query("raw", description="Encodage du masque pour response_format=mask"),
+    upsampling: Optional[Literal["nearest", "bilinear"]] = Query(
+        None,
+        description="Agrandissement du masque à la taille de l'image : nearest (masque de classes) ou "
+                    "bilinear (logits interpolés, contours lisses). Par défaut : MASK_UPSAMPLING"
+    ),
+    inference: Optional[Literal["standard", "tiled"]] = Query(
+        None,
+        description="standard : image entière à la taille du modèle ; tiled : tuiles fondues sur leur "
+                    "chevauchement (petits objets mieux segmentés, une passe par tuile). Par défaut : INFERENCE_MODE"
+    ),
+    tile_size: Optional[int] = Query(None, ge=64, le=4096, description="Taille des tuiles en pixels (par défaut TILE_SIZE)"),
+    tile_overlap: Optional[int] = Query(None, ge=0, le=2048, description="Chevauchement des tuiles en pixels (par défaut TILE_OVERLAP)"),
+    model: Optional[str] = Query(None, description="Modèle : alias (default, staging...) ou identifiant de run chargé (voir /models)")
+):
     """
     Endpoint pour prédire la segmentation sémantique d'une image
     
     Args:
         file: Image uploadée (JPEG, PNG, etc.)
+        outputs: Artefacts à générer (l'image originale n'est renvoyée que sur demande)
+        response_format: Format de la réponse (json, multipart, urls, mask)
+        mask_encoding: Encodage du masque seul (raw, rle)
+        upsampling: Agrandissement du masque à la taille d'origine (nearest, bilinear)
+        inference: Inférence sur l'image entière ou par tuiles (standard, tiled)
+        tile_size, tile_overlap: Taille et chevauchement des tuiles (mode tiled)
+        model: Alias ou run du modèle à utiliser (comparaison A/B) ; modèle par défaut si absent
+    
+    En-têtes optionnels (PROFILING_ENABLED) : X-Profile (cprofile, sampling, tf, memory, séparés
+    par des virgules) profile la requête ; le profil est consultable via /profiles/{X-Profile-Id}
     
     Returns:
         PredictionResponse: Masques, visualisations et statistiques
@@ -29,58 +348,323 @@ async def predict_segmentation(file: UploadFile = File(...)):
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Le fichier doit être une image")
         
+        requested_outputs = _parse_outputs(outputs)
+        options = _inference_options(upsampling, inference, tile_size, tile_overlap)
+        profile_modes = _profile_modes(request)
+        
+        # Vérifier que le modèle est chargé
+        predictor = _get_predictor(model)
+        
         # Lire l'image
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
         
-        # Valider l'image
-        if not validate_image(image):
-            raise HTTPException(status_code=400, detail="Image trop grande (max 4096x4096)")
+        def url_for(folder: str, artifact: str) -> str:
+            return str(request.url_for("get_prediction_artifact", folder=folder, artifact=artifact))
         
-        # Faire la prédiction avec génération des artefacts
+        # Faire la prédiction avec génération des artefacts hors de la boucle d'événements
         logger.info(f"Prédiction pour l'image: {file.filename}")
-        result = predictor.predict_with_artifacts(image, filename=file.filename)
-        
-        return PredictionResponse(**result)
+        return await inference_executor.run(
+            _predict_from_bytes, predictor, contents, file.filename,
+            requested_outputs, response_format, mask_encoding, url_for, options, profile_modes
+        )
         
+    except HTTPException:
+        PREDICTION_ERRORS.inc(reason="invalid_input")
+        raise
+    except UnidentifiedImageError:
+        # Même réponse que pour une image de /predict/batch
+        PREDICTION_ERRORS.inc(reason="invalid_input")
+        raise HTTPException(status_code=400, detail="Format d'image non reconnu")
+    except (ExecutorSaturatedError, QueueFullError, ModelNotReadyError) as e:
+        PREDICTION_ERRORS.inc(reason="rejected")
+        logger.warning(f"Requête rejetée: {str(e)}")
+        raise _service_unavailable(str(e))
     except Exception as e:
+        PREDICTION_ERRORS.inc(reason="internal")
         logger.error(f"Erreur lors de la prédiction: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Lit un fichier envoyé par blocs, sans dépasser le budget d'octets restant (413 sinon)"""
+    chunks, size = [], 0
+    while True:
+        chunk = await file.read(1024 * 1024)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Lot trop volumineux (max {settings.BATCH_REQUEST_MAX_MB} Mo)"
+            )
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post("/predict/batch")
+async def predict_segmentation_batch(
+    files: List[UploadFile] = File(..., description="Images et/ou archives zip/tar d'images"),
+    outputs: Optional[str] = Query(
+        None,
+        description="Artefacts à générer pour chaque image, séparés par des virgules "
+                    "(original, prediction_mask, overlay, side_by_side). "
+                    "Par défaut : prediction_mask,overlay,side_by_side"
+    ),
+    upsampling: Optional[Literal["nearest", "bilinear"]] = Query(
+        None,
+        description="Agrandissement du masque à la taille de l'image : nearest (masque de classes) ou "
+                    "bilinear (logits interpolés, contours lisses). Par défaut : MASK_UPSAMPLING"
+    ),
+    inference: Optional[Literal["standard", "tiled"]] = Query(
+        None,
+        description="standard : image entière à la taille du modèle ; tiled : tuiles fondues sur leur "
+                    "chevauchement (petits objets mieux segmentés, une passe par tuile). Par défaut : INFERENCE_MODE"
+    ),
+    tile_size: Optional[int] = Query(None, ge=64, le=4096, description="Taille des tuiles en pixels (par défaut TILE_SIZE)"),
+    tile_overlap: Optional[int] = Query(None, ge=0, le=2048, description="Chevauchement des tuiles en pixels (par défaut TILE_OVERLAP)"),
+    model: Optional[str] = Query(None, description="Modèle : alias (default, staging...) ou identifiant de run chargé (voir /models)")
+):
+    """
+    Segmente un lot d'images et renvoie les résultats en NDJSON, au fil de l'eau
+    
+    Les images sont décodées en parallèle et regroupées en batchs par la file de micro-batching.
+    Chaque ligne correspond à une image (dans l'ordre de fin de traitement, champ `index` pour
+    l'ordre d'envoi) ; la dernière ligne résume le lot.
+    """
+    requested_outputs = _parse_outputs(outputs)
+    options = _inference_options(upsampling, inference, tile_size, tile_overlap)
+    
+    try:
+        predictor = _get_predictor(model)
+    except ModelNotReadyError as e:
+        raise _service_unavailable(str(e))
+    
+    # Lecture des fichiers et extraction des archives, dans les limites du lot
+    items: List[Tuple[str, bytes]] = []
+    remaining_bytes = settings.BATCH_REQUEST_MAX_MB * 1024 * 1024
+    for file in files:
+        contents = await _read_upload(file, remaining_bytes)
+        if is_archive(file.filename, file.content_type or ""):
+            try:
+                members = await run_in_threadpool(
+                    expand_archive, file.filename, contents,
+                    settings.BATCH_REQUEST_MAX_FILES - len(items), remaining_bytes
+                )
+            except ArchiveLimitError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            members = [(file.filename, contents)]
+        
+        items.extend(members)
+        remaining_bytes -= sum(len(data) for _, data in members)
+        if len(items) > settings.BATCH_REQUEST_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"Trop d'images (max {settings.BATCH_REQUEST_MAX_FILES})")
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="Aucune image dans le lot")
+    
+    logger.info(f"Prédiction par lot: {len(items)} image(s)")
+    
+    async def run_item(index: int, filename: str, contents: bytes) -> Tuple[bool, bytes]:
+        async with semaphore:
+            try:
+                line = await inference_executor.run(
+                    _predict_batch_item, predictor, index, contents, filename, requested_outputs, options
+                )
+                return True, line
+            except HTTPException as e:
+                status, detail, reason = e.status_code, e.detail, "invalid_input"
+            except UnidentifiedImageError:
+                status, detail, reason = 400, "Format d'image non reconnu", "invalid_input"
+            except (ExecutorSaturatedError, QueueFullError) as e:
+                status, detail, reason = 503, str(e), "rejected"
+            except Exception as e:
+                logger.error(f"Erreur lors de la prédiction de {filename}: {str(e)}")
+                status, detail, reason = 500, str(e), "internal"
+            PREDICTION_ERRORS.inc(reason=reason)
+            error = {"index": index, "filename": filename, "status": status, "error": detail}
+            return False, json.dumps(error).encode() + b"\n"
+    
+    # Nombre d'images en cours par requête (à garder ≥ BATCH_MAX_SIZE pour remplir les batchs)
+    semaphore = asyncio.Semaphore(settings.BATCH_REQUEST_CONCURRENCY)
+    
+    async def stream():
+        tasks = [asyncio.ensure_future(run_item(index, name, data)) for index, (name, data) in enumerate(items)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ok, line = await next_done
+                succeeded += ok
+                yield line
+        finally:
+            # Client déconnecté : les images non commencées ne sont pas traitées
+            for task in tasks:
+                task.cancel()
+        summary = {"done": True, "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}
+        yield json.dumps(summary).encode() + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.websocket("/stream")
+async def stream_segmentation(
+    websocket: WebSocket,
+    mask_encoding: Literal["raw", "rle", "png"] = Query("rle", description="Encodage des masques renvoyés"),
+    mask_size: Literal["model", "original"] = Query("model", description="Masque à la résolution du modèle ou de l'image"),
+    queue_size: int = Query(None, ge=1, le=32, description="Capacité des files entre étapes (par défaut STREAM_QUEUE_SIZE)"),
+    model: Optional[str] = Query(None, description="Modèle : alias ou identifiant de run chargé (par défaut : default)")
+):
+    """
+    Segmentation d'un flux d'images (caméra) sur WebSocket
+    
+    Le client envoie chaque image encodée (JPEG, PNG) en message binaire ; le serveur renvoie, pour
+    chaque image traitée, un message JSON (numéro, forme, latences par étape) suivi du masque en
+    message binaire. Les images les plus anciennes sont abandonnées si l'inférence prend du retard.
+    """
+    await websocket.accept()
+    try:
+        predictor = predictor_state.get(model)
+    except ModelNotReadyError:
+        # 1013 : réessayer plus tard
+        await websocket.close(code=1013, reason="Modèle en cours de chargement")
+        return
+    except UnknownModelError:
+        await websocket.close(code=1008, reason=f"Modèle inconnu: {model}")
+        return
+    
+    session = StreamSession(
+        predictor, websocket,
+        mask_encoding=mask_encoding,
+        mask_size=mask_size,
+        queue_size=queue_size or settings.STREAM_QUEUE_SIZE,
+        stats_interval=settings.STREAM_STATS_INTERVAL_SECONDS,
+        executor=inference_executor
+    )
+    logger.info(f"Flux ouvert (masques {mask_encoding}, taille {mask_size})")
+    await session.run()
+    logger.info(f"Flux fermé: {session.frames_sent}/{session.frames_received} image(s) traitée(s)")
+
 @router.get("/health")
 async def health_check():
     """Vérification de l'état de l'API"""
-    return {"status": "healthy", "model_loaded": predictor.model is not None}
+    predictor = predictor_state.predictor if predictor_state.is_ready else None
+    return {
+        "status": "healthy",
+        "model_loaded": predictor is not None and predictor.backend is not None,
+        "loading": predictor_state.readiness(),
+        "batching": predictor.batcher.get_stats() if predictor is not None else None,
+        "persistence": {
+            "mode": settings.PERSISTENCE_MODE,
+            **predictor.writer.get_stats(),
+            "retention": predictor.retention.get_stats()
+        } if predictor is not None else None,
+        "executor": inference_executor.get_stats(),
+        "history": prediction_history.get_stats(),
+        "result_cache": result_cache.get_stats()
+    }
+
+@router.get("/health/live")
+async def liveness_check():
+    """Sonde de vivacité : le processus répond, indépendamment du chargement du modèle"""
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness_check(response: Response):
+    """Sonde de disponibilité : 200 quand le modèle est chargé, 503 sinon (avec la progression)"""
+    readiness = predictor_state.readiness()
+    if not readiness["ready"]:
+        response.status_code = 503
+        response.headers["Retry-After"] = str(settings.RETRY_AFTER_SECONDS)
+    return readiness
 
 @router.get("/model/info")
-async def model_info():
+async def model_info(model: Optional[str] = Query(None, description="Alias ou run (par défaut : default)")):
     """Informations sur le modèle"""
-    return predictor.get_model_info()
+    if not predictor_state.is_ready:
+        return {
+            "status": "Model not loaded",
+            "model_loaded": False,
+            "loading": predictor_state.readiness()
+        }
+    try:
+        return _get_predictor(model).get_model_info()
+    except ModelNotReadyError as e:
+        raise _service_unavailable(str(e))
+
+@router.get("/models")
+async def list_models():
+    """Modèles chargés (plus récemment utilisés d'abord), alias, chargements en cours et budget mémoire"""
+    return model_registry.describe()
+
+@router.put("/models/aliases/{alias}", status_code=202)
+def set_model_alias(request: Request, alias: str, run_id: str = Query(..., description="Run MLflow à charger")):
+    """Charge un run en arrière-plan (téléchargement, chargement, préchauffage) puis bascule l'alias
+
+    Les requêtes continuent d'utiliser l'ancien modèle jusqu'à la bascule ; l'alias default
+    change le modèle des requêtes sans paramètre `model`. Les autres workers appliquent la
+    bascule à la relecture du fichier d'alias partagé.
+    """
+    _check_admin_access(request)
+    if not re.fullmatch(r"[\w.-]+", alias) or not re.fullmatch(r"[\w.-]+", run_id):
+        raise HTTPException(status_code=400, detail="Alias ou run_id invalide")
+    model_id = model_registry.set_alias(alias, run_id)
+    logger.info(f"Bascule demandée: {alias} -> {model_id}")
+    return {"alias": alias, "model_id": model_id, **model_registry.describe()}
+
+@router.delete("/models/aliases/{alias}")
+def delete_model_alias(request: Request, alias: str):
+    """Supprime un alias : son modèle pourra être évincé (l'alias default ne peut pas être supprimé)"""
+    _check_admin_access(request)
+    try:
+        removed = model_registry.remove_alias(alias)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Alias inconnu: {alias}")
+    return model_registry.describe()
 
 @router.get("/predictions")
-async def list_predictions():
-    """Liste les prédictions effectuées"""
-    import os
-    predictions_dir = "predictions"
-    
-    if not os.path.exists(predictions_dir):
-        return {"predictions": []}
-    
-    predictions = []
-    for folder in sorted(os.listdir(predictions_dir), reverse=True):
-        if folder.endswith("-result"):
-            folder_path = os.path.join(predictions_dir, folder)
-            result_file = os.path.join(folder_path, "prediction_result.json")
-            
-            if os.path.exists(result_file):
-                with open(result_file, 'r') as f:
-                    data = json.load(f)
-                predictions.append({
-                    "timestamp": data.get("timestamp"),
-                    "filename": data.get("filename"),
-                    "dominant_class": data.get("dominant_class"),
-                    "dominant_class_percentage": data.get("dominant_class_percentage"),
-                    "folder": folder
-                })
-    
-    return {"predictions": predictions[:20]}  # Dernières 20 prédictions
\ No newline at end of file
+def list_predictions(
+    limit: int = Query(20, ge=1, le=100, description="Nombre de prédictions par page"),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente (next_cursor)"),
+    dominant_class: Optional[str] = Query(None, description="Filtre sur la classe dominante"),
+    since: Optional[datetime] = Query(None, description="Prédictions à partir de cette date (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Prédictions jusqu'à cette date (ISO 8601)"),
+    filename: Optional[str] = Query(None, description="Filtre sur le nom de fichier (sous-chaîne)")
+):
+    """Liste les prédictions effectuées (plus récentes d'abord), via l'index de l'historique"""
+    items, next_cursor = prediction_history.query(
+        limit=limit, cursor=cursor, dominant_class=dominant_class,
+        since=since, until=until, filename=filename
+    )
+    return {"predictions": items, "next_cursor": next_cursor}
+
+@router.get("/predictions/{folder}/{artifact}", name="get_prediction_artifact")
+async def get_prediction_artifact(folder: str, artifact: str):
+    """Retourne un artefact PNG d'une prédiction (original, prediction_mask, overlay, side_by_side)"""
+    if artifact not in settings.ARTIFACT_FILES or not re.fullmatch(r"[\w-]+-result", folder):
+        raise HTTPException(status_code=404, detail="Artefact introuvable")
+    
+    path = os.path.join(settings.PREDICTIONS_DIR, folder, settings.ARTIFACT_FILES[artifact])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Artefact introuvable")
+    
+    return FileResponse(path, media_type="image/png")
+
+@router.get("/profiles")
+def get_profiles(request: Request):
+    """Liste les profils enregistrés (plus récents d'abord) avec leurs fichiers"""
+    _check_profiling_access(request)
+    return {"profiles": list_profiles(settings.PROFILES_DIR)}
+
+@router.get("/profiles/{profile_id}/{name:path}")
+def get_profile_file(request: Request, profile_id: str, name: str):
+    """Retourne un fichier d'un profil (cprofile.prof, cprofile.txt, sampling.folded, memory.txt, tf/...)"""
+    _check_profiling_access(request)
+    root = os.path.realpath(os.path.join(settings.PROFILES_DIR, profile_id + PROFILE_SUFFIX))
+    path = os.path.realpath(os.path.join(root, name))
+    if not re.fullmatch(r"[\w-]+", profile_id) or not path.startswith(root + os.sep) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Fichier de profil introuvable")
+    
+    media_type = "text/plain" if path.endswith((".txt", ".folded")) else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
@@ -9,21 +9,25 @@ class ClassStatistic(BaseModel):
     percentage: float
 
 class ImageSet(BaseModel):
-    original: str  # base64
-    prediction_mask: str  # base64
-    overlay: str  # base64
-    side_by_side: str  # base64
+    # Seuls les artefacts demandés via `outputs` sont présents
+    original: Optional[str] = None  # base64
+    prediction_mask: Optional[str] = None  # base64
+    overlay: Optional[str] = None  # base64
+    side_by_side: Optional[str] = None  # base64
 
 class PredictionResponse(BaseModel):
     class_statistics: List[ClassStatistic]
     image_size: List[int]
     segmented_image_size: List[int]
     num_classes: int
+    inference: Optional[Dict[str, Any]] = None  # mode (standard, tiled), nombre de tuiles
     dominant_class: str
     dominant_class_percentage: float
     timestamp: str
     filename: str
-    images: ImageSet
+    model: Optional[str] = None  # identifiant du modèle (run MLflow) qui a produit le résultat
+    images: Optional[ImageSet] = None
+    image_urls: Optional[Dict[str, str]] = None  # response_format=urls
     artifacts_path: str
 
 class ErrorResponse(BaseModel):
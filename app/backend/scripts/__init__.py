@@ -0,0 +1 @@
+# app/backend/scripts/__init__.py
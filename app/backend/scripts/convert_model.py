@@ -0,0 +1,257 @@
+# app/backend/scripts/convert_model.py
+"""Conversion du modèle Keras pour les moteurs TFLite / ONNX et contrôle de non-régression
+
+Sous-commandes :
+    tflite : conversion TFLite (none, float16, dynamic ou int8). La quantification int8
+             est calibrée sur des images locales (--calibration-dir).
+    onnx   : conversion ONNX (paquet tf2onnx requis), quantification dynamique optionnelle
+             (onnxruntime requis).
+    check  : compare un modèle converti au modèle Keras sur des images locales. La mesure
+             porte sur la perte de mIoU face aux vérités terrain (--labels-dir), à défaut sur
+             l'accord des masques. Le code de sortie vaut 1 au-delà du seuil.
+
+Par défaut, le modèle converti est écrit dans le répertoire des artefacts (model.tflite,
+model.onnx), où MODEL_BACKEND=tflite|onnx le trouve.
+
+Usage (depuis app/backend, avec les mêmes variables d'environnement que l'API) :
+    python -m scripts.convert_model tflite --quantization int8 --calibration-dir leftImg8bit/train
+    python -m scripts.convert_model check leftImg8bit/val --labels-dir gtFine/val --backend tflite
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+QUANTIZATIONS = ("none", "float16", "dynamic", "int8")
+
+
+def find_images(directory: str, limit: Optional[int] = None) -> List[str]:
+    """Images du répertoire (récursif), réparties uniformément sur l'arborescence si `limit` est atteint"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if limit is not None and len(paths) > limit:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).astype(int)]
+    return paths
+
+def representative_dataset(paths: List[str]) -> Iterator[List[np.ndarray]]:
+    """Jeu de calibration : entrées float32 [0,1] (1, H, W, 3), prétraitées comme à l'inférence"""
+    from utils.image_processing import prepare_model_input
+
+    for path in paths:
+        with Image.open(path) as image:
+            pixels = prepare_model_input(image, settings.IMG_SIZE)
+        yield [pixels[np.newaxis].astype(np.float32) / 255.0]
+
+def load_reference():
+    """Prédicteur Keras de référence (répertoire des artefacts, modèle, fonction d'inférence)"""
+    from models.predictor import SegmentationPredictor
+    return SegmentationPredictor()
+
+def convert_tflite(args) -> str:
+    import tensorflow as tf
+
+    if args.quantization == "int8" and not args.calibration_dir:
+        raise SystemExit("--calibration-dir est requis pour la quantification int8")
+
+    predictor = load_reference()
+    try:
+        output = args.output or os.path.join(predictor.artifacts_dir, "model.tflite")
+        with tempfile.TemporaryDirectory() as saved_model_dir:
+            # Export SavedModel : les variables du modèle Keras 3 y sont figées pour le convertisseur
+            predictor.model.export(saved_model_dir, format="tf_saved_model", verbose=False)
+            converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+
+            if args.quantization != "none":
+                converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if args.quantization == "float16":
+                converter.target_spec.supported_types = [tf.float16]
+            if args.quantization == "int8":
+                paths = find_images(args.calibration_dir, args.calibration_images)
+                if not paths:
+                    raise SystemExit(f"Aucune image de calibration dans {args.calibration_dir}")
+                logger.info(f"Calibration sur {len(paths)} image(s)")
+                converter.representative_dataset = lambda: representative_dataset(paths)
+                converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+                # Entrée uint8 à l'échelle 1/255 : les pixels sont passés sans conversion
+                converter.inference_input_type = tf.uint8
+
+            start = time.perf_counter()
+            model_bytes = converter.convert()
+        with open(output, "wb") as f:
+            f.write(model_bytes)
+    finally:
+        predictor.shutdown()
+
+    logger.info(f"Modèle TFLite ({args.quantization}) écrit dans {output} : "
+                f"{len(model_bytes) / 2**20:.1f} Mo en {time.perf_counter() - start:.1f}s")
+    return output
+
+def convert_onnx(args) -> str:
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError:
+        raise SystemExit("La conversion ONNX nécessite le paquet tf2onnx (pip install tf2onnx onnxruntime)")
+
+    predictor = load_reference()
+    try:
+        output = args.output or os.path.join(predictor.artifacts_dir, "model.onnx")
+        model = predictor.model
+        spec = (tf.TensorSpec([None, settings.IMG_SIZE[0], settings.IMG_SIZE[1], 3], tf.float32, name="images"),)
+
+        @tf.function(input_signature=spec)
+        def serve(images):
+            return model(images, training=False)
+
+        tf2onnx.convert.from_function(serve, input_signature=spec, opset=args.opset, output_path=output)
+    finally:
+        predictor.shutdown()
+
+    if args.quantization == "dynamic":
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise SystemExit("La quantification ONNX nécessite le paquet onnxruntime")
+        float_output = output + ".float"
+        os.replace(output, float_output)
+        quantize_dynamic(float_output, output, weight_type=QuantType.QInt8)
+        os.remove(float_output)
+
+    logger.info(f"Modèle ONNX ({args.quantization}) écrit dans {output} : {os.path.getsize(output) / 2**20:.1f} Mo")
+    return output
+
+def check(args) -> int:
+    """Compare le modèle converti au modèle Keras ; retourne le code de sortie (1 en cas de régression)"""
+    from models.backends import find_backend_model, load_converted_backend
+    from scripts.evaluate import find_pairs
+    from scripts.segment_directory import build_dataset, unreadable_images
+    from utils.evaluation import ConfusionMatrix
+    from utils.image_processing import load_label_groups
+
+    if args.labels_dir:
+        pairs = find_pairs(args.images_dir, args.labels_dir, args.label_suffix)[:args.limit]
+        paths, labels = [image for image, _ in pairs], [label for _, label in pairs]
+    else:
+        paths, labels = find_images(args.images_dir, args.limit), None
+    if not paths:
+        raise SystemExit(f"Aucune image dans {args.images_dir}")
+
+    reference = load_reference()
+    try:
+        model_path = args.model_path or find_backend_model(reference.artifacts_dir, args.backend)
+        candidate = load_converted_backend(args.backend, model_path, args.threads)
+        agreement = ConfusionMatrix(settings.NUM_CLASSES)
+        reference_cm = ConfusionMatrix(settings.NUM_CLASSES)
+        candidate_cm = ConfusionMatrix(settings.NUM_CLASSES)
+        timings = {"keras": 0.0, args.backend: 0.0}
+        model_size = (settings.IMG_SIZE[1], settings.IMG_SIZE[0])
+
+        # Passe de chauffe (traçage, allocation des tenseurs)
+        warmup = reference.prepare_batch(np.zeros((args.batch_size, *settings.IMG_SIZE, 3), dtype=np.uint8))
+        reference.infer_batch(warmup)
+        candidate.infer(warmup)
+
+        seen = set()
+        for batch, _, indices in build_dataset(paths, args.batch_size):
+            # Entrées préparées comme par l'API (normalisation selon NORMALIZE_IN_GRAPH)
+            batch = reference.prepare_batch(batch.numpy())
+            start = time.perf_counter()
+            reference_masks = np.argmax(reference.infer_batch(batch), axis=-1).astype(np.uint8)
+            timings["keras"] += time.perf_counter() - start
+            start = time.perf_counter()
+            candidate_masks = np.argmax(candidate.infer(batch), axis=-1).astype(np.uint8)
+            timings[args.backend] += time.perf_counter() - start
+
+            for reference_mask, candidate_mask, index in zip(reference_masks, candidate_masks, indices.numpy()):
+                agreement.update(reference_mask, candidate_mask)
+                if labels is not None:
+                    label = load_label_groups(labels[index], reference.group_lut, model_size)
+                    reference_cm.update(label, reference_mask)
+                    candidate_cm.update(label, candidate_mask)
+                seen.add(int(index))
+        unreadable = unreadable_images(paths, seen)
+        if not seen:
+            raise SystemExit(f"Aucune image lisible dans {args.images_dir}")
+        keras_path = reference._find_keras_model(reference.artifacts_dir)
+    finally:
+        reference.shutdown()
+
+    report = {
+        "backend": candidate.describe(),
+        "images": len(seen),
+        "unreadable_images": len(unreadable),
+        "keras_model_size_bytes": os.path.getsize(keras_path),
+        "ms_per_image": {name: seconds / len(seen) * 1000 for name, seconds in timings.items()},
+        # Accord avec le modèle Keras (masques Keras pris comme référence)
+        "agreement": {"pixel_accuracy": agreement.pixel_accuracy(), "mean_iou": agreement.mean_iou()}
+    }
+    if labels is not None:
+        report["mean_iou"] = {"keras": reference_cm.mean_iou(), args.backend: candidate_cm.mean_iou()}
+        report["mean_iou_drop"] = reference_cm.mean_iou() - candidate_cm.mean_iou()
+        failed = report["mean_iou_drop"] > args.max_drop
+    else:
+        # Sans vérités terrain, seul l'accord avec le modèle Keras est contrôlé
+        failed = report["agreement"]["mean_iou"] < args.min_agreement
+    report["passed"] = not failed
+
+    print(json.dumps(report, indent=2))
+    if failed:
+        logger.error("Régression de précision au-delà du seuil toléré")
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tflite = subparsers.add_parser("tflite", help="Conversion TFLite")
+    tflite.add_argument("--quantization", choices=QUANTIZATIONS, default="dynamic", help="Quantification du modèle")
+    tflite.add_argument("--calibration-dir", help="Images de calibration (int8)")
+    tflite.add_argument("--calibration-images", type=int, default=200, help="Nombre d'images de calibration")
+    tflite.add_argument("--output", help="Fichier produit (par défaut model.tflite dans les artefacts)")
+
+    onnx = subparsers.add_parser("onnx", help="Conversion ONNX (tf2onnx)")
+    onnx.add_argument("--quantization", choices=("none", "dynamic"), default="none", help="Quantification du modèle")
+    onnx.add_argument("--opset", type=int, default=17, help="Version de l'opset ONNX")
+    onnx.add_argument("--output", help="Fichier produit (par défaut model.onnx dans les artefacts)")
+
+    checker = subparsers.add_parser("check", help="Contrôle de non-régression face au modèle Keras")
+    checker.add_argument("images_dir", help="Images de contrôle (ex. leftImg8bit/val)")
+    checker.add_argument("--labels-dir", help="Vérités terrain (ex. gtFine/val) pour comparer les mIoU")
+    checker.add_argument("--label-suffix", default="_gtFine_labelIds.png", help="Suffixe des vérités terrain")
+    checker.add_argument("--backend", choices=("tflite", "onnx"), default="tflite", help="Moteur du modèle converti")
+    checker.add_argument("--model-path", help="Modèle converti (par défaut celui des artefacts)")
+    checker.add_argument("--threads", type=int, default=settings.MODEL_NUM_THREADS, help="Threads du moteur (0 = automatique)")
+    checker.add_argument("--limit", type=int, default=200, help="Nombre maximum d'images")
+    checker.add_argument("--batch-size", type=int, default=8, help="Taille des batchs")
+    checker.add_argument("--max-drop", type=float, default=0.01, help="Perte de mIoU tolérée (avec vérités terrain)")
+    checker.add_argument("--min-agreement", type=float, default=0.9, help="mIoU minimum face aux masques Keras (sans vérités terrain)")
+
+    args = parser.parse_args()
+    # Le modèle Keras de référence est toujours chargé dans ce processus, quels que soient
+    # MODEL_BACKEND et MODEL_SERVER_SOCKET (la conversion a besoin du modèle lui-même)
+    settings.MODEL_BACKEND = "keras"
+    settings.MODEL_SERVER_SOCKET = None
+    if args.command == "tflite":
+        convert_tflite(args)
+    elif args.command == "onnx":
+        convert_onnx(args)
+    else:
+        sys.exit(check(args))
+
+if __name__ == "__main__":
+    main()
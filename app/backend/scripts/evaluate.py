@@ -0,0 +1,222 @@
+# app/backend/scripts/evaluate.py
+"""Évaluation du modèle servi sur un jeu Cityscapes : matrice de confusion, IoU par classe, mIoU
+
+Parcourt les paires image / vérité terrain (gtFine *_labelIds.png), convertit les identifiants
+Cityscapes bruts en groupes via id_to_group et cumule une matrice de confusion 8x8 (mémoire
+constante). Les rapports CSV ont le même format que notebooks/experiments/*/results.
+
+Usage (depuis app/backend) :
+    # Évaluation avec le modèle (RUN_ID / MODEL_LOCAL_PATH), éventuellement par shards parallèles
+    python -m scripts.evaluate run leftImg8bit/val gtFine/val --output-dir results
+    python -m scripts.evaluate run leftImg8bit/val gtFine/val --shard 0/4 --save-matrix shard0.npz
+
+    # Évaluation de masques déjà produits par scripts.segment_directory (sans modèle)
+    python -m scripts.evaluate run leftImg8bit/val gtFine/val --masks-dir masks/val \\
+        --class-mapping .model_cache/<run_id>/class_mapping.json --output-dir results
+
+    # Fusion des shards
+    python -m scripts.evaluate merge shard0.npz shard1.npz shard2.npz shard3.npz --output-dir results
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+from utils.evaluation import ConfusionMatrix
+from utils.image_processing import build_group_lut, load_label_groups
+from scripts.segment_directory import CITYSCAPES_SUFFIX, output_path_for
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABEL_SUFFIX = "_gtFine_labelIds.png"
+
+
+def find_pairs(images_dir: str, labels_dir: str, label_suffix: str = LABEL_SUFFIX) -> List[Tuple[str, str]]:
+    """Paires (image, vérité terrain) triées ; les images sans vérité terrain sont ignorées"""
+    pairs = []
+    for root, dirs, files in os.walk(images_dir):
+        dirs.sort()
+        for name in sorted(files):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in (".png", ".jpg", ".jpeg"):
+                continue
+            if stem.endswith(CITYSCAPES_SUFFIX):
+                stem = stem[:-len(CITYSCAPES_SUFFIX)]
+            relative_dir = os.path.relpath(root, images_dir)
+            label_path = os.path.join(labels_dir, relative_dir, stem + label_suffix)
+            if os.path.exists(label_path):
+                pairs.append((os.path.join(root, name), label_path))
+    return pairs
+
+def select_shard(pairs: List[Tuple[str, str]], shard: Optional[str]) -> List[Tuple[str, str]]:
+    """Sous-ensemble déterministe k/n des paires (répartition entrelacée)"""
+    if not shard:
+        return pairs
+    index, count = (int(value) for value in shard.split("/"))
+    if not 0 <= index < count:
+        raise ValueError(f"Shard invalide: {shard}")
+    return pairs[index::count]
+
+def prefetch(fn: Callable, items: Iterable, pool: ThreadPoolExecutor, depth: int) -> Iterator:
+    """Applique fn dans le pool en gardant au plus `depth` résultats d'avance (ordre conservé)"""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def resize_nearest(mask: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Redimensionne un masque (plus proche voisin) à la taille (largeur, hauteur)"""
+    if mask.shape[:2] == (size[1], size[0]):
+        return mask
+    return np.asarray(Image.fromarray(mask).resize(size, Image.NEAREST))
+
+def evaluate_with_model(pairs: List[Tuple[str, str]], lut: Optional[np.ndarray],
+                        resolution: str, batch_size: int, workers: int) -> ConfusionMatrix:
+    """Inférence par batchs (pipeline tf.data de scripts.segment_directory) et cumul de la matrice
+
+    Sans table fournie, la conversion des vérités terrain utilise le id_to_group du modèle.
+    """
+    from models.predictor import SegmentationPredictor
+    from scripts.segment_directory import build_dataset, unreadable_images
+
+    predictor = SegmentationPredictor()
+    if lut is None:
+        lut = predictor.group_lut
+    confusion = ConfusionMatrix(settings.NUM_CLASSES)
+    label_size = (settings.IMG_SIZE[1], settings.IMG_SIZE[0]) if resolution == "model" else None
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            labels = prefetch(lambda path: load_label_groups(path, lut, label_size),
+                              (label for _, label in pairs), pool, depth=batch_size * 2)
+            images = [image for image, _ in pairs]
+            seen, position = set(), 0
+            for batch, _, indices in build_dataset(images, batch_size):
+                predictions = predictor.infer_batch(predictor.prepare_batch(batch.numpy()))
+                masks = np.argmax(predictions, axis=-1).astype(np.uint8)
+                for mask, index in zip(masks, indices.numpy()):
+                    # Vérités terrain des images illisibles (écartées par build_dataset) ignorées
+                    for _ in range(position, index):
+                        next(labels)
+                    label = next(labels)
+                    position = index + 1
+                    seen.add(int(index))
+                    confusion.update(label, resize_nearest(mask, (label.shape[1], label.shape[0])))
+                if confusion.num_images % (batch_size * 20) < batch_size:
+                    logger.info(f"{confusion.num_images}/{len(pairs)} image(s) évaluée(s), "
+                                f"{confusion.num_images / (time.perf_counter() - start):.1f} images/s")
+            unreadable = unreadable_images(images, seen)
+            if unreadable:
+                logger.warning(f"{len(unreadable)} image(s) illisible(s) non évaluée(s)")
+    finally:
+        predictor.shutdown()
+    return confusion
+
+def evaluate_masks(pairs: List[Tuple[str, str]], images_dir: str, masks_dir: str, lut: np.ndarray,
+                   resolution: str, workers: int) -> ConfusionMatrix:
+    """Évalue des masques déjà produits (PNG palette, indices = groupes) sans charger le modèle"""
+    confusion = ConfusionMatrix(settings.NUM_CLASSES)
+    model_size = (settings.IMG_SIZE[1], settings.IMG_SIZE[0])
+
+    def load_pair(pair: Tuple[str, str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        image_path, label_path = pair
+        mask_path = output_path_for(images_dir, masks_dir, image_path)
+        if not os.path.exists(mask_path):
+            return None
+        label = load_label_groups(label_path, lut, model_size if resolution == "model" else None)
+        mask = resize_nearest(np.asarray(Image.open(mask_path)), (label.shape[1], label.shape[0]))
+        return label, mask
+
+    missing = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for loaded in prefetch(load_pair, pairs, pool, depth=workers * 4):
+            if loaded is None:
+                missing += 1
+                continue
+            confusion.update(*loaded)
+    if missing:
+        logger.warning(f"{missing} masque(s) introuvable(s) dans {masks_dir}")
+    return confusion
+
+def report(confusion: ConfusionMatrix, output_dir: Optional[str], save_matrix: Optional[str]):
+    if save_matrix:
+        confusion.save(save_matrix)
+        logger.info(f"Matrice de confusion enregistrée dans {save_matrix}")
+    if output_dir:
+        confusion.write_csv_reports(output_dir, settings.GROUP_NAMES)
+        logger.info(f"Rapports CSV écrits dans {output_dir}")
+    print(json.dumps(confusion.to_dict(settings.GROUP_NAMES), indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Évaluer un jeu (ou un shard) d'images")
+    run.add_argument("images_dir", help="Racine des images (ex. leftImg8bit/val)")
+    run.add_argument("labels_dir", help="Racine des vérités terrain (ex. gtFine/val)")
+    run.add_argument("--label-suffix", default=LABEL_SUFFIX, help="Suffixe des fichiers de vérité terrain")
+    run.add_argument("--masks-dir", help="Masques déjà produits par scripts.segment_directory (pas d'inférence)")
+    run.add_argument("--class-mapping", help="class_mapping.json (id_to_group) ; par défaut celui du modèle")
+    run.add_argument("--resolution", choices=("model", "original"), default="model",
+                     help="Comparaison à la résolution du modèle (comme les notebooks) ou de la vérité terrain")
+    run.add_argument("--shard", help="Shard k/n à évaluer (ex. 0/4)")
+    run.add_argument("--batch-size", type=int, default=16, help="Taille des batchs d'inférence")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Threads de lecture des vérités terrain")
+    run.add_argument("--limit", type=int, default=None, help="Nombre maximum de paires évaluées")
+    run.add_argument("--output-dir", help="Répertoire des rapports CSV")
+    run.add_argument("--save-matrix", help="Fichier .npz de la matrice (pour fusionner les shards)")
+
+    merge = subparsers.add_parser("merge", help="Fusionner les matrices de plusieurs shards")
+    merge.add_argument("matrices", nargs="+", help="Fichiers .npz produits par --save-matrix")
+    merge.add_argument("--output-dir", help="Répertoire des rapports CSV")
+    merge.add_argument("--save-matrix", help="Fichier .npz de la matrice fusionnée")
+
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        confusion = ConfusionMatrix.load(args.matrices[0])
+        for path in args.matrices[1:]:
+            confusion.merge(ConfusionMatrix.load(path))
+        report(confusion, args.output_dir, args.save_matrix)
+        return
+
+    pairs = select_shard(find_pairs(args.images_dir, args.labels_dir, args.label_suffix), args.shard)
+    if args.limit is not None:
+        pairs = pairs[:args.limit]
+    logger.info(f"{len(pairs)} paire(s) image / vérité terrain à évaluer")
+    if not pairs:
+        return
+
+    lut = None
+    if args.class_mapping:
+        with open(args.class_mapping, "r") as f:
+            lut = build_group_lut(json.load(f)["id_to_group"])
+
+    start = time.perf_counter()
+    if args.masks_dir:
+        if lut is None:
+            parser.error("--class-mapping est requis avec --masks-dir")
+        confusion = evaluate_masks(pairs, args.images_dir, args.masks_dir, lut, args.resolution, args.workers)
+    else:
+        confusion = evaluate_with_model(pairs, lut, args.resolution, args.batch_size, args.workers)
+    logger.info(f"{confusion.num_images} image(s) évaluée(s) en {time.perf_counter() - start:.1f}s")
+    if not confusion.num_images:
+        return
+
+    report(confusion, args.output_dir, args.save_matrix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# app/backend/scripts/migrate_results.py
+"""Migre les dossiers de résultats vers le format compact
+
+Remplace prediction_result_full.json (listes JSON du masque de classes et du masque coloré)
+par prediction_mask.npz (masque de classes uint8 compressé). Le masque coloré n'est pas
+conservé : il se déduit des identifiants de classes.
+
+Usage (depuis app/backend) :
+    python -m scripts.migrate_results [--predictions-dir predictions] [--keep-json] [--dry-run]
+"""
+import argparse
+import logging
+import os
+
+from config import settings
+from utils.result_store import LEGACY_FULL_FILE, migrate_result_dir
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--predictions-dir", default=settings.PREDICTIONS_DIR, help="Répertoire des résultats")
+    parser.add_argument("--keep-json", action="store_true", help="Conserver prediction_result_full.json après conversion")
+    parser.add_argument("--dry-run", action="store_true", help="Lister les dossiers à convertir sans rien modifier")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.predictions_dir):
+        logger.error(f"Répertoire introuvable: {args.predictions_dir}")
+        return
+
+    converted, failed, freed_bytes = 0, 0, 0
+    for folder in sorted(os.listdir(args.predictions_dir)):
+        result_dir = os.path.join(args.predictions_dir, folder)
+        legacy_path = os.path.join(result_dir, LEGACY_FULL_FILE)
+        if not os.path.isfile(legacy_path):
+            continue
+
+        size = os.path.getsize(legacy_path)
+        if args.dry_run:
+            logger.info(f"À convertir: {folder} ({size / 1024:.0f} Ko)")
+            converted += 1
+            continue
+
+        try:
+            migrate_result_dir(result_dir, keep_json=args.keep_json)
+            converted += 1
+            if not args.keep_json:
+                freed_bytes += size
+        except Exception as e:
+            failed += 1
+            logger.error(f"Échec de la conversion de {folder}: {str(e)}")
+
+    action = "à convertir" if args.dry_run else "convertis"
+    logger.info(f"{converted} dossier(s) {action}, {failed} échec(s), {freed_bytes / 2**20:.1f} Mo libérés")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# app/backend/scripts/rebuild_history.py
+"""Reconstruit l'index SQLite de l'historique depuis les dossiers de résultats
+
+Ajoute les dossiers absents de l'index et retire les entrées dont le dossier n'existe plus.
+
+Usage (depuis app/backend) :
+    python -m scripts.rebuild_history [--predictions-dir predictions] [--db-path predictions/history.sqlite3]
+"""
+import argparse
+import logging
+
+from config import settings
+from utils.history import PredictionHistory
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--predictions-dir", default=settings.PREDICTIONS_DIR, help="Répertoire des résultats")
+    parser.add_argument("--db-path", default=settings.HISTORY_DB_PATH, help="Fichier SQLite de l'index")
+    args = parser.parse_args()
+
+    history = PredictionHistory(args.db_path, args.predictions_dir)
+    try:
+        history.rebuild()
+    finally:
+        history.close()
+
+if __name__ == "__main__":
+    main()
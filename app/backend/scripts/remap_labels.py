@@ -0,0 +1,113 @@
+# app/backend/scripts/remap_labels.py
+"""Conversion d'une arborescence de vérités terrain Cityscapes (*_labelIds.png) en groupes
+
+Chaque carte d'identifiants bruts (0-33, 255 / -1) est convertie en identifiants de groupes
+(0-7) par la table id_to_group de class_mapping.json, puis écrite en PNG palette (couleurs des
+groupes, superposable aux masques prédits). Les fichiers sont traités en parallèle par un pool
+de processus ; les cartes déjà converties sont ignorées (reprise possible).
+
+Usage (depuis app/backend) :
+    python -m scripts.remap_labels gtFine/val groups/val --class-mapping .model_cache/<run_id>/class_mapping.json
+        [--unknown ignore|void] [--workers N] [--limit N]
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.image_processing import (
+    IGNORE_INDEX, build_group_lut, build_palette_lut, load_label_groups, mask_to_palette_image
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABEL_SUFFIX = "_labelIds"
+GROUP_SUFFIX = "_groupIds"
+
+
+def output_path_for(input_dir: str, output_dir: str, path: str) -> str:
+    """Même arborescence relative, suffixe _labelIds remplacé par _groupIds"""
+    stem = os.path.splitext(os.path.relpath(path, input_dir))[0]
+    if stem.endswith(LABEL_SUFFIX):
+        stem = stem[:-len(LABEL_SUFFIX)]
+    return os.path.join(output_dir, stem + GROUP_SUFFIX + ".png")
+
+def find_pending_labels(input_dir: str, output_dir: str, pattern: str,
+                        limit: Optional[int] = None) -> Tuple[List[Tuple[str, str]], int]:
+    """Paires (carte d'entrée, chemin de sortie) à traiter ; nombre de cartes déjà converties"""
+    pending, skipped = [], 0
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            path = os.path.join(root, name)
+            output = output_path_for(input_dir, output_dir, path)
+            if os.path.exists(output):
+                skipped += 1
+                continue
+            pending.append((path, output))
+            if limit is not None and len(pending) >= limit:
+                return pending, skipped
+    return pending, skipped
+
+def remap_file(path: str, output: str, lut: np.ndarray) -> int:
+    """Convertit une carte et l'écrit en PNG palette (exécuté dans un processus) ; retourne le nombre de pixels"""
+    groups = load_label_groups(path, lut)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    # Écriture atomique : un fichier partiel n'est jamais pris pour une carte convertie
+    tmp_path = output + ".tmp"
+    mask_to_palette_image(groups, build_palette_lut(settings.GROUP_COLORS)).save(tmp_path, format="PNG")
+    os.replace(tmp_path, output)
+    return groups.size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Racine des vérités terrain (ex. gtFine/val)")
+    parser.add_argument("output_dir", help="Racine des cartes de groupes produites")
+    parser.add_argument("--class-mapping", required=True, help="class_mapping.json du modèle (id_to_group)")
+    parser.add_argument("--unknown", choices=("ignore", "void"), default="ignore",
+                        help=f"Identifiants hors table : {IGNORE_INDEX} (exclus de l'évaluation) ou groupe void")
+    parser.add_argument("--pattern", default=f"*{LABEL_SUFFIX}.png", help="Motif des noms de fichiers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximum de cartes à convertir")
+    args = parser.parse_args()
+
+    with open(args.class_mapping, "r") as f:
+        id_to_group = json.load(f)["id_to_group"]
+    fill = settings.GROUP_NAMES.index("void") if args.unknown == "void" else IGNORE_INDEX
+    lut = build_group_lut(id_to_group, fill=fill)
+
+    pending, skipped = find_pending_labels(args.input_dir, args.output_dir, args.pattern, args.limit)
+    logger.info(f"{len(pending)} carte(s) à convertir, {skipped} déjà convertie(s)")
+    if not pending:
+        return
+
+    done, failed, pixels = 0, 0, 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [(pool.submit(remap_file, path, output, lut), path) for path, output in pending]
+        for future, path in futures:
+            try:
+                pixels += future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Échec de la conversion de {path}: {str(e)}")
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Terminé : {done} carte(s) convertie(s), {failed} échec(s) en {elapsed:.1f}s "
+        f"({done / elapsed:.1f} cartes/s, {pixels / elapsed / 1e6:.0f} Mpx/s)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# app/backend/scripts/segment_directory.py
+"""Segmentation hors ligne d'une arborescence d'images (type Cityscapes leftImg8bit/)
+
+Charge le modèle directement (sans serveur), lit les images avec un pipeline tf.data
+(décodage parallèle, préchargement), exécute l'inférence par batchs et écrit les masques
+(PNG en mode palette, identifiants de groupes 0-7) avec un pool de processus d'écriture.
+Reprise possible : les masques déjà présents sont ignorés. Une image illisible est journalisée
+et comptée comme échec sans interrompre le traitement.
+
+Usage (depuis app/backend) :
+    python -m scripts.segment_directory INPUT_DIR OUTPUT_DIR [--batch-size 16] [--writers N]
+        [--mask-size original|model] [--pattern "*_leftImg8bit.png"] [--limit N]
+"""
+import argparse
+import fnmatch
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.image_processing import build_palette_lut, mask_to_palette_image
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+CITYSCAPES_SUFFIX = "_leftImg8bit"
+MASK_SUFFIX = "_mask.png"
+
+
+def output_path_for(input_dir: str, output_dir: str, path: str) -> str:
+    """Chemin du masque : même arborescence relative, suffixe _leftImg8bit remplacé par _mask"""
+    relative = os.path.relpath(path, input_dir)
+    stem = os.path.splitext(relative)[0]
+    if stem.endswith(CITYSCAPES_SUFFIX):
+        stem = stem[:-len(CITYSCAPES_SUFFIX)]
+    return os.path.join(output_dir, stem + MASK_SUFFIX)
+
+def find_pending_images(input_dir: str, output_dir: str, pattern: str,
+                        limit: Optional[int] = None) -> Tuple[List[str], List[str], int]:
+    """Images à traiter et chemins de sortie correspondants ; nombre d'images déjà traitées"""
+    inputs, outputs, skipped = [], [], 0
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS) or not fnmatch.fnmatch(name, pattern):
+                continue
+            path = os.path.join(root, name)
+            output = output_path_for(input_dir, output_dir, path)
+            if os.path.exists(output):
+                skipped += 1
+                continue
+            inputs.append(path)
+            outputs.append(output)
+            if limit is not None and len(inputs) >= limit:
+                return inputs, outputs, skipped
+    return inputs, outputs, skipped
+
+def write_mask(mask: np.ndarray, size: Optional[Tuple[int, int]], path: str):
+    """Redimensionne (plus proche voisin) et écrit un masque en PNG palette (exécuté dans un processus d'écriture)"""
+    from PIL import Image
+
+    palette = build_palette_lut(settings.GROUP_COLORS)[:settings.NUM_CLASSES]
+    mask_img = mask_to_palette_image(mask, palette)
+    if size is not None and mask_img.size != size:
+        mask_img = mask_img.resize(size, Image.NEAREST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Écriture atomique : un fichier partiel (arrêt brutal) n'est jamais pris pour un masque terminé
+    tmp_path = path + ".tmp"
+    mask_img.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+
+def build_dataset(paths: List[str], batch_size: int):
+    """Pipeline tf.data : lecture et décodage parallèles, redimensionnement uint8, batchs préchargés
+
+    Éléments : (images, tailles d'origine, indices dans `paths`). Une image illisible est écartée
+    au lieu d'interrompre le traitement (voir unreadable_images).
+    """
+    import tensorflow as tf
+
+    height, width = settings.IMG_SIZE
+
+    def load(index, path):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        original_size = tf.shape(image)[:2]
+        resized = tf.image.resize(image, (height, width), method=tf.image.ResizeMethod.BILINEAR, antialias=True)
+        resized = tf.cast(tf.clip_by_value(tf.round(resized), 0, 255), tf.uint8)
+        return resized, original_size, index
+
+    dataset = tf.data.Dataset.from_tensor_slices((np.arange(len(paths), dtype=np.int64), paths))
+    dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    # Erreurs de lecture ou de décodage : l'élément est écarté, l'ordre des autres est conservé
+    dataset = dataset.ignore_errors()
+    dataset = dataset.batch(batch_size)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def unreadable_images(paths: List[str], seen: Set[int]) -> List[str]:
+    """Images écartées par build_dataset (indices jamais produits), journalisées"""
+    missing = [path for index, path in enumerate(paths) if index not in seen]
+    for path in missing:
+        logger.error(f"Image illisible ignorée: {path}")
+    return missing
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Racine des images (ex. leftImg8bit/val)")
+    parser.add_argument("output_dir", help="Racine des masques produits")
+    parser.add_argument("--pattern", default="*", help="Motif des noms de fichiers (ex. \"*_leftImg8bit.png\")")
+    parser.add_argument("--batch-size", type=int, default=16, help="Taille des batchs d'inférence")
+    parser.add_argument("--writers", type=int, default=os.cpu_count() or 1, help="Nombre de processus d'écriture")
+    parser.add_argument("--mask-size", choices=("original", "model"), default="original",
+                        help="Masques à la taille de l'image d'origine ou du modèle")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximum d'images à traiter")
+    parser.add_argument("--log-every", type=int, default=20, help="Fréquence du suivi de progression (en batchs)")
+    args = parser.parse_args()
+
+    inputs, outputs, skipped = find_pending_images(args.input_dir, args.output_dir, args.pattern, args.limit)
+    logger.info(f"{len(inputs)} image(s) à segmenter, {skipped} déjà traitée(s)")
+    if not inputs:
+        return
+
+    # Import tardif : les processus d'écriture (spawn) n'importent pas TensorFlow
+    from models.predictor import SegmentationPredictor
+
+    predictor = SegmentationPredictor()
+    dataset = build_dataset(inputs, args.batch_size)
+
+    # Processus démarrés par spawn : fork après l'initialisation de TensorFlow n'est pas sûr
+    writers = ProcessPoolExecutor(max_workers=args.writers, mp_context=get_context("spawn"))
+    pending = deque()
+    done, failed = 0, 0
+    start = time.perf_counter()
+
+    def collect(block_until: int):
+        nonlocal done, failed
+        while len(pending) > block_until:
+            future, path = pending.popleft()
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Échec de l'écriture de {path}: {str(e)}")
+
+    try:
+        seen = set()
+        for batch_number, (batch, sizes, indices) in enumerate(dataset, start=1):
+            predictions = predictor.infer_batch(predictor.prepare_batch(batch.numpy()))
+            masks = np.argmax(predictions, axis=-1).astype(np.uint8)
+            for mask, (height, width), index in zip(masks, sizes.numpy(), indices.numpy()):
+                size = (int(width), int(height)) if args.mask_size == "original" else None
+                future = writers.submit(write_mask, mask, size, outputs[index])
+                pending.append((future, outputs[index]))
+                seen.add(int(index))
+
+            # Contre-pression : pas plus de quelques batchs en attente d'écriture
+            collect(block_until=args.writers * 4 + args.batch_size)
+
+            if batch_number % args.log_every == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{len(seen)}/{len(inputs)} image(s) segmentée(s), {len(seen) / elapsed:.1f} images/s")
+        collect(block_until=0)
+        # Images illisibles : aucun masque écrit, comptées comme échecs (retentées à la reprise)
+        failed += len(unreadable_images(inputs, seen))
+    finally:
+        writers.shutdown(wait=True)
+        predictor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Terminé : {done} masque(s) écrit(s), {failed} échec(s), {skipped} ignoré(s) "
+        f"en {elapsed:.1f}s ({done / elapsed:.1f} images/s)"
+    )
+
+if __name__ == "__main__":
+    main()
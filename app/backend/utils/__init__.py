@@ -1 +1 @@
-from utils.image_processing import decode_base64_image, encode_image_to_base64
\ No newline at end of file
+from utils.image_processing import decode_base64_image, encode_image_to_base64, encode_image_to_png, rle_encode_mask, rle_decode_mask
\ No newline at end of file
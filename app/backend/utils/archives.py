@@ -0,0 +1,64 @@
+# app/backend/utils/archives.py
+import io
+import os
+import tarfile
+import zipfile
+from typing import List, Tuple
+
+# Extensions d'images extraites des archives (les autres membres sont ignorés)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp"}
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+class ArchiveLimitError(ValueError):
+    """Levée lorsqu'un lot dépasse le nombre de fichiers ou la taille autorisés"""
+
+
+def is_archive(filename: str, content_type: str = "") -> bool:
+    """Indique si un fichier envoyé est une archive zip/tar (par extension ou type MIME)"""
+    name = (filename or "").lower()
+    return name.endswith(ARCHIVE_EXTENSIONS) or content_type in (
+        "application/zip", "application/x-zip-compressed", "application/x-tar", "application/gzip", "application/x-gzip"
+    )
+
+def _is_image_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base.startswith(".") and os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+def expand_archive(filename: str, data: bytes, max_files: int, max_bytes: int) -> List[Tuple[str, bytes]]:
+    """Extrait les images d'une archive zip ou tar en mémoire : [(nom, octets), ...]
+
+    Les limites portent sur la taille décompressée déclarée, vérifiée avant extraction
+    (protection contre les archives à fort taux de compression).
+    """
+    members: List[Tuple[str, bytes]] = []
+    total = 0
+
+    def check(name: str, size: int):
+        nonlocal total
+        total += size
+        if len(members) >= max_files:
+            raise ArchiveLimitError(f"{filename}: plus de {max_files} images")
+        if total > max_bytes:
+            raise ArchiveLimitError(f"{filename}: contenu décompressé supérieur à {max_bytes // 2**20} Mo")
+
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_image_name(info.filename):
+                    continue
+                check(info.filename, info.file_size)
+                members.append((info.filename, archive.read(info)))
+        return members
+
+    try:
+        archive = tarfile.open(fileobj=io.BytesIO(data), mode="r:*")
+    except tarfile.TarError:
+        raise ValueError(f"{filename}: archive zip/tar illisible")
+    with archive:
+        for info in archive:
+            if not info.isfile() or not _is_image_name(info.name):
+                continue
+            check(info.name, info.size)
+            members.append((info.name, archive.extractfile(info).read()))
+    return members
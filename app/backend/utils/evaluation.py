@@ -0,0 +1,153 @@
+# app/backend/utils/evaluation.py
+import os
+import csv
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.image_processing import IGNORE_INDEX
+
+
+class ConfusionMatrix:
+    """Matrice de confusion cumulée (lignes : vérité terrain, colonnes : prédiction)
+
+    Mise à jour incrémentale par np.bincount : la mémoire ne dépend pas de la taille du jeu
+    de données, et les matrices de plusieurs shards s'additionnent (merge).
+    """
+
+    def __init__(self, num_classes: int, ignore_index: int = IGNORE_INDEX):
+        self.num_classes = num_classes
+        self.ignore_index = ignore_index
+        self.matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+        self.num_images = 0
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray):
+        """Ajoute une paire (masque de vérité terrain, masque prédit) de même forme"""
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f"Formes différentes : vérité {y_true.shape}, prédiction {y_pred.shape}")
+        y_true = y_true.ravel()
+        y_pred = y_pred.ravel()
+        valid = (y_true != self.ignore_index) & (y_true < self.num_classes) & (y_pred < self.num_classes)
+        if not valid.all():
+            y_true, y_pred = y_true[valid], y_pred[valid]
+        n = self.num_classes
+        self.matrix += np.bincount(
+            y_true.astype(np.int64) * n + y_pred, minlength=n * n
+        ).reshape(n, n)
+        self.num_images += 1
+
+    def merge(self, other: "ConfusionMatrix") -> "ConfusionMatrix":
+        """Ajoute la matrice d'un autre shard"""
+        if other.num_classes != self.num_classes:
+            raise ValueError(f"Nombre de classes différent : {self.num_classes} et {other.num_classes}")
+        self.matrix += other.matrix
+        self.num_images += other.num_images
+        return self
+
+    def save(self, path: str):
+        """Enregistre la matrice d'un shard (.npz) pour une fusion ultérieure"""
+        np.savez(path, matrix=self.matrix, num_images=self.num_images, ignore_index=self.ignore_index)
+
+    @classmethod
+    def load(cls, path: str) -> "ConfusionMatrix":
+        with np.load(path) as data:
+            confusion = cls(data["matrix"].shape[0], ignore_index=int(data["ignore_index"]))
+            confusion.matrix = data["matrix"].astype(np.int64)
+            confusion.num_images = int(data["num_images"])
+        return confusion
+
+    # --- Métriques ---
+
+    @property
+    def true_pixels(self) -> np.ndarray:
+        return self.matrix.sum(axis=1)
+
+    @property
+    def predicted_pixels(self) -> np.ndarray:
+        return self.matrix.sum(axis=0)
+
+    @property
+    def intersection(self) -> np.ndarray:
+        return np.diag(self.matrix)
+
+    @property
+    def union(self) -> np.ndarray:
+        return self.true_pixels + self.predicted_pixels - self.intersection
+
+    def iou_per_class(self) -> np.ndarray:
+        """IoU par classe (NaN pour une classe absente de la vérité et des prédictions)"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.intersection / self.union
+
+    def mean_iou(self) -> float:
+        return float(np.nanmean(self.iou_per_class()))
+
+    def pixel_accuracy(self) -> float:
+        total = self.matrix.sum()
+        return float(self.intersection.sum() / total) if total else 0.0
+
+    def to_dict(self, class_names: List[str]) -> Dict[str, object]:
+        """Résumé des métriques (pour l'API ou un log)"""
+        return {
+            "pixel_accuracy": self.pixel_accuracy(),
+            "mean_iou": self.mean_iou(),
+            "iou_per_class": {name: float(iou) for name, iou in zip(class_names, self.iou_per_class())},
+            "num_images": self.num_images
+        }
+
+    # --- Export CSV (même format que notebooks/experiments/*/results) ---
+
+    def write_csv_reports(self, output_dir: str, class_names: List[str], evaluated_at: Optional[datetime] = None):
+        """Écrit iou_per_class.csv, confusion_matrix.csv, classification_report.csv et evaluation_summary.csv"""
+        os.makedirs(output_dir, exist_ok=True)
+        evaluated_at = evaluated_at or datetime.now()
+        total = int(self.matrix.sum())
+        true_pixels, predicted_pixels = self.true_pixels, self.predicted_pixels
+        intersection, union = self.intersection, self.union
+        iou = self.iou_per_class()
+
+        with open(os.path.join(output_dir, "iou_per_class.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Classe", "IoU", "Pixels_Vrais", "Pixels_Vrais_%", "Pixels_Prédits",
+                             "Pixels_Prédits_%", "Intersection", "Union"])
+            for i, name in enumerate(class_names):
+                writer.writerow([
+                    name, float(iou[i]),
+                    int(true_pixels[i]), true_pixels[i] / total * 100 if total else 0.0,
+                    int(predicted_pixels[i]), predicted_pixels[i] / total * 100 if total else 0.0,
+                    int(intersection[i]), int(union[i])
+                ])
+
+        with open(os.path.join(output_dir, "confusion_matrix.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["", *class_names])
+            for name, row in zip(class_names, self.matrix):
+                writer.writerow([name, *(int(value) for value in row)])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.nan_to_num(intersection / predicted_pixels)
+            recall = np.nan_to_num(intersection / true_pixels)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        weights = true_pixels / total if total else np.zeros(len(class_names))
+        accuracy = self.pixel_accuracy()
+
+        with open(os.path.join(output_dir, "classification_report.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Classe", "Précision", "Rappel", "F1-Score", "Support"])
+            for i, name in enumerate(class_names):
+                writer.writerow([name, float(precision[i]), float(recall[i]), float(f1[i]), int(true_pixels[i])])
+            writer.writerow(["Accuracy", accuracy, "", "", total])
+            writer.writerow(["Macro avg", float(precision.mean()), float(recall.mean()), float(f1.mean()), total])
+            writer.writerow(["Weighted avg", float(precision @ weights), float(recall @ weights), float(f1 @ weights), total])
+
+        best, worst = int(np.nanargmax(iou)), int(np.nanargmin(iou))
+        with open(os.path.join(output_dir, "evaluation_summary.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Métrique", "Valeur"])
+            writer.writerow(["Précision globale", f"{accuracy:.4f}"])
+            writer.writerow(["Mean IoU", f"{self.mean_iou():.4f}"])
+            writer.writerow(["Meilleure classe (IoU)", f"{class_names[best]} ({iou[best]:.4f})"])
+            writer.writerow(["Pire classe (IoU)", f"{class_names[worst]} ({iou[worst]:.4f})"])
+            writer.writerow(["Nombre d'images évaluées", self.num_images])
+            writer.writerow(["Date d'évaluation", evaluated_at.strftime("%Y-%m-%d %H:%M:%S")])
@@ -0,0 +1,69 @@
+# app/backend/utils/executor.py
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Levée lorsque l'exécuteur n'accepte plus de nouvelles tâches"""
+
+
+class BoundedExecutor:
+    """Pool de threads dédié avec un nombre borné de tâches en cours et en attente"""
+
+    def __init__(self, max_workers: int, max_pending: int, thread_name_prefix: str = "inference"):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self.capacity = self.max_workers + self.max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._semaphore = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Soumet une tâche, ou lève ExecutorSaturatedError si la capacité est atteinte"""
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturatedError("Serveur saturé, réessayez plus tard")
+
+        with self._lock:
+            self._active += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Exécute une tâche bloquante dans le pool sans bloquer la boucle d'événements"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+        self._semaphore.release()
+
+    def shutdown(self, wait: bool = True):
+        """Arrête le pool de threads"""
+        self._executor.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'occupation de l'exécuteur"""
+        with self._lock:
+            active = self._active
+            rejected = self._rejected
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "active": active,
+            "saturated": active >= self.capacity,
+            "rejected": rejected
+        }
@@ -0,0 +1,198 @@
+# app/backend/utils/history.py
+import os
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.result_store import RESULT_FILE
+
+logger = logging.getLogger(__name__)
+
+# Format des horodatages des dossiers de résultats (ordre lexicographique = ordre chronologique)
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    folder TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    filename TEXT,
+    dominant_class TEXT,
+    dominant_class_percentage REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_dominant_class ON predictions (dominant_class, folder);
+"""
+
+
+def format_timestamp(value: datetime) -> str:
+    """Convertit une date (naïve = heure locale) au format des dossiers de résultats"""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+class PredictionHistory:
+    """Index SQLite des prédictions persistées, pour lister l'historique sans parcourir le disque
+
+    Les dossiers de résultats restent la source de vérité : l'index est alimenté à chaque
+    prédiction terminée, purgé par la rétention et peut être reconstruit depuis les dossiers.
+    La pagination se fait par curseur (nom du dernier dossier renvoyé), en ordre antichronologique.
+    """
+
+    def __init__(self, db_path: str, predictions_dir: str, suffix: str = "-result"):
+        self.db_path = db_path
+        self.predictions_dir = predictions_dir
+        self.suffix = suffix
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._last_rebuild: Optional[Dict[str, Any]] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # WAL + délai d'attente : plusieurs workers gunicorn partagent le même fichier
+            conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def start(self):
+        """Ouvre l'index et le reconstruit en arrière-plan s'il est vide alors que des résultats existent"""
+        with self._lock:
+            empty = self._connection().execute("SELECT 1 FROM predictions LIMIT 1").fetchone() is None
+        if empty and self._has_result_folders():
+            self._rebuild_thread = threading.Thread(target=self._rebuild_worker, name="history-rebuild", daemon=True)
+            self._rebuild_thread.start()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _has_result_folders(self) -> bool:
+        if not os.path.isdir(self.predictions_dir):
+            return False
+        with os.scandir(self.predictions_dir) as it:
+            return any(entry.is_dir() and entry.name.endswith(self.suffix) for entry in it)
+
+    @staticmethod
+    def _row(folder: str, result: Dict[str, Any]) -> Tuple:
+        # Les anciens résultats sans horodatage sont datés par le préfixe du dossier
+        timestamp = result.get("timestamp") or "-".join(folder.split("-")[:2])
+        return (
+            folder,
+            timestamp,
+            result.get("filename"),
+            result.get("dominant_class"),
+            result.get("dominant_class_percentage")
+        )
+
+    def add(self, folder: str, result: Dict[str, Any]):
+        """Indexe une prédiction terminée (dossier de résultats et statistiques)"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)", self._row(folder, result))
+
+    def remove(self, folders: Iterable[str]):
+        """Retire des dossiers de l'index (appelé après leur suppression par la rétention)"""
+        folders = [(name,) for name in folders]
+        if not folders:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM predictions WHERE folder = ?", folders)
+
+    def query(self, limit: int = 20, cursor: Optional[str] = None, dominant_class: Optional[str] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              filename: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Page de prédictions (plus récentes d'abord) et curseur de la page suivante (None si dernière page)"""
+        clauses, params = [], []
+        if cursor:
+            clauses.append("folder < ?")
+            params.append(cursor)
+        if dominant_class:
+            clauses.append("dominant_class = ?")
+            params.append(dominant_class)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(format_timestamp(since))
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(format_timestamp(until))
+        if filename:
+            escaped = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        sql = "SELECT * FROM predictions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY folder DESC LIMIT ?"
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = items[-1]["folder"] if len(rows) > limit else None
+        return items, next_cursor
+
+    def rebuild(self) -> Dict[str, int]:
+        """Resynchronise l'index avec les dossiers de résultats présents sur le disque"""
+        rows = []
+        on_disk = set()
+        if os.path.isdir(self.predictions_dir):
+            with os.scandir(self.predictions_dir) as it:
+                for entry in it:
+                    if not entry.is_dir() or not entry.name.endswith(self.suffix):
+                        continue
+                    result_file = os.path.join(entry.path, RESULT_FILE)
+                    try:
+                        with open(result_file, "r") as f:
+                            result = json.load(f)
+                    except (OSError, ValueError):
+                        # Dossier incomplet (écriture en cours ou interrompue) : non listé
+                        continue
+                    on_disk.add(entry.name)
+                    rows.append(self._row(entry.name, result))
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                indexed = {row[0] for row in conn.execute("SELECT folder FROM predictions")}
+                stale = [(name,) for name in indexed - on_disk]
+                conn.executemany("DELETE FROM predictions WHERE folder = ?", stale)
+                conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+
+        stats = {"indexed": len(rows), "removed": len(stale)}
+        self._last_rebuild = {**stats, "at": datetime.now().isoformat(timespec="seconds")}
+        logger.info(f"Index de l'historique reconstruit : {len(rows)} prédiction(s), {len(stale)} entrée(s) obsolète(s) retirée(s)")
+        return stats
+
+    def _rebuild_worker(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconstruction de l'index de l'historique: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'emplacement de l'index, son nombre d'entrées et l'état de la reconstruction"""
+        with self._lock:
+            count = self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        return {
+            "db_path": self.db_path,
+            "entries": count,
+            "rebuilding": self._rebuild_thread is not None and self._rebuild_thread.is_alive(),
+            "last_rebuild": self._last_rebuild
+        }
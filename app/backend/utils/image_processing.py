@@ -3,7 +3,7 @@ import numpy as np
 from PIL import Image
 import io
 import base64
-from typing import Tuple
+from typing import List, Optional, Sequence, Tuple
 
 def decode_base64_image(base64_string: str) -> Image.Image:
     """Décode une image base64 en objet PIL Image"""
@@ -23,8 +23,11 @@ def encode_image_to_base64(image: Image.Image) -> str:
     """Encode une image PIL en base64"""
     buffered = io.BytesIO()
     image.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    return f"data:image/png;base64,{img_str}"
+    return png_to_data_uri(buffered.getvalue())
+
+def png_to_data_uri(data: bytes) -> str:
+    """Encode des octets PNG en URI data base64"""
+    return f"data:image/png;base64,{base64.b64encode(data).decode()}"
 
 def numpy_to_pil(numpy_array: np.ndarray) -> Image.Image:
     """Convertit un array numpy en image PIL"""
@@ -33,4 +36,127 @@ def numpy_to_pil(numpy_array: np.ndarray) -> Image.Image:
 def validate_image(image: Image.Image, max_size: Tuple[int, int] = (4096, 4096)) -> bool:
     """Valide que l'image est dans les limites acceptables"""
     width, height = image.size
-    return width <= max_size[0] and height <= max_size[1]
\ No newline at end of file
+    return width <= max_size[0] and height <= max_size[1]
+
+def encode_image_to_png(image: Image.Image) -> bytes:
+    """Encode une image PIL en PNG (octets bruts)"""
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+# Format RLE des masques : suite de paires (valeur uint8, longueur uint32 little-endian)
+RLE_DTYPE = np.dtype([('value', 'u1'), ('count', '<u4')])
+
+def rle_encode_mask(mask: np.ndarray) -> bytes:
+    """Encode un masque de classes uint8 en RLE (parcours ligne par ligne)"""
+    flat = np.ascontiguousarray(mask, dtype=np.uint8).ravel()
+    if flat.size == 0:
+        return b""
+    
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    runs = np.empty(len(starts), dtype=RLE_DTYPE)
+    runs['value'] = flat[starts]
+    runs['count'] = np.diff(np.append(starts, flat.size))
+    return runs.tobytes()
+
+def rle_decode_mask(data: bytes, shape: Tuple[int, int]) -> np.ndarray:
+    """Décode un masque RLE produit par rle_encode_mask"""
+    runs = np.frombuffer(data, dtype=RLE_DTYPE)
+    return np.repeat(runs['value'], runs['count']).reshape(shape)
+
+def build_palette_lut(colors: List[List[int]]) -> np.ndarray:
+    """Table de correspondance (256, 3) identifiant de classe -> couleur RGB (noir au-delà des classes)"""
+    lut = np.zeros((256, 3), dtype=np.uint8)
+    lut[:len(colors)] = np.asarray(colors, dtype=np.uint8)
+    return lut
+
+def colorize_mask(mask: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Colorise un masque de classes par une seule indexation dans la table de couleurs"""
+    return lut[mask.astype(np.uint8, copy=False)]
+
+def mask_to_palette_image(mask: np.ndarray, palette: np.ndarray) -> Image.Image:
+    """Convertit un masque de classes en image PIL en mode palette ("P")
+    
+    Avec une palette réduite aux seules couleurs des classes, le PNG est écrit
+    sur 1 à 4 bits par pixel : bien plus petit et rapide à encoder qu'en RGB.
+    """
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    mask_img = Image.frombytes("P", (mask.shape[1], mask.shape[0]), mask.tobytes())
+    mask_img.putpalette(np.asarray(palette, dtype=np.uint8).ravel().tolist())
+    return mask_img
+
+def class_histogram(mask: np.ndarray, num_classes: int) -> np.ndarray:
+    """Nombre de pixels par classe (np.bincount, une seule passe sur le masque)"""
+    return np.bincount(mask.ravel(), minlength=num_classes)[:num_classes]
+
+# Valeur des pixels hors groupes (identifiants Cityscapes absents de id_to_group, dont 255 / -1)
+IGNORE_INDEX = 255
+
+# Éléments remappés par appel à np.take : l'index intermédiaire (intp) reste dans le cache
+REMAP_CHUNK = 1 << 16
+
+def build_group_lut(id_to_group: Sequence[int], fill: int = IGNORE_INDEX) -> np.ndarray:
+    """Table (256,) identifiant Cityscapes brut -> groupe ; `fill` pour les identifiants hors table
+    
+    fill=IGNORE_INDEX exclut ces pixels de l'évaluation ; l'identifiant du groupe void
+    les rattache à ce groupe (superposition de la vérité terrain).
+    """
+    lut = np.full(256, fill, dtype=np.uint8)
+    lut[:len(id_to_group)] = np.asarray(id_to_group, dtype=np.uint8)
+    return lut
+
+def remap_labels(labels: np.ndarray, lut: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convertit une carte d'identifiants uint8 en groupes par la table
+    
+    out=labels travaille sur place (aucune allocation de la taille de l'image). Le remappage
+    se fait par blocs : np.take convertit les indices en intp, ce qui coûterait sinon une
+    copie 8 fois plus grande que la carte.
+    """
+    if labels.dtype != np.uint8:
+        raise ValueError(f"Carte d'identifiants uint8 attendue, reçu {labels.dtype}")
+    if out is None:
+        out = np.empty_like(labels)
+    elif out.shape != labels.shape or out.dtype != np.uint8:
+        raise ValueError(f"Sortie incompatible : {out.shape} {out.dtype}")
+    if not (labels.flags.c_contiguous and out.flags.c_contiguous):
+        out[...] = lut[labels]
+        return out
+    flat_labels, flat_out = labels.reshape(-1), out.reshape(-1)
+    for start in range(0, flat_labels.size, REMAP_CHUNK):
+        stop = start + REMAP_CHUNK
+        np.take(lut, flat_labels[start:stop], out=flat_out[start:stop], mode="clip")
+    return out
+
+def load_label_groups(source, lut: np.ndarray, size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Lit une carte *_labelIds.png (chemin ou fichier) et la convertit en groupes
+    
+    La table est appliquée par Image.point sur l'image décodée (boucle C, sans copie
+    intermédiaire). size: (largeur, hauteur), redimensionnement au plus proche voisin.
+    """
+    image = Image.open(source)
+    if image.mode != "L":
+        # Cartes en mode palette ou 16/32 bits : identifiants hors 0-255 (ex. -1) ramenés à 255
+        ids = np.asarray(image)
+        image = Image.fromarray(np.where((ids < 0) | (ids > 255), 255, ids).astype(np.uint8))
+    if size is not None and image.size != tuple(size):
+        image = image.resize(size, Image.NEAREST)
+    return np.asarray(image.point(lut.tolist()))
+
+def prepare_model_input(image: Image.Image, size: Tuple[int, int], draft: bool = False) -> np.ndarray:
+    """Redimensionne l'image en uint8 (H, W, 3) à la taille du modèle, sans copie float pleine résolution
+    
+    size: (hauteur, largeur) du modèle.
+    draft: pour un JPEG pas encore décodé, décode directement à une échelle réduite (1/2 à 1/8)
+    au lieu de la pleine résolution. L'image est alors modifiée sur place (image.size change) :
+    ne l'activer que si l'image pleine résolution n'est plus nécessaire ensuite.
+    """
+    target = (size[1], size[0])
+    if draft and image.format == "JPEG":
+        image.draft("RGB", target)
+    
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    # Rééchantillonnage bilinéaire avec anti-aliasing, précédé d'une réduction entière rapide
+    image = image.resize(target, Image.BILINEAR, reducing_gap=3.0)
+    return np.asarray(image, dtype=np.uint8)
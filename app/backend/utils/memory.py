@@ -0,0 +1,66 @@
+# app/backend/utils/memory.py
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Mémoire résidente actuelle du processus (Linux : /proc/self/statm, sinon pic ru_maxrss)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        if resource is not None:
+            # ru_maxrss est en Ko sous Linux, en octets sous macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+        return 0
+
+
+class PeakRSSMonitor:
+    """Mesure le pic de mémoire résidente pendant un bloc de code (échantillonnage en arrière-plan)
+
+    Usage :
+        with PeakRSSMonitor() as monitor:
+            traitement()
+        print(monitor.peak_delta_bytes)
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.baseline_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def peak_delta_bytes(self) -> int:
+        """Pic de mémoire au-dessus du niveau mesuré à l'entrée du bloc"""
+        return max(0, self.peak_bytes - self.baseline_bytes)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.baseline_bytes = current_rss_bytes()
+        self.peak_bytes = self.baseline_bytes
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="rss-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+        return False
@@ -0,0 +1,308 @@
+# app/backend/utils/metrics.py
+# Métriques au format texte Prometheus, sans dépendance : compteurs, jauges et histogrammes
+# protégés par un verrou (un incrément ou une observation coûte ~1 µs), et durées par étape
+# de chaque requête pour l'en-tête Server-Timing.
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import settings
+
+# Bornes des histogrammes de durée (secondes) : de 0,5 ms à 30 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur monotone, par combinaison d'étiquettes"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Jauge : valeur courante, fixée ou lue à la collecte (`fn`)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 fn: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            value = self._fn()
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (bornes fixes) avec somme et nombre d'observations"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Par combinaison d'étiquettes : [effectif par intervalle (+Inf en dernier), somme]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics (propres au processus)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              fn: Optional[Callable[[], Optional[float]]] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, fn))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Durées des étapes d'une requête, restituées dans l'en-tête Server-Timing"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        # Une étape répétée (tuiles, artefacts) est cumulée
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def header(self) -> str:
+        """Valeur Server-Timing (durées en millisecondes), avec la durée totale"""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.durations.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "segmentation_stage_duration_seconds", "Durée des étapes de segmentation", ("stage",)
+)
+
+# Étapes de la requête en cours dans ce thread (None hors requête : écriture de fond, scripts)
+_current_timer: contextvars.ContextVar[Optional[StageTimer]] = contextvars.ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def request_timer() -> Iterator[StageTimer]:
+    """Collecte les étapes mesurées par `stage` dans le thread courant, le temps du bloc"""
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mesure une étape : histogramme global et, dans une requête, en-tête Server-Timing"""
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.add(name, elapsed)
+
+
+# Métriques HTTP (MetricsMiddleware)
+HTTP_REQUESTS = registry.counter(
+    "segmentation_http_requests_total", "Requêtes HTTP par méthode, route et statut", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "segmentation_http_request_duration_seconds", "Durée des requêtes HTTP (réponse complète)", ("method", "route")
+)
+HTTP_IN_FLIGHT = registry.gauge("segmentation_http_requests_in_flight", "Requêtes HTTP en cours")
+HTTP_BYTES_RECEIVED = registry.counter(
+    "segmentation_http_received_bytes_total", "Octets reçus (corps des requêtes)", ("method", "route")
+)
+HTTP_BYTES_SENT = registry.counter(
+    "segmentation_http_sent_bytes_total", "Octets envoyés (corps des réponses)", ("method", "route")
+)
+
+# Métriques de segmentation
+PREDICTION_ERRORS = registry.counter(
+    "segmentation_prediction_errors_total", "Prédictions en échec par motif (rejected, invalid_input, internal)", ("reason",)
+)
+RESULT_CACHE_LOOKUPS = registry.counter(
+    "segmentation_result_cache_lookups_total", "Consultations du cache de résultats (hit, miss, bypass)", ("result",)
+)
+PERSISTENCE_DROPPED = registry.counter(
+    "segmentation_persistence_dropped_total", "Écritures d'artefacts abandonnées (file d'écriture pleine)"
+)
+MODEL_BATCH_SECONDS = registry.histogram("segmentation_model_batch_duration_seconds", "Durée d'une passe du modèle (batch)")
+MODEL_BATCH_SIZE = registry.histogram(
+    "segmentation_model_batch_size", "Images par passe du modèle", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : requêtes HTTP par route et statut, durée, requêtes en cours, octets reçus et envoyés
+
+    La route est le gabarit FastAPI (ex. /predictions/{folder}/{artifact}), pas le chemin : le
+    nombre de séries reste borné. Les réponses en flux sont mesurées jusqu'au dernier octet.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status, received, sent = 500, 0, 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Route résolue par le routeur (renseignée dans le scope), "unmatched" pour un 404
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=route)
+            HTTP_BYTES_RECEIVED.inc(received, method=method, route=route)
+            HTTP_BYTES_SENT.inc(sent, method=method, route=route)
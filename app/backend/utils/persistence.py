@@ -0,0 +1,249 @@
+# app/backend/utils/persistence.py
+import os
+import queue
+import shutil
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import PERSISTENCE_DROPPED
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_MODES = ("off", "light", "full")
+
+
+class _FlushMarker:
+    """Marqueur placé dans la file pour attendre l'écriture des tâches précédentes"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BackgroundWriter:
+    """File d'écriture en arrière-plan : les artefacts sont persistés après l'envoi de la réponse
+
+    La file est bornée en nombre de tâches et en octets retenus par les tâches en attente
+    (max_queue_bytes, 0 = sans limite) ; si elle est pleine, la tâche est abandonnée (et comptée)
+    plutôt que de bloquer la requête.
+    """
+
+    def __init__(self, max_queue_size: int = 64, max_queue_bytes: int = 0):
+        self.max_queue_size = max_queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self._queue: "queue.Queue[Optional[Tuple[Callable[[], None], int]]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._queued_bytes = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker, name="artifact-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Vide la file puis arrête le thread d'écriture"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, job: Callable[[], None], nbytes: int = 0) -> bool:
+        """Ajoute une tâche d'écriture ; retourne False si elle a été abandonnée (file pleine)
+
+        nbytes : mémoire retenue par la tâche jusqu'à son écriture (une tâche seule est toujours
+        acceptée, même au-delà de max_queue_bytes).
+        """
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            accepted = not (self.max_queue_bytes and self._queued_bytes
+                            and self._queued_bytes + nbytes > self.max_queue_bytes)
+            if accepted:
+                try:
+                    self._queue.put_nowait((job, nbytes))
+                    self._queued_bytes += nbytes
+                except queue.Full:
+                    accepted = False
+            if not accepted:
+                self._dropped += 1
+        if not accepted:
+            PERSISTENCE_DROPPED.inc()
+            logger.warning("File d'écriture des artefacts pleine : artefacts non sauvegardés")
+        return accepted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attend que toutes les tâches en file soient écrites ; retourne False si le délai expire"""
+        if self._thread is None:
+            return True
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if isinstance(job, _FlushMarker):
+                job.done.set()
+                continue
+            job, nbytes = job
+            try:
+                job()
+                with self._lock:
+                    self._written += 1
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                logger.error(f"Erreur lors de l'écriture des artefacts: {str(e)}")
+            finally:
+                with self._lock:
+                    self._queued_bytes -= nbytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'occupation de la file et les compteurs d'écriture"""
+        with self._lock:
+            return {
+                "queue_size": self._queue.qsize(),
+                "queue_capacity": self.max_queue_size,
+                "queue_bytes": self._queued_bytes,
+                "queue_capacity_bytes": self.max_queue_bytes,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed
+            }
+
+
+class RetentionPolicy:
+    """Supprime les dossiers de résultats les plus anciens selon l'âge, le nombre et la taille totale
+
+    Un critère à 0 est désactivé. L'élagage tourne périodiquement dans un thread de fond ;
+    on_prune reçoit les noms des dossiers supprimés (mise à jour de l'index de l'historique).
+    """
+
+    def __init__(self, directory: str, suffix: str = "-result", max_age_hours: float = 0,
+                 max_count: int = 0, max_bytes: int = 0, interval_seconds: float = 300,
+                 on_prune: Optional[Callable[[List[str]], None]] = None):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_age_seconds = max_age_hours * 3600
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.interval_seconds = interval_seconds
+        self.on_prune = on_prune
+        self._sizes: Dict[str, int] = {}  # les dossiers terminés ne changent plus : taille mise en cache
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pruned = 0
+        self._last_run: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_age_seconds or self.max_count or self.max_bytes)
+
+    def start(self):
+        """Démarre l'élagage périodique (sans effet si aucun critère n'est défini)"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                self.prune()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'élagage des prédictions: {str(e)}")
+            self._stop.wait(self.interval_seconds)
+
+    def _dir_size(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _list_entries(self) -> List[Tuple[str, float, int]]:
+        """(nom, date de modification, taille) des dossiers de résultats, du plus ancien au plus récent"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_dir() or not entry.name.endswith(self.suffix):
+                    continue
+                mtime = entry.stat().st_mtime
+                size = self._sizes.get(entry.name)
+                if size is None:
+                    size = self._dir_size(entry.path)
+                    # Ne mettre en cache que les dossiers stables (écriture probablement terminée)
+                    if time.time() - mtime > 60:
+                        self._sizes[entry.name] = size
+                entries.append((entry.name, mtime, size))
+        entries.sort(key=lambda e: (e[1], e[0]))
+        return entries
+
+    def prune(self) -> List[str]:
+        """Applique la politique de rétention ; retourne les dossiers supprimés"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+
+        with self._lock:
+            entries = self._list_entries()
+            now = time.time()
+            total_bytes = sum(size for _, _, size in entries)
+            to_delete = []
+
+            remaining = list(entries)
+            while remaining:
+                name, mtime, size = remaining[0]
+                too_old = self.max_age_seconds and now - mtime > self.max_age_seconds
+                too_many = self.max_count and len(remaining) > self.max_count
+                too_big = self.max_bytes and total_bytes > self.max_bytes
+                if not (too_old or too_many or too_big):
+                    break
+                to_delete.append(name)
+                total_bytes -= size
+                remaining.pop(0)
+
+            for name in to_delete:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                self._sizes.pop(name, None)
+
+            self._pruned += len(to_delete)
+            self._last_run = now
+
+        if to_delete:
+            logger.info(f"Rétention : {len(to_delete)} dossier(s) de prédiction supprimé(s)")
+            if self.on_prune is not None:
+                self.on_prune(to_delete)
+        return to_delete
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne la configuration et les compteurs de rétention"""
+        return {
+            "enabled": self.enabled,
+            "max_age_hours": self.max_age_seconds / 3600,
+            "max_count": self.max_count,
+            "max_bytes": self.max_bytes,
+            "pruned": self._pruned,
+            "last_run": self._last_run
+        }
@@ -0,0 +1,204 @@
+# app/backend/utils/profiling.py
+# Profilage à la demande d'une requête (en-tête X-Profile) : cProfile du thread de la requête,
+# échantillonnage des piles (requête + thread de batching), trace du profileur TensorFlow et pic
+# mémoire tracemalloc. Un seul profil à la fois par processus (profileurs globaux).
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sampling", "tf", "memory")
+PROFILE_SUFFIX = "-profile"
+SUMMARY_FILE = "profile.json"
+
+# Un profil à la fois : cProfile, le profileur TensorFlow et tracemalloc sont globaux
+_profile_lock = threading.Lock()
+
+
+def parse_profile_modes(value: str) -> List[str]:
+    """Modes demandés par l'en-tête X-Profile (séparés par des virgules) ; "1" ou vide : cprofile"""
+    modes = [mode.strip().lower() for mode in value.split(",") if mode.strip()]
+    if not modes or modes in (["1"], ["true"]):
+        return ["cprofile"]
+    unknown = [mode for mode in modes if mode not in PROFILE_MODES]
+    if unknown:
+        raise ValueError(f"Modes de profilage inconnus: {', '.join(unknown)} (disponibles: {', '.join(PROFILE_MODES)})")
+    return list(dict.fromkeys(modes))
+
+
+class StackSampler:
+    """Échantillonne les piles de threads donnés à intervalle fixe (sys._current_frames)
+
+    Le résultat est au format « folded » (une pile par ligne, fonctions séparées par ';', puis le
+    nombre d'échantillons), lisible par flamegraph.pl ou speedscope.
+    """
+
+    def __init__(self, thread_idents: Iterable[int], interval: float = 0.001):
+        self.thread_idents = {ident for ident in thread_idents if ident is not None}
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _worker(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self.thread_idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join([names.get(ident, str(ident)), *reversed(stack)])] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class RequestProfiler:
+    """Profil d'une requête, écrit dans `directory/<horodatage>-<id>-profile/`
+
+    acquire() réserve le profileur (False si un autre profil est en cours) ; le bloc `with`
+    mesure la requête et écrit les fichiers à la sortie :
+    cprofile.prof (pstats, ex. snakeviz) et cprofile.txt, sampling.folded, tf/ (TensorBoard,
+    onglet Profile), memory.txt (principales allocations), profile.json (résumé).
+    tracemalloc et le profileur TensorFlow sont globaux : les requêtes concurrentes y apparaissent.
+    """
+
+    def __init__(self, directory: str, modes: List[str], thread_idents: Iterable[int] = (),
+                 sampling_interval: float = 0.001):
+        self.modes = modes
+        self.id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(directory, self.id + PROFILE_SUFFIX)
+        self.summary: Dict[str, Any] = {"id": self.id, "created_at": datetime.now().isoformat(), "modes": modes}
+        self._thread_idents = list(thread_idents)
+        self._sampling_interval = sampling_interval
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._tf_started = False
+        self._tracemalloc_started = False
+        self._started_at = 0.0
+
+    def acquire(self) -> bool:
+        return _profile_lock.acquire(blocking=False)
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        if "memory" in self.modes:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._tracemalloc_started = True
+        if "tf" in self.modes:
+            self._start_tf_profiler()
+        if "sampling" in self.modes:
+            self._sampler = StackSampler(self._thread_idents, self._sampling_interval)
+            self._sampler.start()
+        self._started_at = time.perf_counter()
+        # En dernier : la mise en place des autres profileurs n'apparaît pas dans le profil
+        if "cprofile" in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+            self.summary["wall_ms"] = round((time.perf_counter() - self._started_at) * 1000, 2)
+            if self._sampler is not None:
+                self._sampler.stop()
+            if self._tf_started:
+                self._stop_tf_profiler()
+            self._write()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture du profil {self.id}: {str(e)}")
+        finally:
+            if self._tracemalloc_started:
+                tracemalloc.stop()
+            _profile_lock.release()
+        return False
+
+    def _start_tf_profiler(self):
+        import tensorflow as tf
+        try:
+            tf.profiler.experimental.start(os.path.join(self.path, "tf"))
+            self._tf_started = True
+        except Exception as e:
+            # Profileur déjà démarré ailleurs (TensorBoard, autre processus du même hôte...)
+            self.summary["tf_error"] = str(e)
+
+    def _stop_tf_profiler(self):
+        import tensorflow as tf
+        tf.profiler.experimental.stop()
+
+    def _write(self):
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(self.path, "cprofile.prof"))
+            report = io.StringIO()
+            pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(60)
+            with open(os.path.join(self.path, "cprofile.txt"), "w") as f:
+                f.write(report.getvalue())
+
+        if self._sampler is not None:
+            with open(os.path.join(self.path, "sampling.folded"), "w") as f:
+                f.write(self._sampler.folded())
+            self.summary["samples"] = sum(self._sampler.samples.values())
+
+        if "memory" in self.modes and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.summary["memory"] = {"peak_bytes": peak, "current_bytes": current}
+            top = tracemalloc.take_snapshot().statistics("lineno")[:30]
+            with open(os.path.join(self.path, "memory.txt"), "w") as f:
+                f.write(f"Pic tracemalloc: {peak / 2**20:.1f} Mo (allocations Python et numpy)\n\n")
+                f.writelines(f"{stat}\n" for stat in top)
+
+        self.write_summary()
+
+    def write_summary(self, **info):
+        """Complète et écrit profile.json (liste des fichiers du profil comprise)"""
+        self.summary.update(info)
+        files = []
+        for root, _, names in os.walk(self.path):
+            files.extend(os.path.relpath(os.path.join(root, name), self.path) for name in names if name != SUMMARY_FILE)
+        self.summary["files"] = sorted(files)
+        with open(os.path.join(self.path, SUMMARY_FILE), "w") as f:
+            json.dump(self.summary, f, indent=2, default=str)
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    """Résumés des profils enregistrés, du plus récent au plus ancien"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        path = os.path.join(directory, name, SUMMARY_FILE)
+        if name.endswith(PROFILE_SUFFIX) and os.path.exists(path):
+            with open(path) as f:
+                profiles.append(json.load(f))
+    return profiles
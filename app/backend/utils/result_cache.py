@@ -0,0 +1,284 @@
+# app/backend/utils/result_cache.py
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(contents: bytes, run_id: Optional[str], variant: str = "") -> str:
+    """Clé de cache : empreinte SHA-256 des octets envoyés, du run MLflow du modèle et des options
+    qui changent le résultat (variant, ex. mode d'agrandissement du masque)"""
+    digest = hashlib.sha256((run_id or "").encode())
+    digest.update(b"\0")
+    if variant:
+        digest.update(variant.encode())
+        digest.update(b"\0")
+    digest.update(contents)
+    return digest.hexdigest()
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    """Taille approximative d'une entrée en mémoire (masque, PNG encodés, statistiques)"""
+    return (entry["mask"].nbytes
+            + sum(len(data) for data in entry["images"].values())
+            + len(json.dumps(entry["metadata"])))
+
+
+class ResultCache:
+    """Cache LRU/TTL des résultats de prédiction, indexé par le contenu de l'image envoyée
+
+    Une entrée contient les statistiques (metadata), le masque de classes à la résolution
+    du modèle et les artefacts déjà encodés en PNG. Les entrées évincées de la mémoire sont
+    déversées sur disque (.npz) si spill_dir est défini, dans la limite de max_disk_bytes.
+
+    Le déversement est indexé par le système de fichiers (fichier <clé>.npz, ordre LRU par date de
+    modification) : plusieurs processus peuvent partager le même spill_dir et son budget. Les
+    lectures et écritures de fichiers se font hors du verrou, qui ne protège que la mémoire.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 0, spill_dir: Optional[str] = None,
+                 max_disk_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir if spill_dir and max_disk_bytes > 0 else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        # Occupation du disque lors du dernier parcours du répertoire (tous processus confondus)
+        self._disk_entries = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        # Un seul élagage du répertoire à la fois dans ce processus
+        self._prune_lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._prune_spill_dir()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _expired_at(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str, required_images: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Retourne l'entrée (metadata, mask, images) ou None si absente ou sans les artefacts requis"""
+        if not self.enabled:
+            return None
+        required_images = set(required_images)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired_at(entry["created"]):
+                    self._remove(key)
+                    self._expired += 1
+                else:
+                    self._entries.move_to_end(key)
+                    if required_images <= entry["images"].keys():
+                        self._hits += 1
+                        return entry
+                    self._misses += 1
+                    return None
+
+        entry = self._load_spilled(key)
+        with self._lock:
+            if entry is None or not required_images <= entry["images"].keys():
+                self._misses += 1
+            else:
+                self._disk_hits += 1
+            evicted = self._insert(key, entry) if entry is not None else []
+        self._spill_all(evicted)
+        return entry if entry is not None and required_images <= entry["images"].keys() else None
+
+    def put(self, key: str, metadata: Dict[str, Any], mask: np.ndarray, images: Dict[str, bytes]):
+        """Ajoute ou remplace une entrée (les artefacts déjà en cache sont conservés)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                images = {**previous["images"], **images}
+                self._remove(key)
+            entry = {"metadata": metadata, "mask": mask, "images": images, "created": time.time()}
+            entry["size"] = _entry_size(entry)
+            if entry["size"] > self.max_bytes:
+                return
+            evicted = self._insert(key, entry)
+        self._spill_all(evicted)
+
+    def _insert(self, key: str, entry: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Insère une entrée (sous le verrou) ; retourne les entrées évincées à déverser hors du verrou"""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry["size"]
+        evicted = []
+        while self._bytes > self.max_bytes and self._entries:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._bytes -= old_entry["size"]
+            self._evictions += 1
+            if not self._expired_at(old_entry["created"]):
+                evicted.append((old_key, old_entry))
+        return evicted
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    # --- Déversement sur disque (hors du verrou) ---
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.npz")
+
+    def _spill_all(self, evicted: List[Tuple[str, Dict[str, Any]]]):
+        if not self.spill_dir or not evicted:
+            return
+        for key, entry in evicted:
+            self._spill(key, entry)
+        self._prune_spill_dir()
+
+    def _spill(self, key: str, entry: Dict[str, Any]):
+        if entry["size"] > self.max_disk_bytes:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            # Déjà déversée (par ce processus ou un autre) : seulement marquée comme récente
+            try:
+                os.utime(path)
+                return
+            except OSError:
+                pass
+        # Fichier temporaire propre au thread : plusieurs processus peuvent déverser la même clé
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        try:
+            arrays = {f"image_{name}": np.frombuffer(data, dtype=np.uint8) for name, data in entry["images"].items()}
+            with open(tmp_path, "wb") as f:
+                # Les PNG sont déjà compressés : savez (sans compression) suffit
+                np.savez(f, mask=entry["mask"], created=np.float64(entry["created"]),
+                         metadata=np.frombuffer(json.dumps(entry["metadata"]).encode(), dtype=np.uint8), **arrays)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Impossible de déverser une entrée du cache sur disque: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _prune_spill_dir(self):
+        """Supprime les fichiers les moins récemment utilisés au-delà du budget disque (partagé)"""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            with os.scandir(self.spill_dir) as it:
+                for entry in it:
+                    if not (entry.is_file() and entry.name.endswith(".npz")):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, entry.path, stat.st_size))
+            files.sort()
+            total = sum(size for _, _, size in files)
+            count = len(files)
+            for _, path, size in files:
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+                count -= 1
+            self._disk_entries, self._disk_bytes = count, total
+        except OSError as e:
+            logger.warning(f"Impossible d'élaguer le cache sur disque: {str(e)}")
+        finally:
+            self._prune_lock.release()
+
+    def _load_spilled(self, key: str) -> Optional[Dict[str, Any]]:
+        """Charge une entrée déversée (par ce processus ou un autre) ; le fichier reste partagé"""
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with np.load(path) as data:
+                created = float(data["created"])
+                entry = {
+                    "metadata": json.loads(data["metadata"].tobytes()),
+                    "mask": data["mask"],
+                    "images": {name[len("image_"):]: data[name].tobytes() for name in data.files if name.startswith("image_")},
+                    "created": created
+                }
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Entrée du cache illisible sur disque: {str(e)}")
+            self._remove_spilled(path)
+            return None
+
+        if self._expired_at(entry["created"]):
+            with self._lock:
+                self._expired += 1
+            self._remove_spilled(path)
+            return None
+        # Marquée comme récente pour l'élagage LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        entry["size"] = _entry_size(entry)
+        return entry
+
+    @staticmethod
+    def _remove_spilled(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Vide le cache en mémoire et sur disque (répertoire partagé compris)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.spill_dir:
+            with os.scandir(self.spill_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(".npz"):
+                        self._remove_spilled(entry.path)
+            self._disk_entries = self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'occupation du cache et les compteurs de succès/échecs"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": self._disk_entries,
+                "disk_bytes": self._disk_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expired": self._expired
+            }
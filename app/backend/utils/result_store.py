@@ -0,0 +1,65 @@
+# app/backend/utils/result_store.py
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESULT_FILE = "prediction_result.json"
+MASK_FILE = "prediction_mask.npz"
+# Ancien format : masque de classes et masque coloré sérialisés en listes JSON indentées
+LEGACY_FULL_FILE = "prediction_result_full.json"
+
+
+def save_mask(result_dir: str, mask: np.ndarray):
+    """Enregistre le masque de classes (uint8, résolution du modèle) en .npz compressé
+
+    Le masque coloré n'est pas stocké : il se déduit des identifiants de classes
+    (utils.image_processing.colorize_mask).
+    """
+    path = os.path.join(result_dir, MASK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, mask=np.asarray(mask, dtype=np.uint8))
+    os.replace(tmp_path, path)
+
+def load_mask(result_dir: str) -> Optional[np.ndarray]:
+    """Charge le masque de classes d'un dossier de résultats (.npz, ou ancien JSON complet)"""
+    path = os.path.join(result_dir, MASK_FILE)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return data["mask"]
+
+    legacy_path = os.path.join(result_dir, LEGACY_FULL_FILE)
+    if os.path.exists(legacy_path):
+        with open(legacy_path, "r") as f:
+            return np.asarray(json.load(f)["prediction_mask"], dtype=np.uint8)
+
+    return None
+
+def load_prediction_result(result_dir: str, with_mask: bool = True) -> Dict[str, Any]:
+    """Charge les statistiques d'une prédiction et, si demandé, son masque de classes"""
+    with open(os.path.join(result_dir, RESULT_FILE), "r") as f:
+        result = json.load(f)
+
+    if with_mask:
+        result["prediction_mask"] = load_mask(result_dir)
+    return result
+
+def migrate_result_dir(result_dir: str, keep_json: bool = False) -> bool:
+    """Convertit prediction_result_full.json en prediction_mask.npz ; retourne True si converti"""
+    legacy_path = os.path.join(result_dir, LEGACY_FULL_FILE)
+    if not os.path.exists(legacy_path):
+        return False
+
+    if not os.path.exists(os.path.join(result_dir, MASK_FILE)):
+        with open(legacy_path, "r") as f:
+            mask = np.asarray(json.load(f)["prediction_mask"], dtype=np.uint8)
+        save_mask(result_dir, mask)
+
+    if not keep_json:
+        os.remove(legacy_path)
+    return True
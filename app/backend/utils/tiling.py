@@ -0,0 +1,79 @@
+# app/backend/utils/tiling.py
+from typing import List, Tuple
+
+import numpy as np
+
+# Poids minimum au bord d'une tuile (évite une division par zéro au bord de l'image)
+MIN_BLEND_WEIGHT = 1e-3
+
+
+def tile_starts(length: int, tile: int, stride: int) -> List[int]:
+    """Positions de départ des tuiles le long d'un axe ; la dernière est alignée sur le bord"""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+def tile_boxes(size: Tuple[int, int], tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Boîtes (gauche, haut, droite, bas) des tuiles couvrant une image de taille (largeur, hauteur)
+
+    Toutes les tuiles ont la même taille : min(tile_size, côté de l'image) sur chaque axe.
+    """
+    if overlap < 0 or overlap >= tile_size:
+        raise ValueError(f"Chevauchement invalide: {overlap} (taille de tuile {tile_size})")
+    width, height = size
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    stride = tile_size - overlap
+    return [
+        (left, top, left + tile_w, top + tile_h)
+        for top in tile_starts(height, tile_h, stride)
+        for left in tile_starts(width, tile_w, stride)
+    ]
+
+def blend_window(height: int, width: int, ramp_h: int, ramp_w: int) -> np.ndarray:
+    """Poids (H, W) d'une tuile : 1 au centre, rampe linéaire sur la largeur du chevauchement vers les bords"""
+    def axis(length: int, ramp: int) -> np.ndarray:
+        weights = np.ones(length, dtype=np.float32)
+        if ramp > 0:
+            ramp = min(ramp, length // 2)
+            edge = (np.arange(ramp, dtype=np.float32) + 0.5) / ramp
+            weights[:ramp] = edge
+            weights[length - ramp:] = edge[::-1]
+        return np.maximum(weights, MIN_BLEND_WEIGHT)
+    return np.outer(axis(height, ramp_h), axis(width, ramp_w))
+
+
+class TileBlender:
+    """Assemble les logits des tuiles en une carte unique, par moyenne pondérée dans les chevauchements
+
+    La carte est à la résolution effective des tuiles (taille du modèle / taille de tuile), pas à
+    celle de l'image : pour une image 2048x1024 et des tuiles de 512 pixels, 896x448 au lieu de
+    2048x1024, ce qui borne la mémoire. Les tuiles sont ajoutées au fil de l'eau.
+    """
+
+    def __init__(self, size: Tuple[int, int], tile_size: int, overlap: int,
+                 model_size: Tuple[int, int], num_classes: int):
+        width, height = size
+        model_h, model_w = model_size
+        tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+        self.scale_x = model_w / tile_w
+        self.scale_y = model_h / tile_h
+        self.model_size = model_size
+        self.shape = (max(model_h, round(height * self.scale_y)), max(model_w, round(width * self.scale_x)))
+        self.logits = np.zeros((*self.shape, num_classes), dtype=np.float32)
+        self.weights = np.zeros(self.shape, dtype=np.float32)
+        self.window = blend_window(model_h, model_w, round(overlap * self.scale_y), round(overlap * self.scale_x))
+
+    def add(self, box: Tuple[int, int, int, int], logits: np.ndarray):
+        """Ajoute les logits (h_modèle, w_modèle, C) de la tuile `box` (coordonnées de l'image)"""
+        model_h, model_w = self.model_size
+        top = min(round(box[1] * self.scale_y), self.shape[0] - model_h)
+        left = min(round(box[0] * self.scale_x), self.shape[1] - model_w)
+        self.logits[top:top + model_h, left:left + model_w] += logits * self.window[..., np.newaxis]
+        self.weights[top:top + model_h, left:left + model_w] += self.window
+
+    def result(self) -> np.ndarray:
+        """Logits assemblés (H, W, C), normalisés par la somme des poids (sur place)"""
+        self.logits /= self.weights[..., np.newaxis]
+        return self.logits
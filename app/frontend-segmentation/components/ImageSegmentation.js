@@ -45,7 +45,7 @@ const ImageSegmentation = () => {
 
       setLoadingProgress('Envoi vers le serveur...');
       
-      const response = await fetch(`${API_BASE_URL}/predict`, {
+      const response = await fetch(`${API_BASE_URL}/predict?outputs=original,prediction_mask,overlay,side_by_side`, {
         method: 'POST',
         body: formData,
       });